@@ -0,0 +1,196 @@
+# FILE: activity_logs.py
+# Per-user activity history: keyset pages, monthly partitions, retention
+#
+# Retention job (cron / scheduled task), from the app directory:
+#   python activity_logs.py partitions           # create upcoming monthly partitions
+#   python activity_logs.py archive --months 12  # move older history out
+
+import argparse
+import os
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, text, tuple_
+
+from flight_search import decode_cursor, encode_cursor
+from models import ActivityLog, ActivityLogArchive
+
+ACTIVITY_LOG_RETENTION_MONTHS = int(os.getenv("ACTIVITY_LOG_RETENTION_MONTHS", "12"))
+ACTIVITY_LOG_PARTITIONS_AHEAD = int(os.getenv("ACTIVITY_LOG_PARTITIONS_AHEAD", "3"))
+ACTIVITY_LOG_ARCHIVE_SCHEMA = os.getenv("ACTIVITY_LOG_ARCHIVE_SCHEMA", "archive")
+ARCHIVE_BATCH = 10_000
+MAX_PAGE_SIZE = 100
+
+TABLE = ActivityLog.__tablename__
+
+# -------------------------------------------------
+# History pages
+# -------------------------------------------------
+def history_query(user_id: int, cursor: Optional[str] = None, limit: int = 20):
+    """
+    One user's entries newest first, served from ix_activity_logs_user_timestamp
+    (user_id, timestamp DESC, id DESC). Pages continue strictly after the
+    cursor row, so page 1000 costs the same as page 1.
+    """
+    stmt = select(
+        ActivityLog.id, ActivityLog.action, ActivityLog.details,
+        ActivityLog.ip_address, ActivityLog.timestamp,
+    ).where(ActivityLog.user_id == user_id)
+
+    if cursor:
+        before_timestamp, before_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(ActivityLog.timestamp, ActivityLog.id) < tuple_(before_timestamp, before_id)
+        )
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = stmt.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc()).limit(limit + 1)
+    return stmt, limit
+
+
+def paginate(rows, limit: int):
+    """Split a limit + 1 result into (page, next_cursor)."""
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].timestamp, page[-1].id)
+    return page, next_cursor
+
+# -------------------------------------------------
+# Monthly partitions (PostgreSQL)
+# -------------------------------------------------
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {"table": TABLE}).first() is not None
+
+
+def ensure_partitions(conn, months_ahead: int = ACTIVITY_LOG_PARTITIONS_AHEAD,
+                      today: Optional[date] = None) -> List[str]:
+    """Create this month's and the next months' partitions, plus a default one."""
+    if not is_partitioned(conn):
+        return []
+    existing = {name for name, _, _ in list_partitions(conn)}
+    first = (today or date.today()).replace(day=1)
+    created = []
+    for n in range(months_ahead + 1):
+        month = add_months(first, n)
+        name = partition_name(month)
+        if name not in existing:
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            ))
+            created.append(name)
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT'))
+    return created
+
+
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def list_partitions(conn) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+    """(name, lower, upper) per partition; bounds are None for the default partition."""
+    rows = conn.execute(text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+        "FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)"
+    ), {"table": TABLE}).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS.search(bound or "")
+        if match:
+            partitions.append((name, datetime.fromisoformat(match.group(1)),
+                               datetime.fromisoformat(match.group(2))))
+        else:
+            partitions.append((name, None, None))
+    return sorted(partitions, key=lambda p: p[1] or datetime.max)
+
+# -------------------------------------------------
+# Retention
+# -------------------------------------------------
+def archive_partitions(conn, cutoff: datetime, schema: str = ACTIVITY_LOG_ARCHIVE_SCHEMA) -> List[str]:
+    """Detach whole partitions older than ``cutoff`` and move them to ``schema``."""
+    conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+    moved = []
+    for name, _, upper in list_partitions(conn):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"'))
+            conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"'))
+            moved.append(name)
+    return moved
+
+
+def archive_rows(engine, cutoff: datetime, batch: int = ARCHIVE_BATCH) -> int:
+    """
+    Without partitions: copy rows older than ``cutoff`` into
+    activity_logs_archive and delete them, in id-ordered batches with one
+    short transaction each.
+    """
+    columns = ("id", "user_id", "action", "details", "ip_address", "timestamp")
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(ActivityLog.id)
+                .where(ActivityLog.timestamp < cutoff)
+                .order_by(ActivityLog.id)
+                .limit(batch)
+            ).scalars().all()
+            if not ids:
+                return moved
+            conn.execute(insert(ActivityLogArchive).from_select(
+                columns,
+                select(*(getattr(ActivityLog, c) for c in columns)).where(ActivityLog.id.in_(ids)),
+            ))
+            conn.execute(delete(ActivityLog).where(ActivityLog.id.in_(ids)))
+            moved += len(ids)
+
+
+def run_retention(engine, months: int = ACTIVITY_LOG_RETENTION_MONTHS,
+                  today: Optional[date] = None) -> dict:
+    """Keep the last ``months`` whole months of history in activity_logs."""
+    cutoff = datetime.combine(add_months((today or date.today()).replace(day=1), -months),
+                              datetime.min.time())
+    with engine.begin() as conn:
+        partitioned = is_partitioned(conn)
+        if partitioned:
+            return {"cutoff": cutoff, "partitions_archived": archive_partitions(conn, cutoff)}
+    return {"cutoff": cutoff, "rows_archived": archive_rows(engine, cutoff)}
+
+
+def main():
+    from database import engine  # loads .env
+
+    parser = argparse.ArgumentParser(description="Activity log partitions and retention")
+    sub = parser.add_subparsers(dest="command", required=True)
+    partitions = sub.add_parser("partitions", help="create upcoming monthly partitions")
+    partitions.add_argument("--ahead", type=int, default=ACTIVITY_LOG_PARTITIONS_AHEAD)
+    archive = sub.add_parser("archive", help="move history older than N months out")
+    archive.add_argument("--months", type=int, default=ACTIVITY_LOG_RETENTION_MONTHS)
+    args = parser.parse_args()
+
+    if args.command == "partitions":
+        with engine.begin() as conn:
+            print("created:", ensure_partitions(conn, args.ahead) or "nothing")
+    else:
+        print(run_retention(engine, args.months))
+
+
+if __name__ == "__main__":
+    main()
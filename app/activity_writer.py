@@ -0,0 +1,272 @@
+# FILE: activity_writer.py
+# Background, batched writer for ActivityLog rows
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+
+from database import engine, copy_rows
+from models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+ACTIVITY_LOG_QUEUE_SIZE = int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "500"))
+ACTIVITY_LOG_FLUSH_MS = int(os.getenv("ACTIVITY_LOG_FLUSH_MS", "200"))
+# drop_newest | drop_oldest | block
+ACTIVITY_LOG_OVERFLOW = os.getenv("ACTIVITY_LOG_OVERFLOW", "drop_newest")
+ACTIVITY_LOG_BLOCK_MS = int(os.getenv("ACTIVITY_LOG_BLOCK_MS", "50"))
+
+_COLUMNS = ("user_id", "action", "details", "ip_address", "timestamp")
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class ActivityLogWriter:
+    """
+    Events are appended to a bounded in-memory queue and written by a
+    single background thread in multi-row INSERTs (COPY on PostgreSQL),
+    every `batch_size` events or `flush_ms` milliseconds, whichever
+    comes first. One writer thread keeps rows in enqueue order.
+
+    Overflow policies when the queue is full:
+      drop_newest - reject the new event
+      drop_oldest - discard the oldest queued event to make room
+      block       - make the caller wait up to `block_ms`, then drop
+
+    The block policy never waits on an event loop thread: log() called
+    from async code drops instead, and log_async() does the waiting in
+    a worker thread, so the request waits but the loop keeps running.
+    """
+
+    def __init__(
+        self,
+        bind=engine,
+        maxsize: int = ACTIVITY_LOG_QUEUE_SIZE,
+        batch_size: int = ACTIVITY_LOG_BATCH_SIZE,
+        flush_ms: int = ACTIVITY_LOG_FLUSH_MS,
+        overflow: str = ACTIVITY_LOG_OVERFLOW,
+        block_ms: int = ACTIVITY_LOG_BLOCK_MS,
+    ):
+        if overflow not in ("drop_newest", "drop_oldest", "block"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.bind = bind
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.overflow = overflow
+        self.block_timeout = block_ms / 1000
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+        # metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # -------------------------------------------------
+    # Producer side
+    # -------------------------------------------------
+    def log(
+        self,
+        user_id: int,
+        action: str,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """Queue one event. Returns False if it was dropped."""
+        event = (user_id, action, details, ip_address, timestamp or datetime.utcnow())
+        queued = self._put(event, wait=not _on_event_loop())
+        if queued is None:
+            with self._cond:
+                self.dropped += 1
+            return False
+        return queued
+
+    async def log_async(
+        self,
+        user_id: int,
+        action: str,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ) -> bool:
+        """log() for async callers; a full queue under the block policy is waited on off the loop."""
+        event = (user_id, action, details, ip_address, timestamp or datetime.utcnow())
+        queued = self._put(event, wait=False)
+        if queued is None:
+            queued = await asyncio.to_thread(self._put, event, True)
+        return queued
+
+    def _put(self, event, wait: bool) -> Optional[bool]:
+        """
+        True if queued, False if dropped. None if the queue is full under
+        the block policy and `wait` is False; nothing is counted then.
+        """
+        with self._cond:
+            if self._thread is None and not self._stopping:
+                self._start_locked()
+
+            if len(self._queue) >= self.maxsize:
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.overflow == "block":
+                    if not wait:
+                        return None
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.maxsize:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.dropped += 1
+                            return False
+                        self._cond.notify_all()
+                        self._cond.wait(remaining)
+                else:
+                    self.dropped += 1
+                    return False
+
+            self._queue.append(event)
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            if self._thread is None:
+                self._start_locked()
+
+    def _start_locked(self):
+        self._thread = threading.Thread(
+            target=self._run, name="activity-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the writer thread."""
+        with self._cond:
+            self._stopping = True
+            thread, self._thread = self._thread, None
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        # Anything enqueued after the thread exited
+        self.flush()
+
+    # -------------------------------------------------
+    # Consumer side
+    # -------------------------------------------------
+    def _take_batch(self):
+        batch = []
+        while self._queue and len(batch) < self.batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size and not self._stopping:
+                    self._cond.wait(self.flush_interval)
+                batch = self._take_batch()
+                stopping = self._stopping
+                self._cond.notify_all()  # wake callers blocked on a full queue
+            if batch:
+                self._write(batch)
+            elif stopping:
+                return
+
+    def flush(self):
+        """Synchronously write out the current queue contents."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+                self._cond.notify_all()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        for attempt in (1, 2):
+            try:
+                if self.bind.dialect.name == "postgresql":
+                    self._copy(batch)
+                else:
+                    self._insert(batch)
+                break
+            except Exception:
+                if attempt == 2:
+                    logger.exception("Dropping %d activity log rows", len(batch))
+                    with self._cond:
+                        self.failed += len(batch)
+                    return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._cond:
+            self.written += len(batch)
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+    def _insert(self, batch):
+        rows = [dict(zip(_COLUMNS, event)) for event in batch]
+        with self.bind.begin() as conn:
+            conn.execute(insert(ActivityLog.__table__), rows)
+
+    def _copy(self, batch):
+        with self.bind.begin() as conn:
+            copy_rows(conn, ActivityLog.__table__, _COLUMNS, batch)
+
+    # -------------------------------------------------
+    # Metrics
+    # -------------------------------------------------
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "queue_capacity": self.maxsize,
+                "overflow_policy": self.overflow,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3)
+                if self.flushes else 0.0,
+            }
+
+
+activity_writer = ActivityLogWriter()
@@ -0,0 +1,253 @@
+# FILE: analytics.py
+# Load factor, revenue and boardings from per-flight summary rows
+#
+# Full rebuild (after restoring a backup, or to check for drift),
+# from the app directory:
+#   python analytics.py rebuild
+
+import argparse
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, case, delete, exists, func, insert, literal, select
+
+from database import SessionLocal
+from models import Flight, FlightLoadSummary, Seat
+from reservations import availability_refresher
+from schedules import on_flights_updated
+
+logger = logging.getLogger(__name__)
+
+REFRESH_CHUNK = 1000          # flights per statement
+GROUP_BY = ("route", "aircraft", "date", "flight")
+
+SUMMARY = FlightLoadSummary.__table__
+_COLUMNS = (
+    "flight_id", "route_id", "aircraft_id", "service_date", "status",
+    "seats_total", "seats_booked", "seats_held",
+    "booked_economy", "booked_business", "booked_first", "revenue", "refreshed_at",
+)
+
+# -------------------------------------------------
+# Seats -> per-flight rows
+# -------------------------------------------------
+def rollup_query(now: datetime, flight_ids: Optional[Iterable[int]] = None,
+                 date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    The summary row of each flight computed straight from its seats: a
+    booking is a seat taken with no pending hold, a hold counts until it
+    lapses. Used to refresh the summaries, and as the raw baseline.
+    """
+    booked = and_(Seat.is_available.is_(False), Seat.held_until.is_(None))
+    held = and_(Seat.is_available.is_(False), Seat.held_until >= now)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    stmt = (
+        select(
+            Flight.id.label("flight_id"),
+            Flight.route_id,
+            Flight.aircraft_id,
+            func.date(Flight.departure_datetime, type_=SUMMARY.c.service_date.type).label("service_date"),
+            Flight.status,
+            func.count(Seat.id).label("seats_total"),
+            count_if(booked).label("seats_booked"),
+            count_if(held).label("seats_held"),
+            count_if(and_(booked, Seat.seat_class == "economy")).label("booked_economy"),
+            count_if(and_(booked, Seat.seat_class == "business")).label("booked_business"),
+            count_if(and_(booked, Seat.seat_class == "first")).label("booked_first"),
+            func.coalesce(func.sum(case((booked, Seat.price), else_=0)), 0).label("revenue"),
+            literal(now, SUMMARY.c.refreshed_at.type).label("refreshed_at"),
+        )
+        .select_from(Flight)
+        .outerjoin(Seat, Seat.flight_id == Flight.id)
+        .group_by(Flight.id, Flight.route_id, Flight.aircraft_id, Flight.departure_datetime, Flight.status)
+    )
+    if flight_ids is not None:
+        stmt = stmt.where(Flight.id.in_(list(flight_ids)))
+    if date_from is not None:
+        stmt = stmt.where(Flight.departure_datetime >= datetime.combine(date_from, datetime.min.time()))
+    if date_to is not None:
+        stmt = stmt.where(Flight.departure_datetime < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return stmt
+
+
+def refresh_summaries(conn, flight_ids: Iterable[int], now: Optional[datetime] = None) -> int:
+    """Recompute the given flights' summary rows in the caller's transaction."""
+    now = now or datetime.utcnow()
+    flight_ids = sorted(set(flight_ids))
+    for i in range(0, len(flight_ids), REFRESH_CHUNK):
+        chunk = flight_ids[i:i + REFRESH_CHUNK]
+        conn.execute(delete(SUMMARY).where(SUMMARY.c.flight_id.in_(chunk)))
+        conn.execute(insert(SUMMARY).from_select(_COLUMNS, rollup_query(now, chunk)))
+    return len(flight_ids)
+
+
+def backfill_summaries(conn, now: Optional[datetime] = None) -> int:
+    """Summary rows for flights that have none yet (first deploy, restored data)."""
+    missing = conn.execute(
+        select(Flight.id)
+        .outerjoin(SUMMARY, SUMMARY.c.flight_id == Flight.id)
+        .where(SUMMARY.c.flight_id.is_(None))
+    ).scalars().all()
+    return refresh_summaries(conn, missing, now)
+
+
+def rebuild_summaries(engine) -> int:
+    """Every flight, REFRESH_CHUNK flights per transaction."""
+    with engine.connect() as conn:
+        flight_ids = conn.execute(select(Flight.id).order_by(Flight.id)).scalars().all()
+    for i in range(0, len(flight_ids), REFRESH_CHUNK):
+        with engine.begin() as conn:
+            refresh_summaries(conn, flight_ids[i:i + REFRESH_CHUNK])
+    with engine.begin() as conn:
+        # Rows of deleted flights (SQLite does not enforce the cascade)
+        conn.execute(delete(SUMMARY).where(~exists().where(Flight.id == SUMMARY.c.flight_id)))
+    return len(flight_ids)
+
+# -------------------------------------------------
+# Incremental refresh
+# -------------------------------------------------
+class LoadSummaries:
+    """
+    Keeps the summary rows current. Registered as a listener on the
+    availability refresher (holds, bookings, releases, lapsed holds,
+    already coalesced per flight) and on schedule imports; failed
+    refreshes are retried with the next batch.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._retry = set()
+        self._lock = threading.Lock()
+        self.refreshes = 0
+        self.flights_refreshed = 0
+        self.failures = 0
+        self.last_refresh_ms = None
+
+    def refresh(self, flight_ids: Iterable[int]):
+        with self._lock:
+            pending, self._retry = self._retry | set(flight_ids), set()
+        if not pending:
+            return
+        start = time.perf_counter()
+        db = self.session_factory()
+        try:
+            refresh_summaries(db.connection(), pending)
+            db.commit()
+        except Exception:
+            logger.exception("Load summary refresh failed")
+            db.rollback()
+            self.failures += 1
+            with self._lock:
+                self._retry |= pending
+            return
+        finally:
+            db.close()
+        self.refreshes += 1
+        self.flights_refreshed += len(pending)
+        self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def stats(self) -> dict:
+        return {
+            "refreshes": self.refreshes,
+            "flights_refreshed": self.flights_refreshed,
+            "failures": self.failures,
+            "pending_retry": len(self._retry),
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+load_summaries = LoadSummaries()
+availability_refresher.add_listener(load_summaries.refresh)
+on_flights_updated(load_summaries.refresh)
+
+# -------------------------------------------------
+# Reports
+# -------------------------------------------------
+def report_query(group_by: str = "route", date_from: Optional[date] = None, date_to: Optional[date] = None,
+                 route_id: Optional[int] = None, aircraft_id: Optional[int] = None,
+                 include_cancelled: bool = False, source=None):
+    """
+    Totals per route / aircraft / departure date / flight. `source` is
+    the summary table by default; pass rollup_query(...).subquery() to
+    compute the same report from the seats.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    s = SUMMARY if source is None else source
+    key = {"route": s.c.route_id, "aircraft": s.c.aircraft_id,
+           "date": s.c.service_date, "flight": s.c.flight_id}[group_by]
+
+    stmt = select(
+        key.label("key"),
+        func.count().label("flights"),
+        func.sum(s.c.seats_total).label("seats"),
+        func.sum(s.c.seats_booked).label("booked"),
+        func.sum(s.c.seats_held).label("held"),
+        func.sum(s.c.booked_economy).label("booked_economy"),
+        func.sum(s.c.booked_business).label("booked_business"),
+        func.sum(s.c.booked_first).label("booked_first"),
+        func.sum(s.c.revenue).label("revenue"),
+    ).group_by(key).order_by(key)
+    if date_from is not None:
+        stmt = stmt.where(s.c.service_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(s.c.service_date <= date_to)
+    if route_id is not None:
+        stmt = stmt.where(s.c.route_id == route_id)
+    if aircraft_id is not None:
+        stmt = stmt.where(s.c.aircraft_id == aircraft_id)
+    if not include_cancelled:
+        stmt = stmt.where(func.coalesce(s.c.status, "") != "cancelled")
+    return stmt
+
+
+def report_rows(rows) -> List[dict]:
+    report = []
+    for row in rows:
+        seats, booked = int(row.seats or 0), int(row.booked or 0)
+        report.append({
+            "key": row.key.isoformat() if isinstance(row.key, date) else row.key,
+            "flights": row.flights,
+            "seats": seats,
+            "booked": booked,
+            "held": int(row.held or 0),
+            "booked_by_class": {
+                "economy": int(row.booked_economy or 0),
+                "business": int(row.booked_business or 0),
+                "first": int(row.booked_first or 0),
+            },
+            "load_factor": round(booked / seats, 4) if seats else 0.0,
+            "revenue": Decimal(row.revenue or 0).quantize(Decimal("0.01")),
+        })
+    return report
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main():
+    from database import engine  # loads .env
+
+    parser = argparse.ArgumentParser(description="Flight load summaries")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="recompute every flight's summary row")
+    sub.add_parser("backfill", help="add rows for flights that have none")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "rebuild":
+        count = rebuild_summaries(engine)
+    else:
+        with engine.begin() as conn:
+            count = backfill_summaries(conn)
+    print(f"{args.command}: {count} flights in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 # FILE: database.py
 # PostgreSQL configuration for Render deployment
 
+import csv
+import io
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
+from metrics import instrument_queries
+
 # -------------------------------------------------
 # Load environment variables
 # -------------------------------------------------
@@ -16,15 +25,204 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set in environment variables")
 
+# "sync" (psycopg2 on Starlette's threadpool) or "async" (asyncpg / aiosqlite)
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+if DB_MODE not in ("sync", "async"):
+    raise RuntimeError(f"DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in DATABASE_URL for its async counterpart."""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# -------------------------------------------------
+# Connection pool configuration
+# -------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # seconds
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # seconds
+# always: ping on every checkout
+# idle:   ping only connections idle longer than DB_POOL_PING_IDLE seconds
+# never:  rely on recycle + invalidation on error
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+DB_POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "60"))
+
+if DB_POOL_PRE_PING not in ("always", "idle", "never"):
+    raise RuntimeError(f"DB_POOL_PRE_PING must be always, idle or never, got {DB_POOL_PRE_PING!r}")
+
+# -------------------------------------------------
+# Pool instrumentation
+# -------------------------------------------------
+class PoolMetrics:
+    """Counters fed by pool events, plus checkout wait-time histogram."""
+
+    WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.pings = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def observe_wait(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            for i, bound in enumerate(self.WAIT_BUCKETS_MS):
+                if ms <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound}ms": n for bound, n in zip(self.WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets["gt_5000ms"] = self.wait_buckets[-1]
+            data = {
+                "pool": type(pool).__name__,
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "pre_pings": self.pings,
+                "timeouts": self.timeouts,
+                "checkout_wait_ms": {
+                    "count": self.wait_count,
+                    "avg": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    "max": round(self.wait_max_ms, 3),
+                    "buckets": buckets,
+                },
+            }
+        # Live pool state (QueuePool family only)
+        for key, method in (
+            ("size", "size"),
+            ("in_use", "checkedout"),
+            ("idle", "checkedin"),
+            ("overflow", "overflow"),
+        ):
+            if hasattr(pool, method):
+                data[key] = getattr(pool, method)()
+        if "overflow" in data:
+            # QueuePool reports overflow relative to pool_size (negative while under it)
+            data["overflow"] = max(0, data["overflow"])
+        return data
+
+
+def _instrumented(pool_cls):
+    class InstrumentedPool(pool_cls):
+        """Times how long callers wait to get a connection."""
+
+        metrics = None
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                self.metrics.incr("timeouts")
+                raise
+            finally:
+                self.metrics.observe_wait(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_cls.__name__}"
+    return InstrumentedPool
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:"))
+
+
+def pool_options(url: str, pool_cls, metrics: PoolMetrics) -> dict:
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING == "always",
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if _is_memory_sqlite(url):
+        return options  # SingletonThreadPool/StaticPool, nothing to size
+
+    poolclass = _instrumented(pool_cls)
+    poolclass.metrics = metrics
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def instrument_pool(sync_engine, metrics: PoolMetrics):
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr("connects")
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr("checkouts")
+        if DB_POOL_PRE_PING != "idle":
+            return
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < DB_POOL_PING_IDLE:
+            return
+        metrics.incr("pings")
+        try:
+            alive = sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        if not alive:
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError("Idle connection failed pre-ping")
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.incr("checkins")
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("invalidations")
+
+    @event.listens_for(sync_engine, "soft_invalidate")
+    def on_soft_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr("soft_invalidations")
+
 # -------------------------------------------------
 # SQLAlchemy Engine
 # -------------------------------------------------
+pool_metrics = PoolMetrics()
+
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,     # Prevent stale connections
-    pool_recycle=300,       # Render-friendly connection recycling
-    echo=False              # MUST be False in production
+    echo=False,             # MUST be False in production
+    **pool_options(DATABASE_URL, QueuePool, pool_metrics),
 )
+instrument_pool(engine, pool_metrics)
+instrument_queries(engine, "sync")
 
 # -------------------------------------------------
 # Session factory
@@ -35,6 +233,28 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# -------------------------------------------------
+# Async engine / session factory (DB_MODE=async only)
+# -------------------------------------------------
+async_engine = None
+AsyncSessionLocal = None
+async_pool_metrics = None
+
+if DB_MODE == "async":
+    async_pool_metrics = PoolMetrics()
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        **pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics),
+    )
+    instrument_pool(async_engine.sync_engine, async_pool_metrics)
+    instrument_queries(async_engine.sync_engine, "async")
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
 # -------------------------------------------------
 # Declarative base
 # -------------------------------------------------
@@ -49,3 +269,83 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Session used by the hot request paths: AsyncSession in async mode,
+# a regular Session (driven through the threadpool) in sync mode.
+get_session = get_async_db if DB_MODE == "async" else get_db
+
+# -------------------------------------------------
+# Helpers that work with either session type
+# -------------------------------------------------
+async def db_execute(db, statement):
+    if isinstance(db, AsyncSession):
+        return await db.execute(statement)
+    return await run_in_threadpool(db.execute, statement)
+
+async def db_commit(db, *refresh):
+    """Commit, then refresh the given instances."""
+    if isinstance(db, AsyncSession):
+        await db.commit()
+        for instance in refresh:
+            await db.refresh(instance)
+        return
+
+    def commit():
+        db.commit()
+        for instance in refresh:
+            db.refresh(instance)
+
+    await run_in_threadpool(commit)
+
+async def ping_database() -> float:
+    """
+    Round-trip a trivial query on the engine the request paths use.
+    Reuses an idle pooled connection, so it is cheap enough for a probe.
+    Returns the latency in seconds; raises if the database is unreachable.
+    """
+    start = time.perf_counter()
+    if async_engine is not None:
+        async with async_engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+    else:
+        def ping():
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+
+        await run_in_threadpool(ping)
+    return time.perf_counter() - start
+
+def pool_stats() -> dict:
+    stats = {"sync": pool_metrics.snapshot(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = async_pool_metrics.snapshot(async_engine.sync_engine.pool)
+    return stats
+
+# -------------------------------------------------
+# PostgreSQL COPY
+# -------------------------------------------------
+def copy_rows(conn, table, columns, rows):
+    """
+    Stream tuples into `table` with COPY FROM STDIN (psycopg2) inside the
+    connection's current transaction. Much faster than INSERT for bulk
+    loads; only valid on PostgreSQL. Driver errors are raised as
+    SQLAlchemy DBAPIError, as from conn.execute().
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if value is None else value for value in row])
+    buf.seek(0)
+
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    dbapi_error = conn.dialect.loaded_dbapi.Error
+    try:
+        with conn.connection.cursor() as cur:
+            cur.copy_expert(sql, buf)
+    except dbapi_error as e:
+        # Raise what conn.execute() would, so callers' SQLAlchemyError handlers apply
+        raise exc.DBAPIError.instance(sql, None, e, dbapi_error, dialect=conn.dialect) from e
@@ -1,132 +1,417 @@
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-# Email Configuration
-SMTP_HOST = "smtp.gmail.com"  # Change to your SMTP server
-SMTP_PORT = 587
-SMTP_USER = "your-email@gmail.com"  # Change to your email
-SMTP_PASSWORD = "your-app-password"  # Use app-specific password
-FROM_EMAIL = "noreply@skylink-airlines.com"
-FROM_NAME = "SkyLink Airlines"
-
-async def send_email(to_email: str, subject: str, html_content: str):
-    """
-    Send email using SMTP
-    For development: prints email to console
-    For production: actually sends email
-    """
-    
-    # FOR DEVELOPMENT: Just print to console
-    print("=" * 50)
-    print("📧 EMAIL NOTIFICATION")
-    print("=" * 50)
-    print(f"To: {to_email}")
-    print(f"Subject: {subject}")
-    print(f"Content:\n{html_content}")
-    print("=" * 50)
-    
-    # UNCOMMENT FOR PRODUCTION EMAIL SENDING:
-    """
-    message = MIMEMultipart("alternative")
-    message["Subject"] = subject
-    message["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
-    message["To"] = to_email
-    
-    html_part = MIMEText(html_content, "html")
-    message.attach(html_part)
-    
-    try:
-        await aiosmtplib.send(
-            message,
-            hostname=SMTP_HOST,
-            port=SMTP_PORT,
-            username=SMTP_USER,
-            password=SMTP_PASSWORD,
-            start_tls=True,
-        )
-        print(f"✅ Email sent to {to_email}")
-    except Exception as e:
-        print(f"❌ Failed to send email: {e}")
-    """
-
-async def send_verification_email(to_email: str, token: str, user_name: str):
-    """Send email verification link"""
-    verification_link = f"http://127.0.0.1:8000/verify-email?token={token}"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px; }}
-            .container {{ background: white; padding: 30px; border-radius: 10px; max-width: 600px; margin: 0 auto; }}
-            .header {{ background: linear-gradient(135deg, #667eea, #764ba2); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ padding: 20px; }}
-            .button {{ background: #667eea; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; margin: 20px 0; }}
-            .footer {{ text-align: center; color: #666; margin-top: 30px; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>✈️ Welcome to SkyLink Airlines!</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {user_name},</h2>
-                <p>Thank you for registering with SkyLink Airlines!</p>
-                <p>Please verify your email address by clicking the button below:</p>
-                <a href="{verification_link}" class="button">Verify Email Address</a>
-                <p>Or copy this link: <br><code>{verification_link}</code></p>
-                <p>This link will expire in 24 hours.</p>
-            </div>
-            <div class="footer">
-                <p>© 2024 SkyLink Airlines. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    await send_email(to_email, "Verify Your Email - SkyLink Airlines", html_content)
-
-async def send_password_reset_email(to_email: str, token: str, user_name: str):
-    """Send password reset link"""
-    reset_link = f"http://127.0.0.1:8000/reset-password?token={token}"
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px; }}
-            .container {{ background: white; padding: 30px; border-radius: 10px; max-width: 600px; margin: 0 auto; }}
-            .header {{ background: linear-gradient(135deg, #667eea, #764ba2); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
-            .content {{ padding: 20px; }}
-            .button {{ background: #667eea; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; margin: 20px 0; }}
-            .footer {{ text-align: center; color: #666; margin-top: 30px; font-size: 12px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🔐 Password Reset Request</h1>
-            </div>
-            <div class="content">
-                <h2>Hello {user_name},</h2>
-                <p>We received a request to reset your password.</p>
-                <p>Click the button below to reset your password:</p>
-                <a href="{reset_link}" class="button">Reset Password</a>
-                <p>Or copy this link: <br><code>{reset_link}</code></p>
-                <p>This link will expire in 1 hour.</p>
-                <p><strong>If you didn't request this, please ignore this email.</strong></p>
-            </div>
-            <div class="footer">
-                <p>© 2024 SkyLink Airlines. All rights reserved.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    await send_email(to_email, "Password Reset - SkyLink Airlines", html_content)
\ No newline at end of file
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Iterable
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+from sqlalchemy import bindparam, select, update
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from metrics import email_send_latency
+from models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Email Configuration
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")  # Change to your SMTP server
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "your-email@gmail.com")  # Change to your email
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "your-app-password")  # Use app-specific password
+SMTP_START_TLS = os.getenv("SMTP_START_TLS", "true").lower() == "true"
+FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@skylink-airlines.com")
+FROM_NAME = "SkyLink Airlines"
+APP_URL = os.getenv("APP_URL", "http://127.0.0.1:8000")  # base for links in emails
+
+# "console" prints emails (development), "smtp" actually sends them
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "console")
+
+# Delivery worker
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "2"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_SEND_LEASE_SECONDS = int(os.getenv("EMAIL_SEND_LEASE_SECONDS", "300"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+# -------------------------------------------------
+# Transports
+# -------------------------------------------------
+def build_message(to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
+    message["To"] = to_email
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+class ConsoleTransport:
+    """FOR DEVELOPMENT: just print to console"""
+
+    async def send(self, to_email: str, subject: str, html_content: str):
+        print("=" * 50)
+        print("📧 EMAIL NOTIFICATION")
+        print("=" * 50)
+        print(f"To: {to_email}")
+        print(f"Subject: {subject}")
+        print(f"Content:\n{html_content}")
+        print("=" * 50)
+
+    async def close(self):
+        pass
+
+
+class SMTPTransport:
+    """
+    Keeps one authenticated SMTP connection open and reuses it for every
+    message instead of connect + STARTTLS + login per email. A connection
+    idle longer than SMTP_IDLE_SECONDS is checked with NOOP before use and
+    reopened if the server dropped it.
+    """
+
+    def __init__(self, hostname=SMTP_HOST, port=SMTP_PORT, username=SMTP_USER,
+                 password=SMTP_PASSWORD, start_tls=SMTP_START_TLS):
+        self._options = dict(
+            hostname=hostname,
+            port=port,
+            username=username,
+            password=password,
+            start_tls=start_tls,
+        )
+        self._smtp = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    async def _connect(self):
+        import aiosmtplib
+
+        await self.close()
+        self._smtp = aiosmtplib.SMTP(**self._options)
+        await self._smtp.connect()
+        self.connects += 1
+
+    async def _ensure_connected(self):
+        import aiosmtplib
+
+        if self._smtp is None or not self._smtp.is_connected:
+            await self._connect()
+        elif time.monotonic() - self._last_used > SMTP_IDLE_SECONDS:
+            try:
+                await self._smtp.noop()
+            except aiosmtplib.SMTPException:
+                await self._connect()
+
+    async def send(self, to_email: str, subject: str, html_content: str):
+        import aiosmtplib
+
+        message = build_message(to_email, subject, html_content)
+        await self._ensure_connected()
+        try:
+            await self._smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            await self._connect()
+            await self._smtp.send_message(message)
+        self._last_used = time.monotonic()
+
+    async def close(self):
+        import aiosmtplib
+
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None and smtp.is_connected:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                smtp.close()
+
+
+def default_transport():
+    return SMTPTransport() if EMAIL_BACKEND == "smtp" else ConsoleTransport()
+
+
+async def deliver(transport, to_email: str, subject: str, html_content: str):
+    """transport.send(), timed into email_send_duration_seconds."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        await transport.send(to_email, subject, html_content)
+        outcome = "sent"
+    finally:
+        email_send_latency.observe(time.perf_counter() - start, type(transport).__name__, outcome)
+
+# -------------------------------------------------
+# Outbox
+# -------------------------------------------------
+def queue_email(db, to_email: str, subject: str, html_content: str) -> EmailOutbox:
+    """
+    Add a message to the outbox in the caller's transaction; the
+    delivery worker sends it once that transaction commits.
+    """
+    message = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(message)
+    return message
+
+
+async def send_email(to_email: str, subject: str, html_content: str):
+    """
+    Queue an email for background delivery.
+    Returns as soon as the outbox row is committed.
+    """
+    def save():
+        db = SessionLocal()
+        try:
+            queue_email(db, to_email, subject, html_content)
+            db.commit()
+        finally:
+            db.close()
+
+    await run_in_threadpool(save)
+    email_worker.notify()
+
+# -------------------------------------------------
+# Delivery worker
+# -------------------------------------------------
+class EmailDeliveryWorker:
+    """
+    Background task that drains the outbox in batches over one reused
+    transport connection. Failed sends are retried with exponential
+    backoff up to EMAIL_MAX_ATTEMPTS, then marked failed. Claimed rows
+    are leased for EMAIL_SEND_LEASE_SECONDS, so messages claimed by a
+    worker that crashed are picked up again once the lease runs out.
+    """
+
+    def __init__(self, transport=None, session_factory=SessionLocal,
+                 batch_size: int = EMAIL_BATCH_SIZE, poll_seconds: float = EMAIL_POLL_SECONDS):
+        self.transport = transport
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._task = None
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    def start(self):
+        if self._task is not None:
+            return
+        if self.transport is None:
+            self.transport = default_transport()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        self._loop = None
+        await self.transport.close()
+
+    def notify(self):
+        """Wake the worker now instead of at the next poll (thread-safe)."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Email delivery batch failed")
+                claimed = 0
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # -------------------------------------------------
+    # Batches
+    # -------------------------------------------------
+    async def run_once(self) -> int:
+        """Claim and send one batch. Returns the number of messages claimed."""
+        if self.transport is None:
+            self.transport = default_transport()
+        batch = await run_in_threadpool(self._claim)
+        if not batch:
+            return 0
+
+        sent, failures = [], []
+        for row in batch:
+            try:
+                await deliver(self.transport, row.to_email, row.subject, row.html_content)
+                sent.append(row.id)
+            except Exception as e:
+                failures.append((row.id, row.attempts, str(e)[:500]))
+
+        await run_in_threadpool(self._record, sent, failures)
+        self.batches += 1
+        return len(batch)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=EMAIL_SEND_LEASE_SECONDS)
+        due = (
+            EmailOutbox.status.in_(("pending", "sending")),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        db = self.session_factory()
+        try:
+            ids = db.execute(
+                select(EmailOutbox.id)
+                .where(*due)
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not ids:
+                db.rollback()
+                return []
+            # Re-checking "due" keeps two workers from claiming the same rows
+            # on databases without SKIP LOCKED; the lease timestamp tells
+            # which rows this worker won.
+            db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(ids), *due)
+                .values(status="sending", attempts=EmailOutbox.attempts + 1,
+                        next_attempt_at=lease_until)
+                .execution_options(synchronize_session=False)
+            )
+            rows = db.execute(
+                select(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject,
+                       EmailOutbox.html_content, EmailOutbox.attempts)
+                .where(EmailOutbox.id.in_(ids), EmailOutbox.next_attempt_at == lease_until)
+                .order_by(EmailOutbox.id)
+            ).all()
+            db.commit()
+            return rows
+        finally:
+            db.close()
+
+    def _record(self, sent, failures):
+        now = datetime.utcnow()
+        table = EmailOutbox.__table__
+        retries, dead = [], []
+        for message_id, attempts, error in failures:
+            if attempts >= EMAIL_MAX_ATTEMPTS:
+                dead.append({"message_id": message_id, "error": error})
+            else:
+                delay = min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+                retries.append({
+                    "message_id": message_id,
+                    "error": error,
+                    "retry_at": now + timedelta(seconds=delay),
+                })
+
+        db = self.session_factory()
+        try:
+            if sent:
+                db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .values(status="sent", sent_at=now, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            if retries:
+                db.connection().execute(
+                    update(table)
+                    .where(table.c.id == bindparam("message_id"))
+                    .values(status="pending", last_error=bindparam("error"),
+                            next_attempt_at=bindparam("retry_at")),
+                    retries,
+                )
+            if dead:
+                db.connection().execute(
+                    update(table)
+                    .where(table.c.id == bindparam("message_id"))
+                    .values(status="failed", last_error=bindparam("error")),
+                    dead,
+                )
+            db.commit()
+        finally:
+            db.close()
+
+        self.sent += len(sent)
+        self.retried += len(retries)
+        self.failed += len(dead)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.transport).__name__ if self.transport else None,
+            "running": self._task is not None,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "smtp_connects": getattr(self.transport, "connects", None),
+        }
+
+
+email_worker = EmailDeliveryWorker()
+
+# -------------------------------------------------
+# Templates
+# -------------------------------------------------
+def verification_email(token: str, user_name: str):
+    """Subject and HTML for the email verification link"""
+    from email_templates import render_email
+
+    return render_email(
+        "verification",
+        user_name=user_name,
+        verification_link=f"{APP_URL}/verify-email?token={token}",
+    )
+
+def password_reset_email(token: str, user_name: str):
+    """Subject and HTML for the password reset link"""
+    from email_templates import render_email
+
+    return render_email(
+        "password_reset",
+        user_name=user_name,
+        reset_link=f"{APP_URL}/reset-password?token={token}",
+    )
+
+def flight_delay_emails(flight: dict, passengers: Iterable[dict]):
+    """
+    (subject, html) per passenger of a delayed flight. ``flight`` holds
+    flight_number, origin, destination, departure_datetime and gate;
+    each passenger dict holds user_name and optionally seat_number.
+    """
+    from email_templates import render_batch
+
+    return render_batch("flight_delay", passengers, **flight)
+
+async def send_verification_email(to_email: str, token: str, user_name: str):
+    """Send email verification link"""
+    subject, html_content = verification_email(token, user_name)
+    await send_email(to_email, subject, html_content)
+
+async def send_password_reset_email(to_email: str, token: str, user_name: str):
+    """Send password reset link"""
+    subject, html_content = password_reset_email(token, user_name)
+    await send_email(to_email, subject, html_content)
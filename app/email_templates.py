@@ -0,0 +1,141 @@
+# FILE: email_templates.py
+# Email templates: compiled once, CSS inlined at load time
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Tuple
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+TEMPLATE_DIR = Path(os.getenv("EMAIL_TEMPLATE_DIR", Path(__file__).parent / "templates" / "email"))
+STYLESHEET = "styles.css"
+
+# kind -> (subject template, body template)
+EMAILS = {
+    "verification": ("Verify Your Email - SkyLink Airlines", "verification.html"),
+    "password_reset": ("Password Reset - SkyLink Airlines", "password_reset.html"),
+    "flight_delay": ("Flight {{ flight_number }} is delayed - SkyLink Airlines", "flight_delay.html"),
+}
+
+# -------------------------------------------------
+# CSS inlining
+# -------------------------------------------------
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>")
+_ATTR = re.compile(r'\s(class|style)="([^"]*)"')
+
+
+def parse_stylesheet(css: str) -> Dict[str, str]:
+    """Map simple selectors ("td", ".button") to their declarations."""
+    rules: Dict[str, str] = {}
+    for selectors, declarations in _RULE.findall(css):
+        declarations = " ".join(declarations.split()).rstrip("; ")
+        for selector in selectors.split(","):
+            selector = selector.strip()
+            rules[selector] = f"{rules[selector]}; {declarations}" if selector in rules else declarations
+    return rules
+
+
+def inline_css(html: str, rules: Dict[str, str]) -> str:
+    """
+    Copy matching rules into each tag's style attribute. Element rules
+    come first, then classes in attribute order, then any existing inline
+    style, so the usual cascade order is preserved.
+    """
+    def replace(match):
+        tag, attrs, closing = match.group(1), match.group(2) or "", match.group(3)
+        found = dict(_ATTR.findall(attrs))
+        styles = [rules[tag.lower()]] if tag.lower() in rules else []
+        styles += [rules["." + c] for c in found.get("class", "").split() if "." + c in rules]
+        if not styles:
+            return match.group(0)
+        if "style" in found:
+            styles.append(found["style"])
+            attrs = _ATTR.sub(lambda m: "" if m.group(1) == "style" else m.group(0), attrs)
+        return f'<{tag}{attrs} style="{"; ".join(styles)}"{closing}>'
+
+    return _TAG.sub(replace, html)
+
+
+class InliningLoader(FileSystemLoader):
+    """FileSystemLoader that inlines the shared stylesheet into template source."""
+
+    def __init__(self, searchpath, stylesheet: str = STYLESHEET):
+        super().__init__(searchpath)
+        self.stylesheet = stylesheet
+        self._rules = None
+
+    def rules(self, environment) -> Dict[str, str]:
+        if self._rules is None:
+            css, _, _ = super().get_source(environment, self.stylesheet)
+            self._rules = parse_stylesheet(css)
+        return self._rules
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        if template.endswith(".html"):
+            source = inline_css(source, self.rules(environment))
+        return source, filename, uptodate
+
+    def list_templates(self):
+        return [t for t in super().list_templates() if t.endswith(".html")]
+
+# -------------------------------------------------
+# Environment
+# -------------------------------------------------
+env = Environment(
+    loader=InliningLoader(str(TEMPLATE_DIR)),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,   # templates only change with a deploy
+    cache_size=-1,       # never evict a compiled template
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+# Subjects are plain text headers: no HTML escaping
+subject_env = Environment(autoescape=False, cache_size=-1)
+
+
+class EmailTemplate(NamedTuple):
+    subject: Template
+    body: Template
+
+
+_compiled: Dict[str, EmailTemplate] = {}
+
+
+def load_templates() -> int:
+    """Compile every email template (and its layout) up front. Returns the count."""
+    for kind, (subject, body) in EMAILS.items():
+        if kind not in _compiled:
+            _compiled[kind] = EmailTemplate(subject_env.from_string(subject), env.get_template(body))
+    return len(_compiled)
+
+
+def get_template(kind: str) -> EmailTemplate:
+    template = _compiled.get(kind)
+    if template is None:
+        load_templates()
+        template = _compiled[kind]
+    return template
+
+# -------------------------------------------------
+# Rendering
+# -------------------------------------------------
+def render_email(kind: str, **context) -> Tuple[str, str]:
+    """(subject, html) for one recipient."""
+    template = get_template(kind)
+    return template.subject.render(context), template.body.render(context)
+
+
+def render_batch(kind: str, recipients: Iterable[dict], **shared) -> Iterator[Tuple[str, str]]:
+    """
+    (subject, html) for each recipient context, layered over the
+    context shared by the whole campaign (e.g. the delayed flight).
+    Lookups and template compilation happen once for the batch.
+    """
+    template = get_template(kind)
+    subject_render, body_render = template.subject.render, template.body.render
+    for recipient in recipients:
+        context = {**shared, **recipient}
+        yield subject_render(context), body_render(context)
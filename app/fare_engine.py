@@ -0,0 +1,285 @@
+# FILE: fare_engine.py
+# Dynamic fares from load factor and time to departure, priced in NumPy batches
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from models import Aircraft, Flight, Route
+from reference_cache import reference_cache
+from reservations import availability_refresher
+from schedules import on_flights_updated
+from seat_availability import seat_availability
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+SEAT_CLASSES = ("economy", "business", "first")
+FARE_LOAD_BUCKETS = int(os.getenv("FARE_LOAD_BUCKETS", "10"))
+FARE_MIN_MULTIPLIER = float(os.getenv("FARE_MIN_MULTIPLIER", "0.85"))    # empty flight
+FARE_MAX_MULTIPLIER = float(os.getenv("FARE_MAX_MULTIPLIER", "1.75"))    # last seats
+FARE_MEMO_FLIGHTS = int(os.getenv("FARE_MEMO_FLIGHTS", "20000"))
+
+# Days before departure -> multiplier: [0, 3) 1.70, [3, 7) 1.45, ..., 60+ 0.90
+ADVANCE_DAYS = np.array([3, 7, 14, 30, 60], dtype=np.float64)
+ADVANCE_MULTIPLIERS = np.array([1.70, 1.45, 1.25, 1.10, 1.00, 0.90])
+
+# Multiplier per load bucket: flat while the flight is empty, steep near full
+LOAD_MULTIPLIERS = FARE_MIN_MULTIPLIER + (FARE_MAX_MULTIPLIER - FARE_MIN_MULTIPLIER) * (
+    np.arange(FARE_LOAD_BUCKETS) / max(1, FARE_LOAD_BUCKETS - 1)
+) ** 2
+
+# -------------------------------------------------
+# Vectorized pricing
+# -------------------------------------------------
+def load_buckets(available: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """Sold fraction in FARE_LOAD_BUCKETS steps; the last bucket includes a full cabin."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        load = 1.0 - available / capacity
+    load = np.nan_to_num(load, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.clip((load * FARE_LOAD_BUCKETS).astype(np.int64), 0, FARE_LOAD_BUCKETS - 1)
+
+
+def advance_tiers(days: np.ndarray) -> np.ndarray:
+    return np.searchsorted(ADVANCE_DAYS, days, side="right")
+
+
+def price_arrays(base: np.ndarray, available: np.ndarray, capacity: np.ndarray,
+                 days: np.ndarray) -> np.ndarray:
+    """
+    Fares for any number of (flight, class) cells at once. All arguments
+    broadcast against each other; sold-out or unpriced cells are NaN.
+    """
+    base = np.asarray(base, dtype=np.float64)
+    available = np.asarray(available, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    prices = (base
+              * LOAD_MULTIPLIERS[load_buckets(available, capacity)]
+              * ADVANCE_MULTIPLIERS[advance_tiers(np.asarray(days, dtype=np.float64))])
+    prices = np.round(prices, 2)
+    prices[(available <= 0) | (capacity <= 0)] = np.nan
+    return prices
+
+
+def to_decimal(price: float) -> Optional[Decimal]:
+    return None if price != price else Decimal(f"{price:.2f}")  # NaN -> None
+
+
+def fare_dicts(flight_ids: np.ndarray, prices: np.ndarray,
+               only: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Optional[Decimal]]]:
+    """
+    Priced rows -> {flight_id: {class: fare}} in batch order. With `only`,
+    just those flights are converted: price, filter and sort on the
+    arrays, then pay for Decimals on the page actually returned.
+    """
+    if only is not None:
+        keep = np.isin(flight_ids, np.fromiter(only, dtype=np.int64))
+        flight_ids, prices = flight_ids[keep], prices[keep]
+    # Fares repeat across a page (same route, same bucket), so convert each value once
+    decimals: Dict[float, Decimal] = {}
+
+    def convert(price: float) -> Optional[Decimal]:
+        if price != price:  # NaN
+            return None
+        value = decimals.get(price)
+        if value is None:
+            value = decimals[price] = to_decimal(price)
+        return value
+
+    return {
+        flight_id: {cls: convert(p) for cls, p in zip(SEAT_CLASSES, row)}
+        for flight_id, row in zip(flight_ids.tolist(), prices.tolist())
+    }
+
+
+NAN = float("nan")
+EPOCH = datetime(1970, 1, 1)
+
+
+def epoch_seconds(when: datetime) -> float:
+    return (when - EPOCH).total_seconds()
+
+
+def days_until(departures: np.ndarray, now: datetime) -> np.ndarray:
+    """Departures as naive-UTC epoch seconds -> fractional days from now."""
+    return (departures - epoch_seconds(now)) / 86400.0
+
+# -------------------------------------------------
+# Inputs
+# -------------------------------------------------
+def fare_inputs_query(flight_ids: Iterable[int]):
+    return (
+        select(
+            Flight.id, Flight.departure_datetime,
+            Flight.available_economy, Flight.available_business, Flight.available_first,
+            Route.base_price_economy, Route.base_price_business, Route.base_price_first,
+            Aircraft.economy_seats, Aircraft.business_seats, Aircraft.first_class_seats,
+        )
+        .join(Route, Flight.route_id == Route.id)
+        .join(Aircraft, Flight.aircraft_id == Aircraft.id)
+        .where(Flight.id.in_(list(flight_ids)))
+    )
+
+
+class FareBatch:
+    """Column arrays for a result set: one row per flight, one column per class."""
+
+    __slots__ = ("flight_ids", "departures", "available", "base", "capacity")
+
+    def __init__(self, rows: Sequence):
+        n = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 11
+        self.flight_ids = np.fromiter(columns[0], dtype=np.int64, count=n)
+        self.departures = np.fromiter(map(epoch_seconds, columns[1]), dtype=np.float64, count=n)
+        # Numeric(10, 2) columns arrive as Decimal; float() per value beats np.array(dtype=object)
+        table = np.empty((9, n), dtype=np.float64)
+        for i, column in enumerate(columns[2:11]):
+            missing = NAN if 3 <= i < 6 else 0.0  # no base price -> no fare
+            table[i] = np.fromiter((missing if v is None else float(v) for v in column), dtype=np.float64, count=n)
+        self.available = table[0:3].T
+        self.base = table[3:6].T
+        self.capacity = table[6:9].T
+
+    def prices(self, now: Optional[datetime] = None) -> np.ndarray:
+        days = days_until(self.departures, now or datetime.utcnow())
+        return price_arrays(self.base, self.available, self.capacity, days[:, None])
+
+# -------------------------------------------------
+# Engine
+# -------------------------------------------------
+class FareEngine:
+    """
+    Batch pricing for search results, and memoized single-flight quotes.
+
+    A quote depends only on (flight, class, load bucket, advance tier) and
+    the route/aircraft versions, so the memo stays valid while seats sell
+    within a bucket. The reservation refresher drops a flight's quotes
+    whenever it recounts its availability.
+    """
+
+    def __init__(self, maxsize: int = FARE_MEMO_FLIGHTS):
+        self.maxsize = maxsize
+        # flight_id -> {"static": (departure, base[3], capacity[3], versions), "quotes": {...}}
+        self._flights: "OrderedDict[int, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.batch_cells = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # -------------------------------------------------
+    # Batches
+    # -------------------------------------------------
+    def price_batch(self, batch: FareBatch, now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Raw fares for a FareBatch: float64 of shape (flights, 3) in
+        batch.flight_ids x SEAT_CLASSES order, NaN where a class is
+        sold out or unpriced. Nothing is converted to Decimal.
+        """
+        prices = batch.prices(now)
+        self.batches += 1
+        self.batch_cells += prices.size
+        return prices
+
+    def price_rows(self, rows: Sequence, now: Optional[datetime] = None,
+                   only: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Optional[Decimal]]]:
+        """Rows from fare_inputs_query() -> {flight_id: {class: fare}}, see fare_dicts()."""
+        if not rows:
+            return {}
+        batch = FareBatch(rows)
+        return fare_dicts(batch.flight_ids, self.price_batch(batch, now), only)
+
+    # -------------------------------------------------
+    # Single flight (memoized)
+    # -------------------------------------------------
+    def _versions(self):
+        return reference_cache.version("routes"), reference_cache.version("aircraft")
+
+    def _static(self, db, flight_id: int):
+        versions = self._versions()
+        with self._lock:
+            entry = self._flights.get(flight_id)
+            if entry is not None and entry["static"][3] == versions:
+                self._flights.move_to_end(flight_id)
+                return entry
+        row = db.execute(fare_inputs_query([flight_id])).first()
+        if row is None:
+            return None
+        entry = {
+            "static": (row[1], np.array(row[5:8], dtype=np.float64), np.array(row[8:11], dtype=np.float64), versions),
+            "quotes": {},
+        }
+        with self._lock:
+            self._flights[flight_id] = entry
+            self._flights.move_to_end(flight_id)
+            while len(self._flights) > self.maxsize:
+                self._flights.popitem(last=False)
+        return entry
+
+    def quote(self, db, flight_id: int, now: Optional[datetime] = None) -> Optional[Dict[str, Optional[Decimal]]]:
+        """Current fare per class from live seat counts, or None if the flight does not exist."""
+        entry = self._static(db, flight_id)
+        counts = seat_availability.availability(db, flight_id) if entry is not None else None
+        if counts is None:
+            return None
+        now = now or datetime.utcnow()
+        departure, base, capacity, _ = entry["static"]
+        available = np.array([counts.get(c, 0) for c in SEAT_CLASSES], dtype=np.float64)
+        buckets = load_buckets(available, capacity).tolist()
+        tier = int(advance_tiers(np.array([(departure - now).total_seconds() / 86400]))[0])
+
+        quotes = entry["quotes"]
+        fares, missing = {}, []
+        for i, cls in enumerate(SEAT_CLASSES):
+            key = (cls, buckets[i], tier, available[i] > 0)
+            if key in quotes:
+                fares[cls] = quotes[key]
+            else:
+                missing.append((i, cls, key))
+        self.hits += len(SEAT_CLASSES) - len(missing)
+        if missing:
+            self.misses += len(missing)
+            days = (departure - now).total_seconds() / 86400
+            prices = price_arrays(base, available, capacity, days).tolist()
+            for i, cls, key in missing:
+                fares[cls] = quotes[key] = to_decimal(prices[i])
+        return {cls: fares[cls] for cls in SEAT_CLASSES}
+
+    def invalidate(self, flight_ids: Iterable[int]):
+        """Drop memoized quotes after a flight's availability changed."""
+        with self._lock:
+            for flight_id in flight_ids:
+                entry = self._flights.get(flight_id)
+                if entry is not None and entry["quotes"]:
+                    entry["quotes"] = {}
+                    self.invalidations += 1
+
+    def forget(self, flight_ids: Iterable[int]):
+        """Drop everything cached for flights whose schedule changed."""
+        with self._lock:
+            for flight_id in flight_ids:
+                self._flights.pop(flight_id, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "memo_flights": len(self._flights),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "batches": self.batches,
+            "batch_cells": self.batch_cells,
+        }
+
+
+fare_engine = FareEngine()
+availability_refresher.add_listener(fare_engine.invalidate)
+on_flights_updated(fare_engine.forget)
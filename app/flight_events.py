@@ -0,0 +1,444 @@
+# FILE: flight_events.py
+# Live flight status / seat availability for server-sent event streams
+
+import asyncio
+import json
+import logging
+import os
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from database import SessionLocal
+from models import Flight
+from reservations import availability_refresher
+from schedules import on_flights_updated
+
+logger = logging.getLogger(__name__)
+
+FLIGHT_EVENTS_BACKEND = os.getenv("FLIGHT_EVENTS_BACKEND", "local")              # local | redis
+FLIGHT_EVENTS_COALESCE_MS = int(os.getenv("FLIGHT_EVENTS_COALESCE_MS", "250"))
+FLIGHT_EVENTS_HEARTBEAT = float(os.getenv("FLIGHT_EVENTS_HEARTBEAT", "15"))      # seconds
+# Streams end after this long and EventSource reconnects (to any worker);
+# this also bounds how long open streams can hold up a graceful shutdown.
+FLIGHT_EVENTS_MAX_AGE = float(os.getenv("FLIGHT_EVENTS_MAX_AGE", "300"))         # seconds
+FLIGHT_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("FLIGHT_EVENTS_MAX_SUBSCRIBERS", "10000"))
+FLIGHT_EVENTS_CHANNEL = os.getenv("FLIGHT_EVENTS_CHANNEL", "flight-events")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+SNAPSHOT_CHUNK = 500   # flights per snapshot query
+REDIS_RECONNECT_MIN = 0.5   # seconds, doubling up to the max while Redis is unreachable
+REDIS_RECONNECT_MAX = 30.0
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+CLOSED = object()   # returned by Subscription.next() once the broker shuts down
+
+
+def snapshot_query(flight_ids: Iterable[int]):
+    return select(
+        Flight.id, Flight.flight_number, Flight.status, Flight.gate,
+        Flight.departure_datetime, Flight.arrival_datetime,
+        Flight.available_economy, Flight.available_business, Flight.available_first,
+    ).where(Flight.id.in_(list(flight_ids)))
+
+
+def snapshot_dict(row) -> dict:
+    return {
+        "flight_id": row.id,
+        "flight_number": row.flight_number,
+        "status": row.status,
+        "gate": row.gate,
+        "departure_datetime": row.departure_datetime.isoformat(),
+        "arrival_datetime": row.arrival_datetime.isoformat(),
+        "available": {
+            "economy": row.available_economy or 0,
+            "business": row.available_business or 0,
+            "first": row.available_first or 0,
+        },
+    }
+
+
+def sse_event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+# -------------------------------------------------
+# Backends: carry "these flights changed" between workers
+# -------------------------------------------------
+class LocalBackend:
+    """Single process: a publish is delivered straight back to this broker."""
+
+    async def start(self, deliver: Callable[[List[int]], None], resync: Callable[[], None] = None):
+        self._deliver = deliver
+
+    async def publish(self, flight_ids: List[int]):
+        self._deliver(flight_ids)
+
+    async def stop(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Every worker subscribes to one Redis channel; a change published by
+    any of them (or by a script) reaches all, and each worker then loads
+    the snapshot once for its own subscribers. If the connection drops
+    it is re-established with backoff, and `resync` then reloads every
+    watched flight, since changes published meanwhile were missed.
+    """
+
+    def __init__(self, url: str = REDIS_URL, channel: str = FLIGHT_EVENTS_CHANNEL):
+        import redis.asyncio as redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url)
+        self.channel = channel
+        self._task = None
+
+    async def start(self, deliver: Callable[[List[int]], None], resync: Callable[[], None] = None):
+        pubsub = await self._subscribe()   # fail at startup if Redis is unreachable
+        self._task = asyncio.get_running_loop().create_task(self._listen(pubsub, deliver, resync))
+
+    async def _subscribe(self):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self.channel)
+        except BaseException:
+            await pubsub.close()
+            raise
+        return pubsub
+
+    async def _listen(self, pubsub, deliver, resync):
+        loop = asyncio.get_running_loop()
+        delay = REDIS_RECONNECT_MIN
+        connected_at = loop.time()
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = await self._subscribe()
+                    connected_at = loop.time()
+                    logger.info("Flight events resubscribed to Redis channel %s", self.channel)
+                    if resync is not None:
+                        resync()
+                async for message in pubsub.listen():
+                    try:
+                        deliver([int(i) for i in message["data"].split(b",") if i])
+                    except ValueError:
+                        logger.warning("Ignoring malformed flight event %r", message["data"][:100])
+                reason = "subscription ended"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                reason = f"{type(e).__name__}: {e}"
+            finally:
+                if pubsub is not None:
+                    await asyncio.gather(pubsub.close(), return_exceptions=True)
+                    pubsub = None
+            if loop.time() - connected_at > REDIS_RECONNECT_MAX:
+                delay = REDIS_RECONNECT_MIN   # had been up a while: not the same outage
+            logger.warning("Flight events lost Redis channel %s (%s); reconnecting in %.1fs",
+                           self.channel, reason, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, REDIS_RECONNECT_MAX)
+
+    async def publish(self, flight_ids: List[int]):
+        await self._redis.publish(self.channel, ",".join(map(str, flight_ids)))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._redis.aclose()
+
+
+def default_backend():
+    return RedisBackend() if FLIGHT_EVENTS_BACKEND == "redis" else LocalBackend()
+
+# -------------------------------------------------
+# Subscriptions
+# -------------------------------------------------
+class Subscription:
+    """
+    Holds only the latest snapshot: a slow client skips intermediate
+    states instead of building a queue, so memory per client is fixed.
+    """
+
+    __slots__ = ("flight_id", "_latest", "_event", "closed", "skipped", "sent")
+
+    def __init__(self, flight_id: int):
+        self.flight_id = flight_id
+        self._latest = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.skipped = 0
+        self.sent = 0
+
+    def offer(self, snapshot: dict):
+        if self._latest is not None:
+            self.skipped += 1
+        self._latest = snapshot
+        self._event.set()
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    async def next(self, timeout: float):
+        """The next snapshot, None after `timeout` seconds without one, or CLOSED."""
+        if self._latest is None and not self.closed:
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._event.clear()
+        if self.closed:
+            return CLOSED
+        snapshot, self._latest = self._latest, None
+        self.sent += 1
+        return snapshot
+
+# -------------------------------------------------
+# Broker
+# -------------------------------------------------
+class FlightEventBroker:
+    """
+    Fan-out of flight snapshots to stream subscribers. Changes arrive as
+    flight ids (from the availability refresher thread, schedule imports,
+    or other workers through the backend); within each
+    FLIGHT_EVENTS_COALESCE_MS window the watched ones are loaded with one
+    query and pushed to every subscriber, so N clients on a flight cost
+    one read, not N.
+    """
+
+    def __init__(self, backend=None, session_factory=SessionLocal,
+                 coalesce_ms: int = FLIGHT_EVENTS_COALESCE_MS,
+                 max_subscribers: int = FLIGHT_EVENTS_MAX_SUBSCRIBERS):
+        self.backend = backend if backend is not None else default_backend()
+        self.session_factory = session_factory
+        self.interval = coalesce_ms / 1000
+        self.max_subscribers = max_subscribers
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._snapshots: Dict[int, dict] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._dirty: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop = None
+        self._task = None
+        self.subscriber_count = 0
+        self.published = 0
+        self.flushes = 0
+        self.snapshot_queries = 0
+        self.deliveries = 0
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await self.backend.start(self._changed, self._resync)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.backend.stop()
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in subscriptions:
+                subscription.close()
+        self._loop = None
+
+    # -------------------------------------------------
+    # Publishing (any thread)
+    # -------------------------------------------------
+    def publish(self, flight_ids: Iterable[int]):
+        """Announce that these flights' rows changed (after commit)."""
+        loop = self._loop
+        flight_ids = list(flight_ids)
+        if loop is None or not flight_ids:
+            return
+        self.published += 1
+        loop.call_soon_threadsafe(self._publish_on_loop, flight_ids)
+
+    def _publish_on_loop(self, flight_ids: List[int]):
+        task = self._loop.create_task(self.backend.publish(flight_ids))
+        task.add_done_callback(self._log_publish_error)
+
+    @staticmethod
+    def _log_publish_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Publishing flight events failed: %s", task.exception())
+
+    def _changed(self, flight_ids: List[int]):
+        """Backend delivery, on the event loop."""
+        watched = [f for f in flight_ids if f in self._subscribers]
+        if watched:
+            self._dirty.update(watched)
+            self._wakeup.set()
+
+    def _resync(self):
+        """Backend reconnected after missing publishes: reload every watched flight."""
+        self._changed(list(self._subscribers))
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.interval)   # let more changes to the same flights pile up
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, set()
+            try:
+                await self.flush(dirty)
+            except Exception:
+                logger.exception("Flight event flush failed")
+
+    async def flush(self, flight_ids: Iterable[int]):
+        watched = [f for f in flight_ids if f in self._subscribers]
+        if not watched:
+            return
+        snapshots = await run_in_threadpool(self._load, watched)
+        self.flushes += 1
+        for flight_id in watched:
+            snapshot = snapshots.get(flight_id)
+            if snapshot is None or snapshot == self._snapshots.get(flight_id):
+                continue   # deleted, or nothing a client can see changed
+            self._deliver(flight_id, snapshot)
+
+    def _deliver(self, flight_id: int, snapshot: dict):
+        subscriptions = self._subscribers.get(flight_id)
+        if not subscriptions:
+            return
+        self._snapshots[flight_id] = snapshot
+        for subscription in subscriptions:
+            subscription.offer(snapshot)
+        self.deliveries += len(subscriptions)
+
+    def _load(self, flight_ids: List[int]) -> Dict[int, dict]:
+        db = self.session_factory()
+        try:
+            snapshots = {}
+            for i in range(0, len(flight_ids), SNAPSHOT_CHUNK):
+                for row in db.execute(snapshot_query(flight_ids[i:i + SNAPSHOT_CHUNK])):
+                    snapshots[row.id] = snapshot_dict(row)
+                self.snapshot_queries += 1
+            return snapshots
+        finally:
+            db.close()
+
+    # -------------------------------------------------
+    # Subscribers (event loop)
+    # -------------------------------------------------
+    async def subscribe(self, flight_id: int) -> Optional[Subscription]:
+        """
+        A subscription primed with the current snapshot, or None if the
+        flight does not exist. Concurrent first subscribers to a flight
+        share one load; later ones get the cached snapshot.
+        """
+        if self.subscriber_count >= self.max_subscribers:
+            raise TooManySubscribers(f"{self.subscriber_count} streams open")
+        snapshot = self._snapshots.get(flight_id)
+        if snapshot is None:
+            loading = self._loading.get(flight_id)
+            if loading is None:
+                loading = self._loading[flight_id] = asyncio.get_running_loop().create_future()
+                try:
+                    loaded = (await run_in_threadpool(self._load, [flight_id])).get(flight_id)
+                    loading.set_result(loaded)
+                except Exception as e:
+                    loading.set_exception(e)
+                    raise
+                finally:
+                    self._loading.pop(flight_id, None)
+            snapshot = await asyncio.shield(loading)
+            if snapshot is None:
+                return None
+
+        subscription = Subscription(flight_id)
+        subscribers = self._subscribers.setdefault(flight_id, set())
+        if not subscribers:
+            self._snapshots[flight_id] = snapshot
+        subscribers.add(subscription)
+        self.subscriber_count += 1
+        subscription.offer(self._snapshots[flight_id])
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.flight_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        self.subscriber_count -= 1
+        if not subscribers:
+            del self._subscribers[subscription.flight_id]
+            self._snapshots.pop(subscription.flight_id, None)
+
+    async def stream(self, subscription: Subscription, heartbeat: float = FLIGHT_EVENTS_HEARTBEAT,
+                     max_age: float = FLIGHT_EVENTS_MAX_AGE):
+        """text/event-stream body for one subscription; unsubscribes when the client goes away."""
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + max_age
+        version = 0
+        try:
+            yield f"retry: {int(self.interval * 1000) + 2000}\n\n"
+            while True:
+                remaining = ends_at - loop.time()
+                if remaining <= 0:
+                    return
+                snapshot = await subscription.next(min(heartbeat, remaining))
+                if snapshot is CLOSED:
+                    return
+                if snapshot is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                version += 1
+                yield sse_event("flight", snapshot, version)
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "subscribers": self.subscriber_count,
+            "flights_watched": len(self._subscribers),
+            "published": self.published,
+            "flushes": self.flushes,
+            "snapshot_queries": self.snapshot_queries,
+            "deliveries": self.deliveries,
+        }
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    The event stream for a subscription taken before the response starts.
+    Unsubscribes however the response ends, including when the client is
+    gone before the stream body is first iterated (and its finally never runs).
+    """
+
+    def __init__(self, broker: FlightEventBroker, subscription: Subscription):
+        super().__init__(
+            broker.stream(subscription),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self._unsubscribe = partial(broker.unsubscribe, subscription)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._unsubscribe()
+
+
+flight_event_broker = FlightEventBroker()
+availability_refresher.add_listener(flight_event_broker.publish)
+on_flights_updated(flight_event_broker.publish)
@@ -0,0 +1,112 @@
+# FILE: flight_search.py
+# Flight search query with keyset (cursor) pagination
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
+
+from models import Airport, Flight, Route
+
+# Statuses a passenger can still book
+BOOKABLE_STATUSES = ("scheduled", "delayed")
+
+SEAT_CLASS_COLUMNS = {
+    "economy": Flight.available_economy,
+    "business": Flight.available_business,
+    "first": Flight.available_first,
+}
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+# -------------------------------------------------
+# Cursor encoding
+# -------------------------------------------------
+def encode_cursor(departure: datetime, flight_id: int) -> str:
+    raw = json.dumps([departure.isoformat(), flight_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        departure, flight_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(departure), int(flight_id)
+    except (ValueError, TypeError):
+        raise InvalidSearch("Invalid cursor")
+
+
+# -------------------------------------------------
+# Query builder
+# -------------------------------------------------
+def build_search_query(
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    departure_date: Optional[str] = None,
+    seat_class: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+):
+    """
+    Flights ordered by (departure_datetime, id). Each page continues
+    strictly after the cursor row, so deep pages cost the same as the
+    first one (no OFFSET scan). Fetches limit + 1 rows so the caller can
+    tell whether another page exists.
+    """
+    stmt = select(Flight).where(Flight.status.in_(BOOKABLE_STATUSES))
+
+    if origin or destination:
+        stmt = stmt.join(Route, Flight.route_id == Route.id).where(Route.is_active.is_(True))
+    if origin:
+        origin_airport = aliased(Airport)
+        stmt = stmt.join(origin_airport, Route.origin_airport_id == origin_airport.id)
+        stmt = stmt.where(origin_airport.code == origin.upper())
+    if destination:
+        destination_airport = aliased(Airport)
+        stmt = stmt.join(destination_airport, Route.destination_airport_id == destination_airport.id)
+        stmt = stmt.where(destination_airport.code == destination.upper())
+
+    if departure_date:
+        try:
+            day = date.fromisoformat(departure_date)
+        except ValueError:
+            raise InvalidSearch("departure_date must be YYYY-MM-DD")
+        start = datetime.combine(day, datetime.min.time())
+        stmt = stmt.where(
+            Flight.departure_datetime >= start,
+            Flight.departure_datetime < start + timedelta(days=1),
+        )
+
+    if seat_class:
+        column = SEAT_CLASS_COLUMNS.get(seat_class.lower())
+        if column is None:
+            raise InvalidSearch("seat_class must be economy, business or first")
+        stmt = stmt.where(column > 0)
+
+    if cursor:
+        after_departure, after_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Flight.departure_datetime > after_departure,
+            and_(Flight.departure_datetime == after_departure, Flight.id > after_id),
+        ))
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return stmt.order_by(Flight.departure_datetime, Flight.id).limit(limit + 1), limit
+
+
+def paginate(flights, limit: int):
+    """Split a limit + 1 result into (page, next_cursor)."""
+    page = flights[:limit]
+    next_cursor = None
+    if len(flights) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last.departure_datetime, last.id)
+    return page, next_cursor
@@ -1,62 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Body
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, status, File, UploadFile, Body, Query, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import math
 import secrets
+import tempfile
 import os
-from pathlib import Path
-from dotenv import load_dotenv
-
-# -------------------------------------------------
-# Load environment variables
-# -------------------------------------------------
-load_dotenv()
 
 # -------------------------------------------------
 # Import database, models, schemas
+# (database.py loads .env; the schema is created by migrate.py, not here)
 # -------------------------------------------------
-from database import get_db, engine, Base
-from models import User, UserRole, ActivityLog
-from schemas import UserCreate, UserResponse, UserLogin
-
-# -------------------------------------------------
-# Create database tables
-# -------------------------------------------------
-Base.metadata.create_all(bind=engine)
-
-# -------------------------------------------------
-# Initialize FastAPI app
-# -------------------------------------------------
-app = FastAPI(
-    title="SkyLink Airlines - User Management System",
-    description="Complete user management module with authentication",
-    version="2.0.0",
+from database import get_db, get_session, db_execute, db_commit, pool_stats, ping_database, engine, SessionLocal
+from models import User, UserRole, Flight, Route, Aircraft, Airport
+from schemas import (
+    UserCreate, UserResponse, UserLogin,
+    FlightSearch, FlightSearchResponse, ItineraryResponse,
+    SeatHoldRequest, SeatHoldResponse,
+    FlightCreate, FlightResponse, PricedFlightResponse, FareQuoteResponse,
+    NotificationRequest, NotificationCampaignResponse,
+    ActivityLogResponse, ProfilePhotoResponse,
+    AirportCreate, AirportResponse, AircraftCreate, AircraftResponse, RouteCreate, RouteResponse,
+    ScheduleImportResponse, LoadReportRow,
 )
-
-# -------------------------------------------------
-# CORS CONFIGURATION
-# -------------------------------------------------
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["https://airline-frontend-rjej.onrender.com"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from password_hashing import password_hasher, HashQueueFull
+from user_cache import user_cache, UserSnapshot
+from activity_writer import activity_writer
+from flight_search import build_search_query, paginate, InvalidSearch
+from seat_maps import generate_seat_maps
+from route_graph import find_connections
+from reservations import (
+    hold_seat, confirm_hold, release_hold,
+    availability_refresher, SeatUnavailable, HoldNotFound,
+)
+from seat_availability import seat_availability
+from email_service import email_worker, queue_email, verification_email
+from notifications import notifier, create_campaign, campaign_progress, InvalidCampaign
+from token_auth import TokenVerifier, TokenClaims, InvalidToken
+from rate_limit import login_limiter, client_ip
+from activity_logs import history_query, paginate as paginate_history, ensure_partitions
+from reference_cache import reference_cache, etag_matches
+from metrics import registry, MetricsMiddleware
+from analytics import load_summaries, report_query, report_rows, GROUP_BY
+from flight_events import flight_event_broker, EventStreamResponse, TooManySubscribers
+from schedules import import_file, export_chunks, get_kind, InvalidSchedule, FORMATS, MEDIA_TYPES
+from profile_photos import (
+    photo_store, CachingStaticFiles, PhotoTooLarge, UnsupportedPhoto,
+    UPLOAD_DIR, STATIC_DIR, PHOTO_MAX_BYTES,
 )
 
-# -------------------------------------------------
-# Static files
-# -------------------------------------------------
-if os.path.exists("static"):
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-
-UPLOAD_DIR = Path("static/uploads/profiles")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 # -------------------------------------------------
 # Security configuration
@@ -68,123 +69,819 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY is not set in environment variables")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+token_verifier = TokenVerifier(SECRET_KEY, ALGORITHM)
 
 # -------------------------------------------------
 # Helper functions
 # -------------------------------------------------
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when a rehash is due."""
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 def create_access_token(
     data: dict,
     expires_delta: Optional[timedelta] = None
 ) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": now, "jti": secrets.token_hex(16)})
+    from jose import jwt  # deferred: pulls in the crypto backends
+
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def generate_token() -> str:
     return secrets.token_urlsafe(32)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-):
-    credentials_exception = HTTPException(
+async def get_user_by_email(db, email: str):
+    result = await db_execute(db, select(User).where(User.email == email))
+    return result.scalars().first()
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> TokenClaims:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if not email:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise credentials_exception
+        return token_verifier.verify(credentials.credentials)
+    except InvalidToken:
+        raise credentials_exception()
+
+async def get_current_user(
+    claims: TokenClaims = Depends(get_token_claims),
+    db=Depends(get_session),
+) -> UserSnapshot:
+    email = claims.sub
+    user = user_cache.get(email)
+    if user is None:
+        db_user = await get_user_by_email(db, email)
+        if not db_user:
+            raise credentials_exception()
+        user = user_cache.put(email, UserSnapshot.from_user(db_user))
+
+    if not user.is_active:
+        raise credentials_exception()
 
     return user
 
+def require_admin(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
+    if current_user.role != UserRole.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 def log_activity(
-    db: Session,
     user_id: int,
     action: str,
     details: Optional[str] = None,
 ):
-    activity = ActivityLog(
+    """Queue an activity log entry; written in batches in the background."""
+    activity_writer.log(
+        user_id=user_id,
+        action=action,
+        details=details,
+        ip_address="render-client",
+        timestamp=datetime.utcnow(),
+    )
+
+async def log_activity_async(
+    user_id: int,
+    action: str,
+    details: Optional[str] = None,
+):
+    """log_activity for async handlers: never stalls the event loop on a full queue."""
+    await activity_writer.log_async(
         user_id=user_id,
         action=action,
         details=details,
         ip_address="render-client",
         timestamp=datetime.utcnow(),
     )
-    db.add(activity)
-    db.commit()
+
+# -------------------------------------------------
+# Password hashing admission control
+# -------------------------------------------------
+async def hash_queue_full_handler(request, exc):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+# -------------------------------------------------
+# Startup / shutdown
+# -------------------------------------------------
+def load_revoked_tokens():
+    db = SessionLocal()
+    try:
+        token_verifier.load(db)
+    finally:
+        db.close()
+
+def warm_lazy_modules():
+    from email_templates import load_templates
+    import fare_engine  # noqa: F401  (NumPy)
+
+    load_templates()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    load_revoked_tokens()
+    token_verifier.start(SessionLocal)
+    with engine.begin() as conn:
+        ensure_partitions(conn)  # no-op unless activity_logs is partitioned
+    activity_writer.start()
+    availability_refresher.start()
+    email_worker.start()
+    await notifier.resume_all()
+    await flight_event_broker.start()
+    # Templates and NumPy load off the event loop; first use would load them on demand anyway
+    asyncio.get_running_loop().run_in_executor(None, warm_lazy_modules)
+
+    yield
+
+    await flight_event_broker.stop()   # ends open event streams
+    await notifier.stop()
+    await email_worker.stop()
+    availability_refresher.stop()
+    activity_writer.stop()
+    photo_store.shutdown()
+    password_hasher.shutdown()
+    token_verifier.stop()
+
+router = APIRouter()
 
 # -------------------------------------------------
 # HEALTH CHECK
 # -------------------------------------------------
-@app.get("/api/health")
+HEALTH_DB_TIMEOUT = float(os.getenv("HEALTH_DB_TIMEOUT", "2"))  # seconds
+
+@router.get("/api/health")
 async def health_check():
+    """Readiness: 200 only if a pooled connection answers SELECT 1 in time."""
+    try:
+        latency = await asyncio.wait_for(ping_database(), HEALTH_DB_TIMEOUT)
+    except Exception as e:
+        # The reason stays in the server log: driver errors can carry hosts and usernames
+        logger.warning("Health check: database unavailable (%s: %s)", type(e).__name__, e)
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={
+            "status": "unavailable",
+            "database": engine.dialect.name,
+            "detail": "database unavailable",
+        })
     return {
         "status": "healthy",
         "message": "SkyLink Airlines API is running",
-        "database": "PostgreSQL",
+        "database": engine.dialect.name,
+        "database_latency_ms": round(latency * 1000, 2),
         "version": "2.0.0",
     }
 
+# -------------------------------------------------
+# METRICS
+# -------------------------------------------------
+@registry.collector
+def component_metrics():
+    """Counters the pools and caches already keep, read at scrape time."""
+    for mode, pool in pool_stats().items():
+        for key in ("size", "in_use", "idle", "overflow"):
+            if key in pool:
+                yield f"db_pool_{mode}_{key}", "gauge", f"Connections ({key}) in the {mode} pool", pool[key]
+        for key in ("checkouts", "timeouts", "invalidations"):
+            yield f"db_pool_{mode}_{key}_total", "counter", f"Pool {key} ({mode})", pool[key]
+    for name, stats in (("user_cache", user_cache.stats()), ("reference_cache", reference_cache.stats())):
+        yield f"{name}_hits_total", "counter", f"{name} hits", stats["hits"]
+        yield f"{name}_misses_total", "counter", f"{name} misses", stats["misses"]
+    email = email_worker.stats()
+    for key in ("sent", "retried", "failed"):
+        yield f"email_{key}_total", "counter", f"Outbox messages {key}", email[key]
+    limits = login_limiter.stats()
+    yield "login_rate_limited_total", "counter", "Login attempts rejected with 429", limits["rejected"]
+    yield "password_hash_pending", "gauge", "bcrypt jobs queued or running", password_hasher.pending
+    yield "flight_event_subscribers", "gauge", "Open flight event streams", flight_event_broker.subscriber_count
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/api/metrics/user-cache")
+async def user_cache_metrics():
+    return user_cache.stats()
+
+@router.get("/api/metrics/activity-log")
+async def activity_log_metrics():
+    return activity_writer.stats()
+
+@router.get("/api/metrics/db-pool")
+async def db_pool_metrics():
+    return pool_stats()
+
+@router.get("/api/metrics/seat-maps")
+async def seat_map_metrics():
+    return seat_availability.stats()
+
+@router.get("/api/metrics/email")
+async def email_metrics():
+    return email_worker.stats()
+
+@router.get("/api/metrics/auth")
+async def auth_metrics():
+    return token_verifier.stats()
+
+@router.get("/api/metrics/rate-limit")
+async def rate_limit_metrics():
+    return login_limiter.stats()
+
+@router.get("/api/metrics/reference-cache")
+async def reference_cache_metrics():
+    return reference_cache.stats()
+
+@router.get("/api/metrics/fares")
+async def fare_metrics():
+    from fare_engine import fare_engine
+
+    return fare_engine.stats()
+
+@router.get("/api/metrics/analytics")
+def analytics_metrics():
+    return load_summaries.stats()
+
+@router.get("/api/metrics/flight-events")
+async def flight_event_metrics():
+    return flight_event_broker.stats()
+
+@router.get("/api/metrics/photos")
+async def photo_metrics():
+    return photo_store.stats()
+
 # -------------------------------------------------
 # USER REGISTRATION
 # -------------------------------------------------
-@app.post("/api/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user.email).first()
+@router.post("/api/register", response_model=UserResponse)
+async def register_user(user: UserCreate, db=Depends(get_session)):
+    existing = await get_user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed = get_password_hash(user.password)
+    hashed = await get_password_hash(user.password)
     new_user = User(
         email=user.email,
         full_name=user.full_name,
-        password=hashed,
-        role=UserRole.USER,
+        hashed_password=hashed,
+        role=UserRole.PASSENGER,
+        verification_token=generate_token(),
+        verification_token_expires=datetime.utcnow() + timedelta(hours=24),
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
 
-    # Optional: send verification email
-    # send_verification_email(new_user.email, generate_token())
+    # Verification email goes into the outbox in the same transaction
+    subject, html_content = verification_email(new_user.verification_token, new_user.full_name)
+    queue_email(db, new_user.email, subject, html_content)
+    await db_commit(db, new_user)
+    email_worker.notify()
 
-    log_activity(db, new_user.id, "register", f"User {new_user.email} registered")
+    await log_activity_async(new_user.id, "register", f"User {new_user.email} registered")
 
     return new_user
 
 # -------------------------------------------------
 # USER LOGIN
 # -------------------------------------------------
-@app.post("/api/login")
-def login_user(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password):
+@router.post("/api/login")
+async def login_user(user: UserLogin, request: Request, db=Depends(get_session)):
+    # Throttle before any database or bcrypt work
+    retry_after = await login_limiter.check_async(client_ip(request), user.email)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    db_user = await get_user_by_email(db, user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    valid, new_hash = await verify_password(user.password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Cost factor changed since this hash was made: store the upgraded hash
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db_commit(db)
+
     token = create_access_token({"sub": db_user.email})
-    log_activity(db, db_user.id, "login", f"User {db_user.email} logged in")
+    await log_activity_async(db_user.id, "login", f"User {db_user.email} logged in")
     return {"access_token": token, "token_type": "bearer"}
 
+# -------------------------------------------------
+# LOGOUT / FORCED SIGN-OUT
+# -------------------------------------------------
+@router.post("/api/logout")
+def logout_user(
+    claims: TokenClaims = Depends(get_token_claims),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    token_verifier.revoke(db, claims)
+    log_activity(current_user.id, "logout", f"User {current_user.email} logged out")
+    return {"message": "Logged out"}
+
+@router.post("/api/admin/users/{user_id}/sign-out")
+def force_sign_out(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    user = db.get(User, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    token_verifier.revoke_subject(db, user.email, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    log_activity(admin.id, "forced_sign_out", f"Signed out {user.email}")
+    return {"message": f"All sessions of {user.email} revoked"}
+
+# -------------------------------------------------
+# PROFILE PHOTO
+# -------------------------------------------------
+@router.put("/api/users/me/photo", response_model=ProfilePhotoResponse)
+async def upload_profile_photo(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db=Depends(get_session),
+):
+    """
+    The request body is the image itself (e.g. fetch(url, {method: "PUT",
+    body: file})), streamed to disk; the type is taken from its magic bytes.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photo must be at most {PHOTO_MAX_BYTES} bytes")
+    try:
+        photo = await photo_store.save(request.stream())
+    except PhotoTooLarge:
+        raise HTTPException(status_code=413, detail=f"Photo must be at most {PHOTO_MAX_BYTES} bytes")
+    except UnsupportedPhoto as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    await db_execute(db, update(User).where(User.id == current_user.id).values(profile_photo=photo.url))
+    await db_commit(db)
+    await log_activity_async(current_user.id, "profile_photo", f"Uploaded photo {photo.digest[:12]}")
+
+    return ProfilePhotoResponse(
+        profile_photo=photo.url,
+        thumbnails=photo.thumbnails,
+        content_type=photo.content_type,
+        size=photo.size,
+        deduplicated=photo.deduplicated,
+    )
+
+# -------------------------------------------------
+# ACTIVITY LOGS
+# -------------------------------------------------
+@router.get("/api/activity-logs", response_model=List[ActivityLogResponse])
+async def get_activity_logs(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db=Depends(get_session),
+):
+    """Newest first; the next page's cursor is returned in X-Next-Cursor."""
+    try:
+        stmt, limit = history_query(current_user.id, cursor, limit)
+    except InvalidSearch as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rows = (await db_execute(db, stmt)).all()
+    page, next_cursor = paginate_history(rows, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+# -------------------------------------------------
+# REFERENCE DATA (airports, aircraft, routes)
+# -------------------------------------------------
+async def cached_list(name: str, request: Request, db) -> Response:
+    """Serve the pre-serialized list, or 304 if the client already has it."""
+    cached = await reference_cache.get(db, name)
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@router.get("/api/airports", response_model=List[AirportResponse])
+async def list_airports(request: Request, db=Depends(get_session)):
+    return await cached_list("airports", request, db)
+
+@router.get("/api/aircraft", response_model=List[AircraftResponse])
+async def list_aircraft(request: Request, db=Depends(get_session)):
+    return await cached_list("aircraft", request, db)
+
+@router.get("/api/routes", response_model=List[RouteResponse])
+async def list_routes(request: Request, db=Depends(get_session)):
+    return await cached_list("routes", request, db)
+
+@router.post("/api/airports", response_model=AirportResponse)
+def create_airport(
+    airport: AirportCreate,
+    admin: UserSnapshot = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    code = airport.code.upper()
+    if db.query(Airport.id).filter(Airport.code == code).first():
+        raise HTTPException(status_code=400, detail="Airport code already exists")
+    new_airport = Airport(**{**airport.model_dump(), "code": code})
+    db.add(new_airport)
+    db.commit()  # bumps the cached airports list
+    db.refresh(new_airport)
+    log_activity(admin.id, "airport_created", f"Airport {new_airport.code}")
+    return new_airport
+
+@router.post("/api/aircraft", response_model=AircraftResponse)
+def create_aircraft(
+    aircraft: AircraftCreate,
+    admin: UserSnapshot = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    if aircraft.economy_seats + aircraft.business_seats + aircraft.first_class_seats != aircraft.total_seats:
+        raise HTTPException(status_code=400, detail="Seat classes must add up to total_seats")
+    if db.query(Aircraft.id).filter(Aircraft.aircraft_number == aircraft.aircraft_number).first():
+        raise HTTPException(status_code=400, detail="Aircraft number already exists")
+    new_aircraft = Aircraft(**aircraft.model_dump())
+    db.add(new_aircraft)
+    db.commit()
+    db.refresh(new_aircraft)
+    log_activity(admin.id, "aircraft_created", f"Aircraft {new_aircraft.aircraft_number}")
+    return new_aircraft
+
+@router.post("/api/routes", response_model=RouteResponse)
+def create_route(
+    route: RouteCreate,
+    admin: UserSnapshot = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    if route.origin_airport_id == route.destination_airport_id:
+        raise HTTPException(status_code=400, detail="Origin and destination must differ")
+    for airport_id in (route.origin_airport_id, route.destination_airport_id):
+        if db.get(Airport, airport_id) is None:
+            raise HTTPException(status_code=404, detail=f"Airport {airport_id} not found")
+    new_route = Route(**route.model_dump())
+    db.add(new_route)
+    db.commit()
+    db.refresh(new_route)
+    log_activity(admin.id, "route_created", f"Route {new_route.id}")
+    return new_route
+
+# -------------------------------------------------
+# FLIGHT MANAGEMENT
+# -------------------------------------------------
+@router.post("/api/flights", response_model=FlightResponse)
+def create_flight(
+    flight: FlightCreate,
+    admin: UserSnapshot = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    if flight.arrival_datetime <= flight.departure_datetime:
+        raise HTTPException(status_code=400, detail="Arrival must be after departure")
+    if db.get(Route, flight.route_id) is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    if db.get(Aircraft, flight.aircraft_id) is None:
+        raise HTTPException(status_code=404, detail="Aircraft not found")
+    if db.query(Flight.id).filter(Flight.flight_number == flight.flight_number).first():
+        raise HTTPException(status_code=400, detail="Flight number already exists")
+
+    new_flight = Flight(**flight.model_dump(), status="scheduled")
+    db.add(new_flight)
+    db.flush()
+
+    # Seat rows and available_* counters, in the same transaction
+    generate_seat_maps(db.connection(), [new_flight.id])
+    db.commit()
+    db.refresh(new_flight)
+
+    availability_refresher.mark_dirty(new_flight.id)  # load summary row
+    log_activity(admin.id, "flight_created", f"Flight {new_flight.flight_number}")
+    return new_flight
+
+# -------------------------------------------------
+# FLIGHT SEARCH
+# -------------------------------------------------
+@router.get("/api/flights/search", response_model=FlightSearchResponse)
+async def search_flights(
+    search: FlightSearch = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db=Depends(get_session),
+):
+    try:
+        stmt, limit = build_search_query(
+            origin=search.origin,
+            destination=search.destination,
+            departure_date=search.departure_date,
+            seat_class=search.seat_class,
+            cursor=cursor,
+            limit=limit,
+        )
+    except InvalidSearch as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    from fare_engine import fare_engine, fare_inputs_query
+
+    result = await db_execute(db, stmt)
+    flights, next_cursor = paginate(result.scalars().all(), limit)
+    # The whole page is priced in one query and one vectorized pass
+    fares = {}
+    if flights:
+        rows = (await db_execute(db, fare_inputs_query(f.id for f in flights))).all()
+        fares = fare_engine.price_rows(rows)
+    return {
+        "flights": [
+            PricedFlightResponse.model_validate(f, from_attributes=True).model_copy(
+                update={"fares": fares.get(f.id, {})}
+            )
+            for f in flights
+        ],
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/api/flights/connections", response_model=List[ItineraryResponse])
+async def search_connections(
+    origin: str,
+    destination: str,
+    departure_date: date,
+    max_stops: int = Query(2, ge=0, le=2),
+    min_layover: int = Query(45, ge=0),
+    max_layover: int = Query(360, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db=Depends(get_session),
+):
+    if min_layover > max_layover:
+        raise HTTPException(status_code=400, detail="min_layover must not exceed max_layover")
+
+    itineraries = await find_connections(
+        db, origin, destination, departure_date,
+        max_stops=max_stops,
+        min_layover=min_layover,
+        max_layover=max_layover,
+        limit=limit,
+    )
+    return [
+        {
+            "legs": it.legs,
+            "stops": len(it.legs) - 1,
+            "departure_datetime": it.departure,
+            "arrival_datetime": it.arrival,
+            "total_duration_minutes": it.total_minutes,
+        }
+        for it in itineraries
+    ]
+
+# -------------------------------------------------
+# SEAT RESERVATION
+# -------------------------------------------------
+@router.post("/api/flights/{flight_id}/holds", response_model=SeatHoldResponse)
+def create_seat_hold(
+    flight_id: int,
+    request: SeatHoldRequest,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if not request.seat_number and not request.seat_class:
+        raise HTTPException(status_code=400, detail="Provide seat_number or seat_class")
+    try:
+        return hold_seat(
+            db, flight_id, current_user.id,
+            seat_class=request.seat_class.lower() if request.seat_class else None,
+            seat_number=request.seat_number,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SeatUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.post("/api/flights/{flight_id}/seats/{seat_number}/confirm", response_model=SeatHoldResponse)
+def confirm_seat_hold(
+    flight_id: int,
+    seat_number: str,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        seat = confirm_hold(db, flight_id, seat_number, current_user.id)
+    except HoldNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    log_activity(current_user.id, "seat_booked", f"Flight {flight_id} seat {seat_number}")
+    return seat
+
+@router.delete("/api/flights/{flight_id}/seats/{seat_number}/hold")
+def release_seat_hold(
+    flight_id: int,
+    seat_number: str,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        release_hold(db, flight_id, seat_number, current_user.id)
+    except HoldNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Hold released"}
+
+@router.get("/api/flights/{flight_id}/availability")
+def flight_availability(flight_id: int, db: Session = Depends(get_db)):
+    counts = seat_availability.availability(db, flight_id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return counts
+
+@router.get("/api/flights/{flight_id}/fares", response_model=FareQuoteResponse)
+def flight_fares(flight_id: int, db: Session = Depends(get_db)):
+    from fare_engine import fare_engine
+
+    fares = fare_engine.quote(db, flight_id)
+    if fares is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return {"flight_id": flight_id, "fares": fares}
+
+@router.get("/api/flights/{flight_id}/events")
+async def flight_events(flight_id: int):
+    """
+    Server-sent events: a "flight" event with status, gate, times and
+    seats left per class, first immediately and then on every change.
+    Use with EventSource; it reconnects on its own when a stream ends.
+    """
+    try:
+        subscription = await flight_event_broker.subscribe(flight_id)
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many live streams, retry later",
+                            headers={"Retry-After": "30"})
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return EventStreamResponse(flight_event_broker, subscription)
+
+@router.get("/api/flights/{flight_id}/seat-map")
+def flight_seat_map(flight_id: int, db: Session = Depends(get_db)):
+    seat_map = seat_availability.seat_map(db, flight_id)
+    if seat_map is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return seat_map
+
+# -------------------------------------------------
+# FLIGHT NOTIFICATIONS (admin)
+# -------------------------------------------------
+@router.post(
+    "/api/flights/{flight_id}/notifications",
+    response_model=NotificationCampaignResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def notify_passengers(
+    flight_id: int,
+    request: NotificationRequest,
+    db=Depends(get_session),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    flight = (await db_execute(db, select(Flight.id).where(Flight.id == flight_id))).first()
+    if flight is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    try:
+        campaign = create_campaign(db, flight_id, request.kind)
+    except InvalidCampaign as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db_commit(db, campaign)
+
+    notifier.launch(campaign.id)
+    log_activity(admin.id, "notification_campaign", f"{request.kind} for flight {flight_id}")
+    return {
+        "id": campaign.id, "flight_id": flight_id, "kind": campaign.kind, "status": campaign.status,
+        "sent": 0, "failed": 0, "unconfirmed": 0,
+        "created_at": campaign.created_at, "completed_at": None,
+    }
+
+@router.get("/api/notifications/{campaign_id}", response_model=NotificationCampaignResponse)
+def notification_progress(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    progress = campaign_progress(db, campaign_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Notification campaign not found")
+    return progress
+
+# -------------------------------------------------
+# ANALYTICS (admin)
+# -------------------------------------------------
+@router.get("/api/analytics/load-factors", response_model=List[LoadReportRow])
+async def load_factor_report(
+    group_by: str = Query("route"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    route_id: Optional[int] = None,
+    aircraft_id: Optional[int] = None,
+    include_cancelled: bool = False,
+    db=Depends(get_session),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    """
+    Load factor, bookings and revenue per route, aircraft, departure date
+    (daily boardings) or flight, read from the per-flight summaries.
+    """
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUP_BY)}")
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to is before date_from")
+    result = await db_execute(db, report_query(
+        group_by, date_from, date_to, route_id, aircraft_id, include_cancelled))
+    return report_rows(result.all())
+
+# -------------------------------------------------
+# SCHEDULE IMPORT / EXPORT (admin)
+# -------------------------------------------------
+def schedule_kind_and_format(kind: str, format: str):
+    try:
+        get_kind(kind)
+    except InvalidSchedule as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+
+@router.post("/api/admin/schedules/{kind}", response_model=ScheduleImportResponse)
+async def import_schedule(
+    kind: str,
+    request: Request,
+    format: str = Query("csv"),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    """
+    The request body is the CSV / NDJSON file. It is spooled (to disk past
+    8 MB) and imported in batched transactions on a worker thread.
+    """
+    schedule_kind_and_format(kind, format)
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        report = await run_in_threadpool(import_file, engine, kind, spool, format)
+
+    await log_activity_async(admin.id, "schedule_import",
+                             f"{kind}: {report.inserted} inserted, {report.updated} updated, {report.rejected} rejected")
+    return report.as_dict()
+
+@router.get("/api/admin/schedules/{kind}")
+def export_schedule(
+    kind: str,
+    format: str = Query("csv"),
+    admin: UserSnapshot = Depends(require_admin),
+):
+    schedule_kind_and_format(kind, format)
+    return StreamingResponse(
+        export_chunks(engine, kind, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+    )
+
+# -------------------------------------------------
+# Application factory
+# -------------------------------------------------
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="SkyLink Airlines - User Management System",
+        description="Complete user management module with authentication",
+        version="2.0.0",
+        lifespan=lifespan,
+    )
+
+    # CORS CONFIGURATION
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://airline-frontend-rjej.onrender.com"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+
+    # Static files; the directory may only appear once the first photo is uploaded
+    app.mount("/static", CachingStaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
+
+    # Outermost, so latency covers every other middleware
+    app.add_middleware(MetricsMiddleware)
+
+    app.add_exception_handler(HashQueueFull, hash_queue_full_handler)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
+
 # -------------------------------------------------
 # Uvicorn (Render compatible)
 # -------------------------------------------------
@@ -0,0 +1,268 @@
+# FILE: metrics.py
+# Process-local counters / gauges / histograms in Prometheus text format
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# -------------------------------------------------
+# Metric types
+# -------------------------------------------------
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative buckets, sum and count per label set, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}   # labels -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+# -------------------------------------------------
+# Registry
+# -------------------------------------------------
+_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Registry:
+    """
+    Owned metrics plus collectors: callables returning
+    (name, kind, help, value) tuples read at scrape time, used to expose
+    the counters the caches and pools already keep.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, help, value in collect():
+                name = _NAME.sub("_", name)
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# -------------------------------------------------
+# Metrics recorded across the app
+# -------------------------------------------------
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time to last response byte, by route template", ("method", "route"))
+http_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+db_query_latency = registry.histogram(
+    "db_query_duration_seconds", "Statement execution time by kind", ("engine", "statement"))
+password_hash_latency = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt hash / verify time including queueing", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+password_hash_rejected = registry.counter(
+    "password_hash_rejected_total", "Hash jobs refused because the queue was full")
+email_send_latency = registry.histogram(
+    "email_send_duration_seconds", "Time for one transport send", ("transport", "outcome"))
+
+# -------------------------------------------------
+# ASGI middleware
+# -------------------------------------------------
+class MetricsMiddleware:
+    """
+    Records in-flight requests, status codes and latency per route
+    template ("/api/flights/{flight_id}/seat-map"), so path parameters
+    do not create one series per flight. Unmatched paths share a label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = route_label(scope)
+            http_latency.observe(time.perf_counter() - start, scope["method"], route)
+            http_requests.inc(scope["method"], route, str(status))
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if "endpoint" in scope:  # inside a Mount, e.g. /static
+        mount = scope.get("root_path", "")[len(scope.get("app_root_path", "")):]
+        return mount.rstrip("/") + "/*"
+    return "<unmatched>"
+
+# -------------------------------------------------
+# Database statement timing
+# -------------------------------------------------
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def statement_kind(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in _STATEMENT_KINDS else "OTHER"
+
+
+def instrument_queries(sync_engine, label: str):
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        db_query_latency.observe(time.perf_counter() - started, label, statement_kind(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        stack = context.connection.info.get("query_start") if context.connection is not None else None
+        if stack:
+            stack.pop()
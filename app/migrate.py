@@ -0,0 +1,159 @@
+# FILE: migrate.py
+# Schema setup, run once per deploy before the web process starts
+#
+#   python migrate.py            (from the app directory)
+#
+# Render: add it to the build or pre-deploy command, e.g.
+#   pip install -r requirements.txt && python migrate.py
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from database import Base, engine
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from activity_logs import ensure_partitions
+from analytics import backfill_summaries
+
+# Columns added to tables that already existed. create_all never ALTERs
+# an existing table, so older databases get them here.
+ADDED_COLUMNS = {
+    "seats": ("held_by", "held_until"),      # seat holds
+}
+
+
+def add_missing_columns(conn) -> list:
+    """ALTER TABLE ... ADD COLUMN for every ADDED_COLUMNS entry the database lacks."""
+    inspector = inspect(conn)
+    added = []
+    for table_name, names in ADDED_COLUMNS.items():
+        table = Base.metadata.tables[table_name]
+        existing = {c["name"] for c in inspector.get_columns(table_name)}
+        for name in names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            ddl = str(CreateColumn(column).compile(dialect=conn.dialect))
+            for fk in column.foreign_keys:
+                ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+                if fk.ondelete:
+                    ddl += f" ON DELETE {fk.ondelete}"
+            if_not_exists = "IF NOT EXISTS " if conn.dialect.name == "postgresql" else ""
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {if_not_exists}{ddl}"))
+            added.append(f"{table_name}.{name}")
+    return added
+
+# Indexes added to tables that already existed; create_all skips an
+# existing table together with its indexes
+ADDED_INDEXES = {
+    "activity_logs": ("ix_activity_logs_user_timestamp",),     # activity history paging
+    "routes": ("ix_routes_origin_destination",),                # flight search
+    "flights": ("ix_flights_route_departure_status",),          # flight search keyset
+    "seats": ("ux_seats_flight_seat_number",                    # seat holds
+              "ix_seats_flight_class_available"),
+}
+
+
+class MigrationError(RuntimeError):
+    """The database needs manual attention before migrate can finish."""
+
+
+def _duplicate_seats(conn):
+    rows = conn.execute(text(
+        "SELECT flight_id, seat_number, COUNT(*) FROM seats "
+        "GROUP BY flight_id, seat_number HAVING COUNT(*) > 1 "
+        "ORDER BY flight_id, seat_number"
+    )).all()
+    if not rows:
+        return None
+    sample = ", ".join(f"flight {f} seat {n} ({c} rows)" for f, n, c in rows[:10])
+    return (
+        f"ux_seats_flight_seat_number not built: {len(rows)} (flight_id, seat_number) pairs "
+        f"have more than one seats row, e.g. {sample}. Remove the extra rows and run migrate again."
+    )
+
+
+# Run before building a unique index; a message means "do not build it"
+INDEX_CHECKS = {
+    "ux_seats_flight_seat_number": _duplicate_seats,
+}
+
+
+def _pg_index_state(conn, name: str):
+    """None if the index does not exist, else whether it is valid."""
+    return conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_catalog.pg_table_is_visible(c.oid)"
+    ), {"name": name}).scalar()
+
+
+def _pg_is_partitioned(conn, table_name: str) -> bool:
+    return conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:name)"
+    ), {"name": table_name}).scalar() is True
+
+
+def add_missing_indexes(engine) -> list:
+    """
+    Build every ADDED_INDEXES entry the database lacks. PostgreSQL builds
+    them CONCURRENTLY (outside a transaction) so writes continue; an
+    invalid index left behind by an interrupted build is dropped and
+    rebuilt. Indexes whose INDEX_CHECKS entry reports a problem are
+    skipped, and MigrationError lists the problems once the rest are built.
+    """
+    created, problems = [], []
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        postgres = conn.dialect.name == "postgresql"
+        inspector = inspect(conn)
+        for table_name, names in ADDED_INDEXES.items():
+            table = Base.metadata.tables[table_name]
+            existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+            for name in names:
+                state = _pg_index_state(conn, name) if postgres else (True if name in existing else None)
+                if state is True:
+                    continue
+                check = INDEX_CHECKS.get(name)
+                problem = check(conn) if check else None
+                if problem:
+                    problems.append(problem)
+                    continue
+
+                index = next(ix for ix in table.indexes if ix.name == name)
+                if not postgres:
+                    index.create(conn, checkfirst=True)
+                    created.append(name)
+                    continue
+                concurrently = not _pg_is_partitioned(conn, table_name)
+                if state is False:
+                    conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}{name}"))
+                ddl = str(CreateIndex(index).compile(dialect=conn.dialect))
+                if concurrently:
+                    ddl = ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+                conn.execute(text(ddl))
+                created.append(name)
+    if problems:
+        raise MigrationError("\n".join(problems))
+    return created
+
+
+def migrate():
+    """
+    Create missing tables and indexes, add columns and indexes that
+    older databases lack, this month's activity log partitions, and load
+    summaries for flights that have none.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        created = ensure_partitions(conn)
+        backfill_summaries(conn)
+    add_missing_indexes(engine)
+    return created
+
+
+if __name__ == "__main__":
+    try:
+        created = migrate()
+    except MigrationError as e:
+        raise SystemExit(f"migrate: {e}")
+    print(f"schema up to date ({engine.dialect.name}); partitions created: {created or 'none'}")
@@ -4,13 +4,17 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
+    Date,
     ForeignKey,
     Numeric,
     Enum,
+    Index,
+    Text,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import os
 
 from database import Base
 
@@ -64,10 +68,16 @@ class User(Base):
     )
 
 
+# Monthly range partitions on PostgreSQL (new databases only: an existing
+# plain table has to be migrated by hand). The partition key must be part
+# of the primary key, hence (id, timestamp).
+ACTIVITY_LOG_PARTITIONED = os.getenv("ACTIVITY_LOG_PARTITIONING", "false").lower() == "true"
+
+
 class ActivityLog(Base):
     __tablename__ = "activity_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -76,11 +86,34 @@ class ActivityLog(Base):
     action = Column(String(100), nullable=False)
     details = Column(String(500))
     ip_address = Column(String(50))
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(
+        DateTime,
+        default=datetime.utcnow,
+        primary_key=ACTIVITY_LOG_PARTITIONED,
+    )
 
     # Relationships
     user = relationship("User", back_populates="activity_logs")
 
+    __table_args__ = (
+        # Per-user history, newest first
+        Index("ix_activity_logs_user_timestamp", user_id, timestamp.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (timestamp)"} if ACTIVITY_LOG_PARTITIONED else {},
+    )
+
+
+class ActivityLogArchive(Base):
+    """Rows moved out of activity_logs by the retention job (non-partitioned setups)."""
+    __tablename__ = "activity_logs_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    action = Column(String(100), nullable=False)
+    details = Column(String(500))
+    ip_address = Column(String(50))
+    timestamp = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
 # =========================
 # AIRCRAFT
 # =========================
@@ -159,6 +192,10 @@ class Route(Base):
     )
     flights = relationship("Flight", back_populates="route")
 
+    __table_args__ = (
+        Index("ix_routes_origin_destination", "origin_airport_id", "destination_airport_id"),
+    )
+
 # =========================
 # FLIGHT & SEAT
 # =========================
@@ -189,6 +226,11 @@ class Flight(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Flight search: route + departure window + status, in departure order
+        Index("ix_flights_route_departure_status", "route_id", "departure_datetime", "status"),
+    )
+
 
 class Seat(Base):
     __tablename__ = "seats"
@@ -206,5 +248,128 @@ class Seat(Base):
     is_aisle = Column(Boolean, default=False)
     price = Column(Numeric(10, 2))
 
+    # Reservation: held_until is set while a hold is pending and cleared
+    # once it is confirmed. An expired hold counts as available again.
+    held_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    held_until = Column(DateTime)
+
     # Relationships
     flight = relationship("Flight", back_populates="seats")
+
+    __table_args__ = (
+        Index("ux_seats_flight_seat_number", "flight_id", "seat_number", unique=True),
+        Index("ix_seats_flight_class_available", "flight_id", "seat_class", "is_available"),
+    )
+
+# =========================
+# EMAIL OUTBOX
+# =========================
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    # pending -> sending -> sent | failed
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String(500))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+# =========================
+# FLIGHT NOTIFICATION CAMPAIGNS
+# =========================
+
+class NotificationCampaign(Base):
+    __tablename__ = "notification_campaigns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    flight_id = Column(
+        Integer,
+        ForeignKey("flights.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    kind = Column(String(50), nullable=False)
+    # running -> completed | failed
+    status = Column(String(20), default="running", nullable=False, index=True)
+    # Highest user id already handed to the dispatcher (keyset resume point)
+    last_user_id = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime)
+    completed_at = Column(DateTime)
+
+
+class NotificationDelivery(Base):
+    __tablename__ = "notification_deliveries"
+
+    campaign_id = Column(
+        Integer,
+        ForeignKey("notification_campaigns.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    user_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # sending -> sent | failed (failed sends are retried through the email outbox)
+    status = Column(String(20), default="sending", nullable=False)
+
+# =========================
+# REVOKED TOKENS
+# =========================
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Either one token (jti) or every token of a subject issued before revoked_before
+    jti = Column(String(64), unique=True)
+    subject = Column(String(255), index=True)
+    revoked_before = Column(DateTime)
+    # The entry is useless once every token it covers has expired
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# =========================
+# ANALYTICS SUMMARIES
+# =========================
+
+class FlightLoadSummary(Base):
+    """
+    One row per flight, derived from its seats by analytics.py and
+    refreshed whenever they change. Route / aircraft / daily reports
+    aggregate these rows instead of the seats table.
+    """
+    __tablename__ = "flight_load_summaries"
+
+    flight_id = Column(Integer, ForeignKey("flights.id", ondelete="CASCADE"), primary_key=True)
+    route_id = Column(Integer, nullable=False)
+    aircraft_id = Column(Integer, nullable=False)
+    service_date = Column(Date, nullable=False)   # departure date (UTC)
+    status = Column(String(20))
+    seats_total = Column(Integer, nullable=False, default=0)
+    seats_booked = Column(Integer, nullable=False, default=0)
+    seats_held = Column(Integer, nullable=False, default=0)
+    booked_economy = Column(Integer, nullable=False, default=0)
+    booked_business = Column(Integer, nullable=False, default=0)
+    booked_first = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    refreshed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_flight_load_summaries_date", "service_date"),
+        Index("ix_flight_load_summaries_route_date", "route_id", "service_date"),
+        Index("ix_flight_load_summaries_aircraft_date", "aircraft_id", "service_date"),
+    )
@@ -0,0 +1,340 @@
+# FILE: notifications.py
+# Flight-status notification fan-out to every passenger on a flight
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from email_service import default_transport, deliver, email_worker, queue_email
+from models import (
+    Airport, Flight, NotificationCampaign, NotificationDelivery, Route, Seat, User,
+)
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHUNK_SIZE = int(os.getenv("NOTIFY_CHUNK_SIZE", "500"))       # recipients per chunk
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "10"))      # sends in flight
+NOTIFY_DEFAULT_RATE = float(os.getenv("NOTIFY_DEFAULT_RATE", "50"))  # msgs/sec per provider
+# Per-provider overrides, e.g. "gmail.com=20,yahoo.com=10"
+NOTIFY_PROVIDER_RATES = {
+    domain.strip().lower(): float(rate)
+    for domain, rate in (
+        item.split("=") for item in os.getenv("NOTIFY_PROVIDER_RATES", "").split(",") if "=" in item
+    )
+}
+
+# Campaign kind -> email template kind
+CAMPAIGN_TEMPLATES = {
+    "flight_delay": "flight_delay",
+}
+
+
+class InvalidCampaign(ValueError):
+    pass
+
+# -------------------------------------------------
+# Per-provider rate limiting
+# -------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ProviderLimiter:
+    """One token bucket per recipient mail domain."""
+
+    def __init__(self, default_rate: float = NOTIFY_DEFAULT_RATE, rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self.rates = NOTIFY_PROVIDER_RATES if rates is None else rates
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, email: str):
+        domain = email.rsplit("@", 1)[-1].lower()
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = self._buckets[domain] = TokenBucket(self.rates.get(domain, self.default_rate))
+        await bucket.acquire()
+
+# -------------------------------------------------
+# Queries
+# -------------------------------------------------
+def create_campaign(db, flight_id: int, kind: str) -> NotificationCampaign:
+    if kind not in CAMPAIGN_TEMPLATES:
+        raise InvalidCampaign(f"Unknown notification kind: {kind}")
+    campaign = NotificationCampaign(flight_id=flight_id, kind=kind, status="running",
+                                    last_user_id=0, sent=0, failed=0)
+    db.add(campaign)
+    return campaign
+
+
+def flight_context(db, flight_id: int) -> dict:
+    """Values shared by every email of the campaign."""
+    origin = aliased(Airport)
+    destination = aliased(Airport)
+    row = db.execute(
+        select(Flight.flight_number, Flight.departure_datetime, Flight.gate, Flight.status,
+               origin.code.label("origin"), destination.code.label("destination"))
+        .join(Route, Flight.route_id == Route.id)
+        .join(origin, Route.origin_airport_id == origin.id)
+        .join(destination, Route.destination_airport_id == destination.id)
+        .where(Flight.id == flight_id)
+    ).one()
+    return dict(row._mapping)
+
+
+def recipients_after(db, flight_id: int, after_user_id: int, limit: int):
+    """
+    Next chunk of passengers with a confirmed seat on the flight, in user
+    id order. Keyset chunks rather than one long-lived cursor, so progress
+    can be committed between chunks.
+    """
+    return db.execute(
+        select(User.id, User.email, User.full_name, func.min(Seat.seat_number).label("seat_number"))
+        .join(Seat, Seat.held_by == User.id)
+        .where(
+            Seat.flight_id == flight_id,
+            Seat.is_available.is_(False),
+            Seat.held_until.is_(None),
+            User.id > after_user_id,
+        )
+        .group_by(User.id, User.email, User.full_name)
+        .order_by(User.id)
+        .limit(limit)
+    ).all()
+
+
+def campaign_progress(db, campaign_id: int) -> Optional[dict]:
+    campaign = db.get(NotificationCampaign, campaign_id)
+    if campaign is None:
+        return None
+    unconfirmed = db.execute(
+        select(func.count()).select_from(NotificationDelivery).where(
+            NotificationDelivery.campaign_id == campaign_id,
+            NotificationDelivery.status == "sending",
+        )
+    ).scalar()
+    return {
+        "id": campaign.id,
+        "flight_id": campaign.flight_id,
+        "kind": campaign.kind,
+        "status": campaign.status,
+        "sent": campaign.sent,
+        "failed": campaign.failed,
+        # Claimed but not yet recorded: in flight, or lost to a crash (never resent)
+        "unconfirmed": unconfirmed,
+        "created_at": campaign.created_at,
+        "completed_at": campaign.completed_at,
+    }
+
+# -------------------------------------------------
+# Fan-out
+# -------------------------------------------------
+class FlightNotifier:
+    """
+    Runs notification campaigns as background tasks. Each chunk of
+    recipients is recorded as "sending" and the resume point advanced in
+    one commit *before* any of it is sent, so a campaign restarted after
+    a crash continues after the last chunk and never emails anyone
+    twice. Sends that fail are handed to the email outbox for retries.
+    """
+
+    def __init__(self, transport_factory=default_transport, session_factory=SessionLocal,
+                 chunk_size: int = NOTIFY_CHUNK_SIZE, concurrency: int = NOTIFY_CONCURRENCY,
+                 limiter: Optional[ProviderLimiter] = None):
+        self.transport_factory = transport_factory
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.limiter = limiter or ProviderLimiter()
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    # -------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------
+    def launch(self, campaign_id: int) -> asyncio.Task:
+        task = self._tasks.get(campaign_id)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self.run(campaign_id))
+            self._tasks[campaign_id] = task
+            task.add_done_callback(lambda t: self._tasks.pop(campaign_id, None))
+        return task
+
+    async def resume_all(self) -> int:
+        """Relaunch campaigns that were running when the process stopped."""
+        def running():
+            db = self.session_factory()
+            try:
+                return db.execute(
+                    select(NotificationCampaign.id).where(NotificationCampaign.status == "running")
+                ).scalars().all()
+            finally:
+                db.close()
+
+        campaign_ids = await run_in_threadpool(running)
+        for campaign_id in campaign_ids:
+            self.launch(campaign_id)
+        return len(campaign_ids)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -------------------------------------------------
+    # One campaign
+    # -------------------------------------------------
+    async def run(self, campaign_id: int):
+        from email_templates import render_batch
+
+        campaign = await run_in_threadpool(self._load, campaign_id)
+        if campaign is None:
+            return
+        flight_id, kind, cursor, context = campaign
+        template = CAMPAIGN_TEMPLATES[kind]
+
+        semaphore = asyncio.BoundedSemaphore(self.concurrency)
+        transports = asyncio.Queue()
+        for _ in range(self.concurrency):
+            transports.put_nowait(self.transport_factory())
+
+        try:
+            while True:
+                chunk = await run_in_threadpool(self._claim_chunk, campaign_id, flight_id, cursor)
+                if chunk is None:
+                    return  # another worker owns this campaign
+                if not chunk:
+                    break
+                cursor = chunk[-1].id
+                rendered = await run_in_threadpool(lambda: list(render_batch(
+                    template,
+                    ({"user_name": r.full_name, "seat_number": r.seat_number} for r in chunk),
+                    **context,
+                )))
+                errors = await asyncio.gather(*(
+                    self._send(semaphore, transports, r.email, subject, html)
+                    for r, (subject, html) in zip(chunk, rendered)
+                ))
+                await run_in_threadpool(self._record, campaign_id, chunk, rendered, errors)
+            await run_in_threadpool(self._finish, campaign_id, "completed")
+        except asyncio.CancelledError:
+            raise  # left "running": resumed on next startup
+        except Exception:
+            logger.exception("Notification campaign %s failed", campaign_id)
+            await run_in_threadpool(self._finish, campaign_id, "failed")
+        finally:
+            while not transports.empty():
+                await transports.get_nowait().close()
+
+    async def _send(self, semaphore, transports, to_email, subject, html_content) -> Optional[str]:
+        async with semaphore:
+            await self.limiter.acquire(to_email)
+            transport = await transports.get()
+            try:
+                await deliver(transport, to_email, subject, html_content)
+                return None
+            except Exception as e:
+                return str(e)[:500]
+            finally:
+                transports.put_nowait(transport)
+
+    # -------------------------------------------------
+    # Progress (worker threads)
+    # -------------------------------------------------
+    def _load(self, campaign_id: int):
+        db = self.session_factory()
+        try:
+            campaign = db.get(NotificationCampaign, campaign_id)
+            if campaign is None or campaign.status != "running":
+                return None
+            return campaign.flight_id, campaign.kind, campaign.last_user_id, flight_context(db, campaign.flight_id)
+        finally:
+            db.close()
+
+    def _claim_chunk(self, campaign_id: int, flight_id: int, cursor: int):
+        db = self.session_factory()
+        try:
+            chunk = recipients_after(db, flight_id, cursor, self.chunk_size)
+            if chunk:
+                try:
+                    db.execute(insert(NotificationDelivery), [
+                        {"campaign_id": campaign_id, "user_id": r.id, "status": "sending"} for r in chunk
+                    ])
+                except IntegrityError:
+                    db.rollback()
+                    return None
+                db.execute(
+                    update(NotificationCampaign)
+                    .where(NotificationCampaign.id == campaign_id)
+                    .values(last_user_id=chunk[-1].id, updated_at=datetime.utcnow())
+                )
+                db.commit()
+            return chunk
+        finally:
+            db.close()
+
+    def _record(self, campaign_id: int, chunk, rendered, errors):
+        sent = [r.id for r, error in zip(chunk, errors) if error is None]
+        failed = [(r, message) for r, message, error in zip(chunk, rendered, errors) if error is not None]
+        db = self.session_factory()
+        try:
+            for status, user_ids in (("sent", sent), ("failed", [r.id for r, _ in failed])):
+                if user_ids:
+                    db.execute(
+                        update(NotificationDelivery)
+                        .where(NotificationDelivery.campaign_id == campaign_id,
+                               NotificationDelivery.user_id.in_(user_ids))
+                        .values(status=status)
+                    )
+            for r, (subject, html_content) in failed:
+                queue_email(db, r.email, subject, html_content)
+            db.execute(
+                update(NotificationCampaign)
+                .where(NotificationCampaign.id == campaign_id)
+                .values(sent=NotificationCampaign.sent + len(sent),
+                        failed=NotificationCampaign.failed + len(failed),
+                        updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+        if failed:
+            email_worker.notify()
+
+    def _finish(self, campaign_id: int, status: str):
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            db.execute(
+                update(NotificationCampaign)
+                .where(NotificationCampaign.id == campaign_id)
+                .values(status=status, updated_at=now, completed_at=now)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+notifier = FlightNotifier()
@@ -0,0 +1,131 @@
+# FILE: password_hashing.py
+# Bounded worker pool for bcrypt hashing / verification
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from metrics import password_hash_latency, password_hash_rejected
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "process")  # "process" or "thread"
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Built on first use (once per worker process) rather than at import.
+    min == max == default, so a hash made with any other cost factor is
+    reported as needing an update and gets rehashed on the next login.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+
+
+class HashQueueFull(Exception):
+    """Raised when too many hash jobs are already waiting."""
+
+
+# -------------------------------------------------
+# Worker functions (run inside the pool)
+# -------------------------------------------------
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return get_pwd_context().verify_and_update(password, hashed)
+
+
+# -------------------------------------------------
+# Hasher
+# -------------------------------------------------
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited executor so password work
+    never occupies the request threadpool. Jobs beyond `queue_limit`
+    are rejected with HashQueueFull instead of piling up.
+    """
+
+    def __init__(
+        self,
+        workers: int = HASH_WORKERS,
+        queue_limit: int = HASH_QUEUE_LIMIT,
+        kind: str = HASH_EXECUTOR,
+    ):
+        self.workers = max(1, workers)
+        self.queue_limit = max(1, queue_limit)
+        self.kind = kind
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError, ImportError):
+                    # e.g. no /dev/shm or no fork support on this host
+                    self.kind = "thread"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="bcrypt",
+                )
+        return self._executor
+
+    def _fallback_to_threads(self):
+        broken, self._executor = self._executor, None
+        self.kind = "thread"
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            password_hash_rejected.inc()
+            raise HashQueueFull()
+
+        self.pending += 1
+        try:
+            with password_hash_latency.time("hash" if fn is _hash else "verify"):
+                loop = asyncio.get_running_loop()
+                try:
+                    return await loop.run_in_executor(self._get_executor(), fn, *args)
+                except BrokenProcessPool:
+                    self._fallback_to_threads()
+                    return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns (valid, new_hash). new_hash is set when the stored hash
+        was made with an outdated scheme or cost factor.
+        """
+        return await self._submit(_verify_and_update, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
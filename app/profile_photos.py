@@ -0,0 +1,255 @@
+# FILE: profile_photos.py
+# Profile photo uploads: streamed to disk, content-addressed, thumbnailed off the event loop
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import AsyncIterator, Dict, NamedTuple, Optional, Tuple
+
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+STATIC_DIR = Path("static")
+UPLOAD_DIR = STATIC_DIR / "uploads" / "profiles"
+PHOTO_MAX_BYTES = int(os.getenv("PHOTO_MAX_BYTES", str(5 * 1024 * 1024)))
+PHOTO_MAX_PIXELS = int(os.getenv("PHOTO_MAX_PIXELS", str(40_000_000)))  # decompression-bomb guard
+PHOTO_THUMB_SIZES = tuple(int(s) for s in os.getenv("PHOTO_THUMB_SIZES", "96,256").split(","))
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+PHOTO_CACHE_MAX_AGE = 31536000  # content-addressed files never change
+
+# Magic bytes -> (content type, extension)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+)
+
+
+class PhotoTooLarge(Exception):
+    """The upload exceeded PHOTO_MAX_BYTES."""
+
+
+class UnsupportedPhoto(ValueError):
+    """Not an image we accept, or one that does not decode."""
+
+
+class StoredPhoto(NamedTuple):
+    digest: str
+    content_type: str
+    size: int
+    url: str
+    thumbnails: Dict[int, str]
+    deduplicated: bool
+
+
+def sniff_type(head: bytes) -> Optional[Tuple[str, str]]:
+    """(content type, extension) from the first bytes of the file, whatever the client claimed."""
+    for magic, content_type, ext in _SIGNATURES:
+        if head.startswith(magic):
+            return content_type, ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+
+def photo_path(digest: str, ext: str, size: Optional[int] = None) -> Path:
+    """static/uploads/profiles/ab/abcd...[_256].ext, fanned out by the first digest byte."""
+    name = f"{digest}_{size}.jpg" if size else f"{digest}.{ext}"
+    return UPLOAD_DIR / digest[:2] / name
+
+
+def photo_url(path: Path) -> str:
+    return "/" + path.as_posix()
+
+# -------------------------------------------------
+# Thumbnails (run inside the pool)
+# -------------------------------------------------
+def _make_thumbnails(source: str, digest: str, sizes: Tuple[int, ...], max_pixels: int) -> Dict[int, str]:
+    from PIL import Image, ImageOps  # imported in the worker process only
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            thumbnails = {}
+            for size in sorted(sizes, reverse=True):
+                target = photo_path(digest, "", size)
+                if not target.exists():
+                    image.thumbnail((size, size))
+                    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".part")
+                    os.close(fd)
+                    image.save(tmp, "JPEG", quality=85, optimize=True)
+                    os.replace(tmp, target)
+                thumbnails[size] = str(target)
+            return thumbnails
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise UnsupportedPhoto(f"Image could not be decoded: {e}") from None
+
+# -------------------------------------------------
+# Store
+# -------------------------------------------------
+class PhotoStore:
+    """
+    Uploads are written chunk by chunk to a temp file while their SHA-256
+    is computed, so memory stays at one chunk per request and anything
+    past `max_bytes` is cut off mid-stream. The file is then renamed to
+    its digest: the same picture uploaded twice is stored (and
+    thumbnailed) once. Decoding and resizing run on a small process pool.
+    """
+
+    def __init__(self, max_bytes: int = PHOTO_MAX_BYTES, sizes: Tuple[int, ...] = PHOTO_THUMB_SIZES,
+                 workers: int = PHOTO_WORKERS, kind: str = "process"):
+        self.max_bytes = max_bytes
+        self.sizes = sizes
+        self.workers = max(1, workers)
+        self.kind = kind
+        self._executor = None
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.bytes_written = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError, ImportError):
+                    self.kind = "thread"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnail")
+        return self._executor
+
+    async def _thumbnails(self, source: Path, digest: str) -> Dict[int, str]:
+        loop = asyncio.get_running_loop()
+        args = (_make_thumbnails, str(source), digest, self.sizes, PHOTO_MAX_PIXELS)
+        try:
+            return await loop.run_in_executor(self._get_executor(), *args)
+        except BrokenProcessPool:
+            broken, self._executor, self.kind = self._executor, None, "thread"
+            broken.shutdown(wait=False, cancel_futures=True)
+            return await loop.run_in_executor(self._get_executor(), *args)
+
+    async def save(self, chunks: AsyncIterator[bytes]) -> StoredPhoto:
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+        tmp = Path(tmp_name)
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise PhotoTooLarge()
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    await run_in_threadpool(f.write, chunk)
+
+            kind = sniff_type(head)
+            if kind is None:
+                raise UnsupportedPhoto("Only JPEG, PNG, GIF and WebP images are accepted")
+            content_type, ext = kind
+            hexdigest = digest.hexdigest()
+            target = photo_path(hexdigest, ext)
+            duplicate = target.exists()
+            if not duplicate:
+                target.parent.mkdir(exist_ok=True)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, target)
+
+            try:
+                thumbnails = {size: str(photo_path(hexdigest, ext, size)) for size in self.sizes}
+                if not (duplicate and all(os.path.exists(p) for p in thumbnails.values())):
+                    thumbnails = await self._thumbnails(target, hexdigest)
+            except UnsupportedPhoto:
+                if not duplicate:
+                    target.unlink(missing_ok=True)
+                raise
+        except (PhotoTooLarge, UnsupportedPhoto):
+            self.rejected += 1
+            raise
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        if duplicate:
+            self.deduplicated += 1
+        else:
+            self.stored += 1
+            self.bytes_written += size
+        return StoredPhoto(
+            digest=hexdigest,
+            content_type=content_type,
+            size=size,
+            url=photo_url(target),
+            thumbnails={s: photo_url(Path(p)) for s, p in thumbnails.items()},
+            deduplicated=duplicate,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "bytes_written": self.bytes_written,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+# -------------------------------------------------
+# Serving
+# -------------------------------------------------
+_CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})(?:_\d+)?\.(?:jpg|png|gif|webp)$")
+
+
+class CachingStaticFiles(StaticFiles):
+    """
+    /static with long-lived caching for uploaded photos: their name is
+    their digest, so the ETag is the digest itself and browsers may keep
+    them for a year without revalidating. Other files keep Starlette's
+    default mtime-based ETag.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        match = _CONTENT_ADDRESSED.match(os.path.basename(full_path))
+        if match is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers={
+                "etag": f'"{os.path.basename(full_path).rsplit(".", 1)[0]}"',
+                "cache-control": f"public, max-age={PHOTO_CACHE_MAX_AGE}, immutable",
+            },
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+photo_store = PhotoStore()
@@ -0,0 +1,160 @@
+# FILE: rate_limit.py
+# Token-bucket rate limiting for /api/login, per client IP and per email
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+LOGIN_RATE_PER_IP = os.getenv("LOGIN_RATE_PER_IP", "20/60")        # attempts / seconds
+LOGIN_RATE_PER_EMAIL = os.getenv("LOGIN_RATE_PER_EMAIL", "5/60")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local")     # local | redis
+RATE_LIMIT_SWEEP_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_SECONDS", "60"))
+# Proxies in front of the app (Render: 1); the client address is the
+# X-Forwarded-For entry the outermost trusted proxy appended. 0 = use the socket peer.
+RATE_LIMIT_PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def parse_rate(rate: str) -> Tuple[float, float]:
+    """"20/60" -> (capacity 20, refill 20/60 tokens per second)."""
+    count, seconds = rate.split("/")
+    return float(count), float(count) / float(seconds)
+
+# -------------------------------------------------
+# Backends
+# -------------------------------------------------
+class LocalBucketStore:
+    """
+    In-process buckets: one (tokens, last update) tuple per key. A bucket
+    that has refilled completely carries no information, so the sweep
+    drops those keys and memory tracks only recently active clients.
+    """
+
+    def __init__(self, sweep_seconds: float = RATE_LIMIT_SWEEP_SECONDS):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self.sweep_seconds = sweep_seconds
+        self._swept_at = time.monotonic()
+        self._full_after = 0.0   # longest time any bucket takes to refill
+        self.swept = 0
+
+    def take(self, key: str, capacity: float, refill: float) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            self._full_after = max(self._full_after, capacity / refill)
+            if now - self._swept_at > self.sweep_seconds:
+                self._sweep(now)
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / refill
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def _sweep(self, now: float):
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if now - updated >= self._full_after:
+                del self._buckets[key]
+                self.swept += 1
+        self._swept_at = now
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# Same bucket arithmetic as LocalBucketStore, atomic on the Redis server
+_REDIS_TAKE = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * refill)
+local wait = 0
+if tokens < 1 then
+  wait = (1 - tokens) / refill
+else
+  tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill))
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Buckets shared by every worker; keys expire once a bucket is full again."""
+
+    blocking = True  # take() is a network round trip
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "ratelimit:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+        self.prefix = prefix
+
+    def take(self, key: str, capacity: float, refill: float) -> float:
+        return float(self._take(keys=[self.prefix + key], args=[capacity, refill]))
+
+    def __len__(self):
+        return -1  # not tracked locally
+
+
+def default_store():
+    return RedisBucketStore() if RATE_LIMIT_BACKEND == "redis" else LocalBucketStore()
+
+# -------------------------------------------------
+# Login limiter
+# -------------------------------------------------
+class LoginRateLimiter:
+    def __init__(self, store=None, per_ip: str = LOGIN_RATE_PER_IP, per_email: str = LOGIN_RATE_PER_EMAIL):
+        self.store = store if store is not None else default_store()
+        self.per_ip = parse_rate(per_ip)
+        self.per_email = parse_rate(per_email)
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, ip: str, email: str) -> Optional[float]:
+        """None if the attempt may proceed, else seconds to wait (Retry-After)."""
+        wait = max(
+            self.store.take("ip:" + ip, *self.per_ip),
+            self.store.take("email:" + email.strip().lower(), *self.per_email),
+        )
+        if wait:
+            self.rejected += 1
+            return wait
+        self.allowed += 1
+        return None
+
+    async def check_async(self, ip: str, email: str) -> Optional[float]:
+        """check() from the event loop; a blocking store runs in a worker thread."""
+        if getattr(self.store, "blocking", False):
+            return await asyncio.to_thread(self.check, ip, email)
+        return self.check(ip, email)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.store).__name__,
+            "tracked_keys": len(self.store),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+def client_ip(request, proxy_hops: int = RATE_LIMIT_PROXY_HOPS) -> str:
+    # Entries to the left of the trusted hops are client-supplied and can be forged
+    if proxy_hops:
+        forwarded = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if len(forwarded) >= proxy_hops:
+            return forwarded[-proxy_hops]
+    return request.client.host if request.client else "unknown"
+
+
+login_limiter = LoginRateLimiter()
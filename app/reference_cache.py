@@ -0,0 +1,168 @@
+# FILE: reference_cache.py
+# Read-through cache of pre-serialized airport / aircraft / route lists
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import db_execute
+from models import Aircraft, Airport, Route
+from schemas import AircraftResponse, AirportResponse, RouteResponse
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+# Writes made through this process's ORM sessions invalidate immediately;
+# the TTL bounds how long another worker process can serve an old list.
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))   # seconds
+
+# name -> (model, response schema)
+TABLES = {
+    "airports": (Airport, AirportResponse),
+    "aircraft": (Aircraft, AircraftResponse),
+    "routes": (Route, RouteResponse),
+}
+_TABLE_BY_MODEL = {model: name for name, (model, _) in TABLES.items()}
+
+
+class CachedList(NamedTuple):
+    version: int
+    expires_at: float
+    body: bytes     # JSON array, exactly what the list endpoint returns
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    # Content-derived, so every worker hands out the same ETag for the same list
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ReferenceCache:
+    """
+    One cached JSON body per table. Every committed write to the table
+    bumps its version; an entry built under an older version is rebuilt
+    on the next read, so a load racing a write never outlives it.
+    Concurrent misses for a table share a single load.
+    """
+
+    def __init__(self, ttl: float = REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._versions: Dict[str, int] = dict.fromkeys(TABLES, 0)
+        self._entries: Dict[str, CachedList] = {}
+        self._loading: Dict[str, asyncio.Lock] = {}
+        self._adapters = {name: TypeAdapter(List[schema]) for name, (_, schema) in TABLES.items()}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bumps = 0
+
+    def _fresh(self, name: str) -> Optional[CachedList]:
+        entry = self._entries.get(name)
+        if entry is not None and entry.version == self._versions[name] and entry.expires_at > time.monotonic():
+            return entry
+        return None
+
+    async def get(self, db, name: str) -> CachedList:
+        entry = self._fresh(name)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        lock = self._loading.setdefault(name, asyncio.Lock())
+        async with lock:
+            entry = self._fresh(name)  # filled while we waited
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            version = self._versions[name]
+            model, _ = TABLES[name]
+            rows = (await db_execute(db, select(model).order_by(model.id))).scalars().all()
+            adapter = self._adapters[name]
+            body = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+            entry = CachedList(version, time.monotonic() + self.ttl, body, make_etag(body))
+            with self._lock:
+                if version == self._versions[name]:
+                    self._entries[name] = entry
+            return entry
+
+    def version(self, name: str) -> int:
+        return self._versions[name]
+
+    def bump(self, *names: str):
+        """Invalidate the given tables (all of them if none are named)."""
+        with self._lock:
+            for name in names or TABLES:
+                self._versions[name] += 1
+                self._entries.pop(name, None)
+                self.bumps += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "tables": {
+                name: {
+                    "version": self._versions[name],
+                    "cached_bytes": len(self._entries[name].body) if name in self._entries else 0,
+                }
+                for name in TABLES
+            },
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bumps": self.bumps,
+        }
+
+
+reference_cache = ReferenceCache()
+
+# -------------------------------------------------
+# Invalidation on ORM writes
+# -------------------------------------------------
+_PENDING_KEY = "reference_cache_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_reference_writes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = _TABLE_BY_MODEL.get(type(obj))
+        if name:
+            pending.add(name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_reference_writes(orm_execute_state):
+    # session.execute(update(Route)...) and friends bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        name = _TABLE_BY_MODEL.get(mapper.class_) if mapper is not None else None
+        if name:
+            orm_execute_state.session.info.setdefault(_PENDING_KEY, set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_reference_versions(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        reference_cache.bump(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reference_writes(session):
+    session.info.pop(_PENDING_KEY, None)
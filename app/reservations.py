@@ -0,0 +1,315 @@
+# FILE: reservations.py
+# Atomic seat holds, confirmation and availability counters
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from flight_search import SEAT_CLASS_COLUMNS
+from models import Flight, Seat
+from seat_availability import seat_availability
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+SEAT_HOLD_MINUTES = int(os.getenv("SEAT_HOLD_MINUTES", "10"))
+HOLD_ATTEMPTS = int(os.getenv("SEAT_HOLD_ATTEMPTS", "5"))
+AVAILABILITY_REFRESH_MS = int(os.getenv("AVAILABILITY_REFRESH_MS", "250"))
+HOLD_SWEEP_SECONDS = int(os.getenv("HOLD_SWEEP_SECONDS", "30"))
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+class HoldNotFound(Exception):
+    pass
+
+
+def _free(now: datetime):
+    """Seats that can be taken: never held, or whose hold has lapsed."""
+    return or_(Seat.is_available.is_(True), Seat.held_until < now)
+
+
+def _seat_dict(seat_id, seat_number, seat_class, held_until):
+    return {
+        "seat_id": seat_id,
+        "seat_number": seat_number,
+        "seat_class": seat_class,
+        "held_until": held_until,
+    }
+
+
+# -------------------------------------------------
+# Holds
+# -------------------------------------------------
+def hold_seat(
+    db: Session,
+    flight_id: int,
+    user_id: int,
+    seat_class: Optional[str] = None,
+    seat_number: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Place a temporary hold on a specific seat, or on any free seat of
+    `seat_class`. Only seat rows are written, so concurrent bookers on
+    the same flight never queue behind a shared flight row.
+
+    Any-seat picks use SELECT ... FOR UPDATE SKIP LOCKED where the
+    database supports it, so bookers skip past each other's candidate
+    rows instead of waiting on them. Every claim is a conditional UPDATE
+    that re-checks the seat is still free, which is what rules out
+    overselling (also on databases without row locks, e.g. SQLite).
+    """
+    if seat_number is None and seat_class not in SEAT_CLASS_COLUMNS:
+        raise ValueError("seat_class must be economy, business or first")
+
+    for _ in range(HOLD_ATTEMPTS):
+        now = now or datetime.utcnow()
+        held_until = now + timedelta(minutes=SEAT_HOLD_MINUTES)
+
+        if seat_number is not None:
+            conditions = [Seat.flight_id == flight_id, Seat.seat_number == seat_number]
+        else:
+            candidate = db.execute(
+                select(Seat.id)
+                .where(
+                    Seat.flight_id == flight_id,
+                    Seat.seat_class == seat_class,
+                    _free(now),
+                )
+                .order_by(Seat.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar()
+            if candidate is None:
+                db.rollback()
+                raise SeatUnavailable(f"No {seat_class} seats left on this flight")
+            conditions = [Seat.id == candidate]
+
+        result = db.execute(
+            update(Seat)
+            .where(*conditions, _free(now))
+            .values(is_available=False, held_by=user_id, held_until=held_until)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            seat = db.execute(
+                select(Seat.id, Seat.seat_number, Seat.seat_class).where(*conditions)
+            ).one()
+            db.commit()
+            seat_availability.mark_held(flight_id, seat.seat_number, held_until)
+            availability_refresher.mark_dirty(flight_id)
+            return _seat_dict(seat.id, seat.seat_number, seat.seat_class, held_until)
+
+        db.rollback()
+        if seat_number is not None:
+            raise SeatUnavailable(f"Seat {seat_number} is not available")
+        now = None  # lost a race for that seat; pick another
+
+    raise SeatUnavailable("Could not reserve a seat, please retry")
+
+
+def confirm_hold(db: Session, flight_id: int, seat_number: str, user_id: int,
+                 now: Optional[datetime] = None) -> dict:
+    """Turn an unexpired hold into a booking."""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(Seat)
+        .where(
+            Seat.flight_id == flight_id,
+            Seat.seat_number == seat_number,
+            Seat.held_by == user_id,
+            Seat.held_until >= now,
+        )
+        .values(held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise HoldNotFound("No active hold on this seat")
+    seat = db.execute(
+        select(Seat.id, Seat.seat_number, Seat.seat_class)
+        .where(Seat.flight_id == flight_id, Seat.seat_number == seat_number)
+    ).one()
+    db.commit()
+    seat_availability.mark_booked(flight_id, seat_number)
+    availability_refresher.mark_dirty(flight_id)  # counters unchanged, but listeners see the booking
+    return _seat_dict(seat.id, seat.seat_number, seat.seat_class, None)
+
+
+def release_hold(db: Session, flight_id: int, seat_number: str, user_id: int):
+    result = db.execute(
+        update(Seat)
+        .where(
+            Seat.flight_id == flight_id,
+            Seat.seat_number == seat_number,
+            Seat.held_by == user_id,
+            Seat.held_until.isnot(None),
+        )
+        .values(is_available=True, held_by=None, held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise HoldNotFound("No active hold on this seat")
+    db.commit()
+    seat_availability.mark_free(flight_id, seat_number)
+    availability_refresher.mark_dirty(flight_id)
+
+
+def release_expired_holds(db: Session, now: Optional[datetime] = None) -> set:
+    """Free lapsed holds. Returns the ids of the flights affected."""
+    now = now or datetime.utcnow()
+    expired = and_(Seat.is_available.is_(False), Seat.held_until < now)
+    release = (
+        update(Seat)
+        .where(expired)
+        .values(is_available=True, held_by=None, held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    # Only seats the UPDATE itself freed: a hold re-claimed since it
+    # lapsed no longer matches and must stay held in the seat map
+    if db.get_bind().dialect.update_returning:
+        released = db.execute(release.returning(Seat.flight_id, Seat.seat_number)).all()
+    else:
+        lapsed = db.execute(select(Seat.id, Seat.flight_id, Seat.seat_number).where(expired)).all()
+        released = [
+            (flight_id, seat_number) for seat_id, flight_id, seat_number in lapsed
+            if db.execute(release.where(Seat.id == seat_id)).rowcount == 1
+        ]
+    db.commit()
+    for flight_id, seat_number in released:
+        seat_availability.mark_free(flight_id, seat_number)
+    return {flight_id for flight_id, _ in released}
+
+
+# -------------------------------------------------
+# Availability counters
+# -------------------------------------------------
+def count_available(db: Session, flight_id: int, now: Optional[datetime] = None) -> dict:
+    """Exact per-class availability straight from the seats rows."""
+    now = now or datetime.utcnow()
+    rows = db.execute(
+        select(Seat.seat_class, func.count())
+        .where(Seat.flight_id == flight_id, _free(now))
+        .group_by(Seat.seat_class)
+    ).all()
+    counts = dict.fromkeys(SEAT_CLASS_COLUMNS, 0)
+    counts.update({seat_class: n for seat_class, n in rows if seat_class in counts})
+    return counts
+
+
+def refresh_availability(db: Session, flight_ids: Iterable[int], now: Optional[datetime] = None):
+    """
+    Recompute Flight.available_* from the seats rows. The counters are
+    always derived from seats, never incremented, so they cannot drift.
+    """
+    now = now or datetime.utcnow()
+    for flight_id in flight_ids:
+        counts = count_available(db, flight_id, now)
+        db.execute(
+            update(Flight)
+            .where(Flight.id == flight_id)
+            .values({SEAT_CLASS_COLUMNS[c].key: n for c, n in counts.items()})
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+class AvailabilityRefresher:
+    """
+    Background thread that coalesces counter refreshes: a flight marked
+    dirty by any number of holds within AVAILABILITY_REFRESH_MS is
+    recounted once. It also sweeps lapsed holds every HOLD_SWEEP_SECONDS.
+    """
+
+    def __init__(self, session_factory=SessionLocal,
+                 interval_ms: int = AVAILABILITY_REFRESH_MS,
+                 sweep_seconds: int = HOLD_SWEEP_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval_ms / 1000
+        self.sweep_seconds = sweep_seconds
+        self._dirty = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._last_sweep = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(flight_ids) runs after each recount, e.g. to drop derived caches."""
+        self._listeners.append(callback)
+
+    def mark_dirty(self, flight_id: int):
+        with self._cond:
+            self._dirty.add(flight_id)
+            if self._thread is None and not self._stopping:
+                self._start_locked()
+
+    def start(self):
+        with self._cond:
+            self._stopping = False
+            if self._thread is None:
+                self._start_locked()
+
+    def _start_locked(self):
+        self._thread = threading.Thread(
+            target=self._run, name="availability-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        with self._cond:
+            self._stopping = True
+            thread, self._thread = self._thread, None
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout)
+        self.run_once()
+
+    def run_once(self, sweep: bool = False):
+        with self._cond:
+            dirty, self._dirty = self._dirty, set()
+        db = self.session_factory()
+        try:
+            if sweep:
+                dirty |= release_expired_holds(db)
+            if dirty:
+                refresh_availability(db, sorted(dirty))
+                for callback in self._listeners:
+                    callback(dirty)
+        except Exception:
+            logger.exception("Seat availability refresh failed")
+            db.rollback()
+            with self._cond:
+                self._dirty |= dirty
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                self._cond.wait(self.interval)
+            now = datetime.utcnow()
+            sweep = (
+                self._last_sweep is None
+                or (now - self._last_sweep).total_seconds() >= self.sweep_seconds
+            )
+            if sweep:
+                self._last_sweep = now
+            self.run_once(sweep=sweep)
+
+
+availability_refresher = AvailabilityRefresher()
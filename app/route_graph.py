@@ -0,0 +1,320 @@
+# FILE: route_graph.py
+# In-memory route graph and time-dependent connection search
+
+import bisect
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import db_execute
+from flight_search import BOOKABLE_STATUSES
+from models import Airport, Flight, Route
+
+ROUTE_GRAPH_TTL = float(os.getenv("ROUTE_GRAPH_TTL", "300"))  # full reload, seconds
+
+
+class RouteEdge(NamedTuple):
+    route_id: int
+    origin_id: int
+    destination_id: int
+    duration: int  # Route.estimated_duration, minutes
+
+
+class RouteGraph:
+    """
+    Adjacency of active routes between airports, loaded once from the
+    routes table and then kept current from ORM events. An airport pair
+    can have several routes; each is its own edge. A full reload
+    happens every ROUTE_GRAPH_TTL seconds to pick up writes made by
+    other workers.
+    """
+
+    def __init__(self, ttl: float = ROUTE_GRAPH_TTL):
+        self.ttl = ttl
+        self.loaded_at = None
+        self._lock = threading.RLock()
+        # airport -> neighbour airport -> route_id -> edge
+        self._outgoing: Dict[int, Dict[int, Dict[int, RouteEdge]]] = defaultdict(dict)
+        self._incoming: Dict[int, Dict[int, Dict[int, RouteEdge]]] = defaultdict(dict)
+        self._edges: Dict[int, RouteEdge] = {}
+        self._airport_ids: Dict[str, int] = {}
+
+    # -------------------------------------------------
+    # Loading / incremental updates
+    # -------------------------------------------------
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def invalidate(self):
+        """Reload on next use, after writes that bypass the ORM (bulk imports)."""
+        self.loaded_at = None
+
+    async def ensure_loaded(self, db):
+        if not self.is_stale():
+            return
+        airports = (await db_execute(db, select(Airport.code, Airport.id))).all()
+        routes = (await db_execute(db, select(
+            Route.id,
+            Route.origin_airport_id,
+            Route.destination_airport_id,
+            Route.estimated_duration,
+            Route.is_active,
+        ))).all()
+
+        with self._lock:
+            self._outgoing.clear()
+            self._incoming.clear()
+            self._edges.clear()
+            self._airport_ids = {code.upper(): airport_id for code, airport_id in airports}
+            for route_id, origin_id, destination_id, duration, is_active in routes:
+                self._apply(route_id, origin_id, destination_id, duration, is_active is not False)
+            self.loaded_at = time.monotonic()
+
+    def _apply(self, route_id, origin_id, destination_id, duration, is_active):
+        self._discard(route_id)
+        if not is_active:
+            return
+        edge = RouteEdge(route_id, origin_id, destination_id, duration or 0)
+        self._edges[route_id] = edge
+        self._outgoing[origin_id].setdefault(destination_id, {})[route_id] = edge
+        self._incoming[destination_id].setdefault(origin_id, {})[route_id] = edge
+
+    def _discard(self, route_id):
+        edge = self._edges.pop(route_id, None)
+        if edge is not None:
+            self._unlink(self._outgoing[edge.origin_id], edge.destination_id, route_id)
+            self._unlink(self._incoming[edge.destination_id], edge.origin_id, route_id)
+
+    @staticmethod
+    def _unlink(neighbours, airport_id, route_id):
+        parallel = neighbours.get(airport_id)
+        if parallel is not None:
+            parallel.pop(route_id, None)
+            if not parallel:
+                del neighbours[airport_id]
+
+    def apply_route(self, route_id, origin_id, destination_id, duration, is_active=True):
+        with self._lock:
+            self._apply(route_id, origin_id, destination_id, duration, is_active)
+
+    def remove_route(self, route_id: int):
+        with self._lock:
+            self._discard(route_id)
+
+    def apply_airport(self, code: str, airport_id: int):
+        with self._lock:
+            self._airport_ids[code.upper()] = airport_id
+
+    def airport_id(self, code: str) -> Optional[int]:
+        return self._airport_ids.get(code.upper())
+
+    # -------------------------------------------------
+    # Path enumeration (graph only, no times yet)
+    # -------------------------------------------------
+    def paths(self, origin_id: int, destination_id: int, max_stops: int = 2,
+              max_duration: Optional[int] = None) -> List[List[RouteEdge]]:
+        """
+        All simple route sequences origin -> destination with at most
+        `max_stops` intermediate airports. The last hop is taken from the
+        destination's incoming edges, so the work is bounded by
+        out-degree x out-degree rather than a full search.
+        """
+        max_stops = max(0, min(max_stops, 2))
+        found = []
+        with self._lock:
+            out_a = self._outgoing.get(origin_id, {})
+            into_b = self._incoming.get(destination_id, {})
+
+            if destination_id in out_a:
+                found.extend([edge] for edge in out_a[destination_id].values())
+            if max_stops >= 1:
+                for mid, firsts in out_a.items():
+                    if mid != destination_id and mid in into_b:
+                        found.extend(map(list, itertools.product(firsts.values(), into_b[mid].values())))
+            if max_stops >= 2:
+                for mid1, firsts in out_a.items():
+                    if mid1 == destination_id:
+                        continue
+                    for mid2, seconds in self._outgoing.get(mid1, {}).items():
+                        if mid2 in (origin_id, destination_id) or mid2 not in into_b:
+                            continue
+                        found.extend(map(list, itertools.product(
+                            firsts.values(), seconds.values(), into_b[mid2].values())))
+
+        if max_duration is not None:
+            found = [p for p in found if sum(e.duration for e in p) <= max_duration]
+        return found
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "airports": len(self._airport_ids),
+                "routes": len(self._edges),
+                "age_seconds": round(time.monotonic() - self.loaded_at, 1)
+                if self.loaded_at is not None else None,
+            }
+
+
+route_graph = RouteGraph()
+
+
+class Itinerary(NamedTuple):
+    legs: List  # Flight rows (or lightweight rows while searching)
+
+    @property
+    def departure(self) -> datetime:
+        return self.legs[0].departure_datetime
+
+    @property
+    def arrival(self) -> datetime:
+        return self.legs[-1].arrival_datetime
+
+    @property
+    def total_minutes(self) -> int:
+        return int((self.arrival - self.departure).total_seconds() // 60)
+
+
+# -------------------------------------------------
+# Time-dependent connection search
+# -------------------------------------------------
+async def find_connections(
+    db,
+    origin: str,
+    destination: str,
+    departure_date: date,
+    max_stops: int = 2,
+    min_layover: int = 45,
+    max_layover: int = 360,
+    limit: int = 20,
+    graph: RouteGraph = route_graph,
+) -> List[Itinerary]:
+    """
+    Itineraries departing on `departure_date`, fastest first. All flights
+    on every candidate route are fetched in one query, then legs are
+    chained in memory by binary search over departure times.
+    """
+    await graph.ensure_loaded(db)
+    origin_id = graph.airport_id(origin)
+    destination_id = graph.airport_id(destination)
+    if origin_id is None or destination_id is None or origin_id == destination_id:
+        return []
+
+    # Upper bound on trip length: a day of flying plus every layover at its maximum
+    max_duration = 24 * 60 + max_stops * max_layover
+    paths = graph.paths(origin_id, destination_id, max_stops, max_duration)
+    if not paths:
+        return []
+
+    route_ids = {edge.route_id for path in paths for edge in path}
+    window_start = datetime.combine(departure_date, datetime.min.time())
+    window_end = window_start + timedelta(days=1, minutes=max_duration)
+
+    # Only the columns needed to chain legs; full rows are loaded for the
+    # winning itineraries at the end. Status is filtered here rather than
+    # in SQL so the planner stays on the (route_id, departure_datetime)
+    # index instead of the low-selectivity status index.
+    result = await db_execute(db, select(
+        Flight.id,
+        Flight.route_id,
+        Flight.departure_datetime,
+        Flight.arrival_datetime,
+        Flight.status,
+    ).where(
+        Flight.route_id.in_(route_ids),
+        Flight.departure_datetime >= window_start,
+        Flight.departure_datetime < window_end,
+    ).order_by(Flight.departure_datetime))
+
+    by_route = defaultdict(list)
+    for row in result.all():
+        if row.status in BOOKABLE_STATUSES:
+            by_route[row.route_id].append(row)
+    departures = {
+        route_id: [row.departure_datetime for row in rows]
+        for route_id, rows in by_route.items()
+    }
+
+    min_gap = timedelta(minutes=min_layover)
+    max_gap = timedelta(minutes=max_layover)
+    first_day_end = window_start + timedelta(days=1)
+    candidates = []
+
+    def extend(path, legs):
+        if len(legs) == len(path):
+            candidates.append(Itinerary(list(legs)))
+            return
+        route_id = path[len(legs)].route_id
+        rows = by_route.get(route_id, ())
+        times = departures.get(route_id, ())
+        arrived = legs[-1].arrival_datetime
+        lo = bisect.bisect_left(times, arrived + min_gap)
+        hi = bisect.bisect_right(times, arrived + max_gap)
+        for row in rows[lo:hi]:
+            legs.append(row)
+            extend(path, legs)
+            legs.pop()
+
+    for path in paths:
+        for first in by_route.get(path[0].route_id, ()):
+            if first.departure_datetime >= first_day_end:
+                break
+            extend(path, [first])
+
+    best = heapq.nsmallest(limit, candidates, key=lambda it: (it.total_minutes, it.departure))
+    if not best:
+        return []
+
+    flight_ids = {leg.id for it in best for leg in it.legs}
+    result = await db_execute(db, select(Flight).where(Flight.id.in_(flight_ids)))
+    flights = {flight.id: flight for flight in result.scalars().all()}
+    return [Itinerary([flights[leg.id] for leg in it.legs]) for it in best]
+
+
+# -------------------------------------------------
+# Keep the graph current from ORM writes
+# -------------------------------------------------
+_PENDING_KEY = "route_graph_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_route_changes(session, flush_context):
+    # Capture plain values now: after_commit cannot load expired attributes
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Route):
+            pending.append(("route", (
+                obj.id,
+                obj.origin_airport_id,
+                obj.destination_airport_id,
+                obj.estimated_duration,
+                obj.is_active is not False,
+            )))
+        elif isinstance(obj, Airport):
+            pending.append(("airport", (obj.code, obj.id)))
+    for obj in session.deleted:
+        if isinstance(obj, Route):
+            pending.append(("remove", obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_route_changes(session):
+    for kind, item in session.info.pop(_PENDING_KEY, ()):
+        if kind == "route":
+            route_graph.apply_route(*item)
+        elif kind == "airport":
+            route_graph.apply_airport(*item)
+        else:
+            route_graph.remove_route(item)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_route_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,585 @@
+# FILE: schedules.py
+# Bulk schedule import/export: streaming CSV / NDJSON, batched upserts
+#
+# From the app directory:
+#   python schedules.py import airports airports.csv
+#   python schedules.py import flights winter.ndjson --format ndjson
+#   python schedules.py export flights > flights.csv
+#
+# Rows reference other tables by their natural keys (airport code,
+# aircraft number), so an exported file can be loaded into another
+# database as-is. Import order: airports, aircraft, routes, flights.
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import bindparam, insert, select, table, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+
+from database import copy_rows
+from models import Aircraft, Airport, Flight, Route
+from reference_cache import reference_cache
+from route_graph import route_graph
+from schemas import AircraftCreate, AirportCreate, FlightCreate, RouteCreate
+from seat_maps import generate_seat_maps
+
+SCHEDULE_IMPORT_BATCH = int(os.getenv("SCHEDULE_IMPORT_BATCH", "2000"))    # rows per transaction
+SCHEDULE_EXPORT_BATCH = int(os.getenv("SCHEDULE_EXPORT_BATCH", "5000"))    # rows per fetch
+SCHEDULE_MAX_ERRORS = int(os.getenv("SCHEDULE_MAX_ERRORS", "100"))         # row errors kept in a report
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class InvalidSchedule(ValueError):
+    """Unknown kind or format."""
+
+
+class RowError(ValueError):
+    """One input row cannot be imported; the rest of the file continues."""
+
+
+class ImportReport:
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors: List[dict] = []
+
+    def reject(self, line: int, message: str):
+        self.rejected += 1
+        if len(self.errors) < SCHEDULE_MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind, "read": self.read, "inserted": self.inserted,
+            "updated": self.updated, "rejected": self.rejected,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+        }
+
+# -------------------------------------------------
+# Flight change listeners
+# -------------------------------------------------
+_flight_listeners: List[Callable[[List[int]], None]] = []
+
+
+def on_flights_updated(callback: Callable[[List[int]], None]):
+    """Call `callback(flight_ids)` after an import creates flights or changes their times."""
+    _flight_listeners.append(callback)
+
+# -------------------------------------------------
+# Reading
+# -------------------------------------------------
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    (line number, dict) per input row; a row that cannot be parsed is
+    yielded as a RowError so the importer can report it and move on.
+    CSV empty cells become None.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in record.items() if key
+            }
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"invalid JSON: {e}")
+                continue
+            yield line_no, record if isinstance(record, dict) else RowError("expected a JSON object")
+    else:
+        raise InvalidSchedule(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+# -------------------------------------------------
+# Per-kind rules
+# -------------------------------------------------
+class Lookups:
+    """Natural key -> id maps, loaded once per import."""
+
+    def __init__(self, conn):
+        self.airports = {code.upper(): airport_id for code, airport_id in
+                         conn.execute(select(Airport.code, Airport.id))}
+        self.aircraft = dict(conn.execute(select(Aircraft.aircraft_number, Aircraft.id)).all())
+        # Routes have no unique key; an imported flight or route row goes to the pair's first route
+        self.routes: Dict[Tuple[int, int], int] = {}
+        for route_id, origin_id, destination_id in conn.execute(
+            select(Route.id, Route.origin_airport_id, Route.destination_airport_id).order_by(Route.id)
+        ):
+            self.routes.setdefault((origin_id, destination_id), route_id)
+
+    def airport(self, code) -> int:
+        airport_id = self.airports.get(str(code or "").upper())
+        if airport_id is None:
+            raise RowError(f"unknown airport {code!r}")
+        return airport_id
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _prepare_airport(record: dict, lookups) -> dict:
+    return {**record, "code": str(record.get("code") or "").upper() or None}
+
+
+def _prepare_route(record: dict, lookups: Lookups) -> dict:
+    origin_id = lookups.airport(record.get("origin"))
+    destination_id = lookups.airport(record.get("destination"))
+    if origin_id == destination_id:
+        raise RowError("origin and destination must differ")
+    return {**record, "origin_airport_id": origin_id, "destination_airport_id": destination_id}
+
+
+def _prepare_flight(record: dict, lookups: Lookups) -> dict:
+    pair = (lookups.airport(record.get("origin")), lookups.airport(record.get("destination")))
+    route_id = lookups.routes.get(pair)
+    if route_id is None:
+        raise RowError(f"no route {record.get('origin')}-{record.get('destination')}")
+    aircraft_id = lookups.aircraft.get(record.get("aircraft_number"))
+    if aircraft_id is None:
+        raise RowError(f"unknown aircraft {record.get('aircraft_number')!r}")
+    return {**record, "route_id": route_id, "aircraft_id": aircraft_id}
+
+
+def _check_aircraft(model: AircraftCreate) -> dict:
+    if model.economy_seats + model.business_seats + model.first_class_seats != model.total_seats:
+        raise RowError("seat classes must add up to total_seats")
+    return model.model_dump()
+
+
+def _check_flight(model: FlightCreate) -> dict:
+    row = model.model_dump()
+    row["departure_datetime"] = _naive_utc(row["departure_datetime"])
+    row["arrival_datetime"] = _naive_utc(row["arrival_datetime"])
+    if row["arrival_datetime"] <= row["departure_datetime"]:
+        raise RowError("arrival must be after departure")
+    return row
+
+# -------------------------------------------------
+# Writing
+# -------------------------------------------------
+def _upsert(conn, tbl, key: str, rows: List[dict], update_columns: Tuple[str, ...], **set_values):
+    """
+    INSERT ... ON CONFLICT (key) DO UPDATE. On PostgreSQL the batch is
+    COPYed into a temp staging table first and merged with one
+    INSERT ... SELECT, which beats executemany by a wide margin.
+    """
+    dialect = conn.dialect.name
+    columns = tuple(rows[0])
+    if dialect == "postgresql":
+        stage = f"{tbl.name}_import"
+        column_list = ", ".join(columns)
+        assignments = [f"{c} = EXCLUDED.{c}" for c in update_columns]
+        assignments += [f"{c} = :{c}" for c in set_values]
+        conn.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {tbl.name} WITH NO DATA"
+        ))
+        copy_rows(conn, table(stage), columns, ([row[c] for c in columns] for row in rows))
+        conn.execute(text(
+            f"INSERT INTO {tbl.name} ({column_list}) SELECT {column_list} FROM {stage} "
+            f"ON CONFLICT ({key}) DO UPDATE SET {', '.join(assignments)}"
+        ), set_values)
+        return
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(tbl)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={**{c: stmt.excluded[c] for c in update_columns}, **set_values},
+        ), rows)
+        return
+    # Anything else: split on the keys that already exist
+    existing = set(conn.execute(
+        select(tbl.c[key]).where(tbl.c[key].in_([row[key] for row in rows]))
+    ).scalars())
+    new = [row for row in rows if row[key] not in existing]
+    if new:
+        conn.execute(insert(tbl), new)
+    old = [{**{f"b_{c}": row[c] for c in update_columns}, "b_key": row[key]}
+           for row in rows if row[key] in existing]
+    if old:
+        conn.execute(
+            update(tbl).where(tbl.c[key] == bindparam("b_key"))
+            .values(**{c: bindparam(f"b_{c}") for c in update_columns}, **set_values),
+            old,
+        )
+
+
+def _existing_keys(conn, column, keys) -> Dict:
+    return dict(conn.execute(select(column, *column.table.primary_key.columns).where(column.in_(keys))).all())
+
+
+def _write_airports(conn, rows, lookups, report) -> Tuple[int, int]:
+    tbl = Airport.__table__
+    existing = _existing_keys(conn, tbl.c.code, [r["code"] for _, r in rows])
+    now = datetime.utcnow()
+    _upsert(conn, tbl, "code", [{**r, "created_at": now} for _, r in rows],
+            ("name", "city", "country", "timezone"))
+    return len(rows) - len(existing), len(existing)
+
+
+def _write_aircraft(conn, rows, lookups, report) -> Tuple[int, int]:
+    # Seat counts are left alone on existing aircraft: flights' seat maps were built from them
+    tbl = Aircraft.__table__
+    existing = _existing_keys(conn, tbl.c.aircraft_number, [r["aircraft_number"] for _, r in rows])
+    now = datetime.utcnow()
+    _upsert(conn, tbl, "aircraft_number",
+            [{**r, "created_at": now, "updated_at": None} for _, r in rows],
+            ("model", "manufacturer", "manufacturing_year", "status"), updated_at=now)
+    return len(rows) - len(existing), len(existing)
+
+
+_ROUTE_UPDATES = ("distance_km", "estimated_duration", "base_price_economy",
+                  "base_price_business", "base_price_first", "is_active")
+
+
+def _write_routes(conn, rows, lookups: Lookups, report) -> Tuple[int, int]:
+    tbl = Route.__table__
+    now = datetime.utcnow()
+    new, old = [], []
+    for _, row in rows:
+        route_id = lookups.routes.get((row["origin_airport_id"], row["destination_airport_id"]))
+        if route_id is None:
+            new.append({**row, "created_at": now})
+        else:
+            old.append({**{f"b_{c}": row[c] for c in _ROUTE_UPDATES}, "b_id": route_id})
+    if new:
+        if conn.dialect.name == "postgresql":
+            columns = tuple(new[0])
+            copy_rows(conn, tbl, columns, ([row[c] for c in columns] for row in new))
+        else:
+            conn.execute(insert(tbl), new)
+        pairs = {(row["origin_airport_id"], row["destination_airport_id"]) for row in new}
+        for route_id, origin_id, destination_id in conn.execute(
+            select(tbl.c.id, tbl.c.origin_airport_id, tbl.c.destination_airport_id)
+            .where(tbl.c.origin_airport_id.in_({o for o, _ in pairs}))
+            .order_by(tbl.c.id)
+        ):
+            if (origin_id, destination_id) in pairs:
+                lookups.routes.setdefault((origin_id, destination_id), route_id)
+    if old:
+        conn.execute(
+            update(tbl).where(tbl.c.id == bindparam("b_id"))
+            .values(**{c: bindparam(f"b_{c}") for c in _ROUTE_UPDATES}),
+            old,
+        )
+    return len(new), len(old)
+
+
+def _write_flights(conn, rows, lookups, report) -> Tuple[int, int]:
+    """
+    New flights get their seat maps in the same transaction. Existing
+    flights (same flight_number) only take new times and gate: moving a
+    flight to another aircraft or route would orphan its seat map, so
+    such rows are rejected.
+    """
+    tbl = Flight.__table__
+    existing = {
+        number: (flight_id, route_id, aircraft_id)
+        for number, flight_id, route_id, aircraft_id in conn.execute(
+            select(tbl.c.flight_number, tbl.c.id, tbl.c.route_id, tbl.c.aircraft_id)
+            .where(tbl.c.flight_number.in_([r["flight_number"] for _, r in rows]))
+        )
+    }
+    accepted, new_numbers, updated_ids = [], [], []
+    for line, row in rows:
+        current = existing.get(row["flight_number"])
+        if current is None:
+            new_numbers.append(row["flight_number"])
+        elif current[1:] != (row["route_id"], row["aircraft_id"]):
+            report.reject(line, "route or aircraft of an existing flight cannot change")
+            continue
+        else:
+            updated_ids.append(current[0])
+        accepted.append(row)
+    if not accepted:
+        return 0, 0
+
+    now = datetime.utcnow()
+    _upsert(conn, tbl, "flight_number",
+            [{**row, "status": "scheduled", "created_at": now, "updated_at": None} for row in accepted],
+            ("departure_datetime", "arrival_datetime", "gate"), updated_at=now)
+    if new_numbers:
+        new_ids = conn.execute(select(tbl.c.id).where(tbl.c.flight_number.in_(new_numbers))).scalars().all()
+        generate_seat_maps(conn, new_ids)
+        conn.info.setdefault("changed_flights", []).extend(new_ids)
+    conn.info.setdefault("changed_flights", []).extend(updated_ids)
+    return len(new_numbers), len(updated_ids)
+
+
+class ScheduleKind(NamedTuple):
+    schema: type
+    prepare: Optional[Callable]      # raw record -> schema input; may raise RowError
+    check: Callable                  # validated model -> row dict; may raise RowError
+    write: Callable                  # (conn, [(line, row)], lookups, report) -> (inserted, updated)
+    key: Tuple[str, ...]             # natural key; duplicates within a batch keep the last row
+    needs_lookups: bool
+
+
+KINDS: Dict[str, ScheduleKind] = {
+    "airports": ScheduleKind(AirportCreate, _prepare_airport, BaseModel.model_dump, _write_airports,
+                             ("code",), False),
+    "aircraft": ScheduleKind(AircraftCreate, None, _check_aircraft, _write_aircraft,
+                             ("aircraft_number",), False),
+    "routes": ScheduleKind(RouteCreate, _prepare_route, BaseModel.model_dump, _write_routes,
+                           ("origin_airport_id", "destination_airport_id"), True),
+    "flights": ScheduleKind(FlightCreate, _prepare_flight, _check_flight, _write_flights,
+                            ("flight_number",), True),
+}
+_ADAPTERS = {name: TypeAdapter(List[kind.schema]) for name, kind in KINDS.items()}
+# Fields with a non-None default (aircraft status, route is_active): a
+# blank cell or JSON null means "use the default", not NULL
+_DEFAULTED = {
+    name: frozenset(field for field, info in kind.schema.model_fields.items()
+                    if not info.is_required() and info.default is not None)
+    for name, kind in KINDS.items()
+}
+
+
+def get_kind(name: str) -> ScheduleKind:
+    try:
+        return KINDS[name]
+    except KeyError:
+        raise InvalidSchedule(f"Unknown schedule kind {name!r}, expected one of {', '.join(KINDS)}")
+
+# -------------------------------------------------
+# Import
+# -------------------------------------------------
+def _validate(name: str, spec: ScheduleKind, batch, report: ImportReport) -> List[Tuple[int, dict]]:
+    """Whole batch through one TypeAdapter; only a failing batch is re-checked row by row."""
+    defaulted = _DEFAULTED[name]
+    if defaulted:
+        batch = [(line, {k: v for k, v in record.items() if v is not None or k not in defaulted})
+                 for line, record in batch]
+    try:
+        models = list(zip((line for line, _ in batch), _ADAPTERS[name].validate_python([r for _, r in batch])))
+    except ValidationError:
+        models = []
+        for line, record in batch:
+            try:
+                models.append((line, spec.schema.model_validate(record)))
+            except ValidationError as e:
+                report.reject(line, describe(e))
+
+    rows = {}
+    for line, model in models:
+        try:
+            row = spec.check(model)
+        except RowError as e:
+            report.reject(line, str(e))
+            continue
+        # Last occurrence of a key wins; ON CONFLICT cannot touch a row twice
+        rows[tuple(row[c] for c in spec.key)] = (line, row)
+    return list(rows.values())
+
+
+def _flush(engine, name: str, spec: ScheduleKind, batch, lookups, report: ImportReport):
+    rows = _validate(name, spec, batch, report)
+    if not rows:
+        return
+    try:
+        with engine.begin() as conn:
+            inserted, updated = spec.write(conn, rows, lookups, report)
+            changed_flights = conn.info.pop("changed_flights", [])
+    except SQLAlchemyError as e:
+        message = str(getattr(e, "orig", None) or e).strip().splitlines()[0]
+        for line, _ in rows:
+            report.reject(line, f"batch rolled back: {message}")
+        return
+    report.inserted += inserted
+    report.updated += updated
+
+    if name in ("airports", "routes"):
+        route_graph.invalidate()
+    if name != "flights":
+        reference_cache.bump(name)
+    if changed_flights:
+        for callback in _flight_listeners:
+            callback(changed_flights)
+
+
+def import_records(engine, name: str, records: Iterable[Tuple[int, object]]) -> ImportReport:
+    """
+    Validate and upsert in SCHEDULE_IMPORT_BATCH-row transactions. Memory
+    stays flat for any file size; a failing batch is reported and
+    skipped, earlier batches stay committed.
+    """
+    spec = get_kind(name)
+    report = ImportReport(name)
+    lookups = None
+    if spec.needs_lookups:
+        with engine.connect() as conn:
+            lookups = Lookups(conn)
+
+    batch = []
+    for line, record in records:
+        report.read += 1
+        if isinstance(record, RowError):
+            report.reject(line, str(record))
+            continue
+        try:
+            batch.append((line, spec.prepare(record, lookups) if spec.prepare else record))
+        except RowError as e:
+            report.reject(line, str(e))
+            continue
+        if len(batch) >= SCHEDULE_IMPORT_BATCH:
+            _flush(engine, name, spec, batch, lookups, report)
+            batch = []
+    _flush(engine, name, spec, batch, lookups, report)
+    return report
+
+
+def import_file(engine, name: str, binary, fmt: str = "csv") -> ImportReport:
+    """Import from a binary file object (upload spool, open(..., "rb"), stdin.buffer)."""
+    get_kind(name)
+    if fmt not in FORMATS:
+        raise InvalidSchedule(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    text_stream = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+    try:
+        return import_records(engine, name, read_records(text_stream, fmt))
+    finally:
+        text_stream.detach()
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+def export_query(name: str):
+    get_kind(name)
+    if name == "airports":
+        return select(Airport.code, Airport.name, Airport.city, Airport.country, Airport.timezone) \
+            .order_by(Airport.id)
+    if name == "aircraft":
+        return select(
+            Aircraft.aircraft_number, Aircraft.model, Aircraft.manufacturer, Aircraft.total_seats,
+            Aircraft.economy_seats, Aircraft.business_seats, Aircraft.first_class_seats,
+            Aircraft.manufacturing_year, Aircraft.status,
+        ).order_by(Aircraft.id)
+
+    origin, destination = aliased(Airport), aliased(Airport)
+    if name == "routes":
+        return (
+            select(
+                origin.code.label("origin"), destination.code.label("destination"),
+                Route.distance_km, Route.estimated_duration, Route.base_price_economy,
+                Route.base_price_business, Route.base_price_first, Route.is_active,
+            )
+            .join(origin, Route.origin_airport_id == origin.id)
+            .join(destination, Route.destination_airport_id == destination.id)
+            .order_by(Route.id)
+        )
+    return (
+        select(
+            Flight.flight_number, origin.code.label("origin"), destination.code.label("destination"),
+            Aircraft.aircraft_number, Flight.departure_datetime, Flight.arrival_datetime,
+            Flight.gate, Flight.status,
+        )
+        .join(Route, Flight.route_id == Route.id)
+        .join(origin, Route.origin_airport_id == origin.id)
+        .join(destination, Route.destination_airport_id == destination.id)
+        .join(Aircraft, Flight.aircraft_id == Aircraft.id)
+        .order_by(Flight.departure_datetime, Flight.id)
+    )
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def export_chunks(engine, name: str, fmt: str = "csv") -> Iterator[str]:
+    """
+    The whole table as CSV or NDJSON text chunks, one per
+    SCHEDULE_EXPORT_BATCH rows, read through a server-side cursor so
+    memory does not grow with the table.
+    """
+    if fmt not in FORMATS:
+        raise InvalidSchedule(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    query = export_query(name)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=SCHEDULE_EXPORT_BATCH).execute(query)
+        columns = list(result.keys())
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        if fmt == "csv":
+            writer.writerow(columns)
+        for partition in result.partitions():
+            for row in partition:
+                if fmt == "csv":
+                    writer.writerow([
+                        "" if v is None else str(v).lower() if isinstance(v, bool) else _plain(v)
+                        for v in row
+                    ])
+                else:
+                    buf.write(json.dumps(dict(zip(columns, map(_plain, row))), separators=(",", ":")))
+                    buf.write("\n")
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main():
+    from database import engine  # loads .env
+
+    parser = argparse.ArgumentParser(description="Bulk schedule import / export")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("import", help="upsert rows from a CSV / NDJSON file ('-' for stdin)")
+    load.add_argument("kind", choices=list(KINDS))
+    load.add_argument("path")
+    load.add_argument("--format", choices=FORMATS)
+    dump = sub.add_parser("export", help="write every row to stdout")
+    dump.add_argument("kind", choices=list(KINDS))
+    dump.add_argument("--format", choices=FORMATS, default="csv")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        for chunk in export_chunks(engine, args.kind, args.format):
+            sys.stdout.write(chunk)
+        return
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    if args.path == "-":
+        report = import_file(engine, args.kind, sys.stdin.buffer, fmt)
+    else:
+        with open(args.path, "rb") as f:
+            report = import_file(engine, args.kind, f, fmt)
+    print(json.dumps(report.as_dict(), indent=2))
+    if report.rejected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
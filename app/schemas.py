@@ -43,7 +43,7 @@ class UserResponse(BaseModel):
 # Add these classes to your existing schemas.py file
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 from decimal import Decimal
 
@@ -57,7 +57,7 @@ class AircraftCreate(BaseModel):
     business_seats: int = Field(..., ge=0)
     first_class_seats: int = Field(..., ge=0)
     manufacturing_year: Optional[int] = None
-    status: Optional[str] = "active"
+    status: Optional[str] = Field("active", max_length=20)
 
 class AircraftUpdate(BaseModel):
     model: Optional[str] = None
@@ -84,7 +84,7 @@ class AirportCreate(BaseModel):
     name: str = Field(..., max_length=255)
     city: str = Field(..., max_length=100)
     country: str = Field(..., max_length=100)
-    timezone: Optional[str] = None
+    timezone: Optional[str] = Field(None, max_length=50)
 
 class AirportResponse(BaseModel):
     id: int
@@ -129,11 +129,11 @@ class FlightCreate(BaseModel):
     aircraft_id: int
     departure_datetime: datetime
     arrival_datetime: datetime
-    gate: Optional[str] = None
+    gate: Optional[str] = Field(None, max_length=10)
 
 class FlightUpdate(BaseModel):
     status: Optional[str] = None
-    gate: Optional[str] = None
+    gate: Optional[str] = Field(None, max_length=10)
     departure_datetime: Optional[datetime] = None
     arrival_datetime: Optional[datetime] = None
 
@@ -158,3 +158,91 @@ class FlightResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class PricedFlightResponse(FlightResponse):
+    # Current fare per class; None when the class is sold out
+    fares: Dict[str, Optional[Decimal]] = {}
+
+class FlightSearchResponse(BaseModel):
+    flights: List[PricedFlightResponse]
+    next_cursor: Optional[str] = None
+
+class FareQuoteResponse(BaseModel):
+    flight_id: int
+    fares: Dict[str, Optional[Decimal]]
+
+class ItineraryResponse(BaseModel):
+    legs: List[FlightResponse]
+    stops: int
+    departure_datetime: datetime
+    arrival_datetime: datetime
+    total_duration_minutes: int
+
+# Seat reservation Schemas
+class SeatHoldRequest(BaseModel):
+    seat_class: Optional[str] = None
+    seat_number: Optional[str] = None
+
+class SeatHoldResponse(BaseModel):
+    seat_id: int
+    seat_number: str
+    seat_class: str
+    held_until: Optional[datetime] = None
+
+# Notification Schemas
+class NotificationRequest(BaseModel):
+    kind: str = "flight_delay"
+
+class NotificationCampaignResponse(BaseModel):
+    id: int
+    flight_id: int
+    kind: str
+    status: str
+    sent: int
+    failed: int
+    unconfirmed: int
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+# Activity log Schemas
+class ActivityLogResponse(BaseModel):
+    id: int
+    action: str
+    details: Optional[str] = None
+    ip_address: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
+
+# Profile photo Schemas
+class ProfilePhotoResponse(BaseModel):
+    profile_photo: str
+    thumbnails: Dict[int, str]
+    content_type: str
+    size: int
+    deduplicated: bool
+
+# Schedule import Schemas
+class ScheduleRowError(BaseModel):
+    line: int
+    error: str
+
+class ScheduleImportResponse(BaseModel):
+    kind: str
+    read: int
+    inserted: int
+    updated: int
+    rejected: int
+    errors: List[ScheduleRowError]
+
+# Analytics Schemas
+class LoadReportRow(BaseModel):
+    key: Union[int, str]          # route id, aircraft id, flight id or YYYY-MM-DD
+    flights: int
+    seats: int
+    booked: int
+    held: int
+    booked_by_class: Dict[str, int]
+    load_factor: float
+    revenue: Decimal
@@ -0,0 +1,257 @@
+# FILE: seat_availability.py
+# Cached per-flight seat-availability bitmaps
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from models import Aircraft, Flight, Seat
+from seat_maps import SeatPosition, seat_layout
+
+SEAT_MAP_CACHE_SIZE = int(os.getenv("SEAT_MAP_CACHE_SIZE", "5000"))   # flights
+SEAT_MAP_TTL = float(os.getenv("SEAT_MAP_TTL", "30"))                 # seconds
+
+SEAT_CLASSES = ("economy", "business", "first")
+
+
+class LayoutIndex:
+    """Static seat layout shared by every flight of one aircraft configuration."""
+
+    __slots__ = ("positions", "index")
+
+    def __init__(self, positions: Tuple[SeatPosition, ...]):
+        self.positions = positions
+        self.index = {p.seat_number: i for i, p in enumerate(positions)}
+
+    def __len__(self):
+        return len(self.positions)
+
+
+@lru_cache(maxsize=256)
+def layout_index(first_class_seats: int, business_seats: int, economy_seats: int) -> LayoutIndex:
+    return LayoutIndex(seat_layout(first_class_seats, business_seats, economy_seats))
+
+
+class FlightSeatBitmap:
+    """
+    One bit per seat position (1 = available), plus the expiry of any
+    pending holds so lapsed holds read as available without a sweep.
+    """
+
+    __slots__ = ("layout", "bits", "counts", "holds", "expires_at")
+
+    def __init__(self, layout: LayoutIndex, expires_at: float):
+        self.layout = layout
+        self.bits = bytearray((len(layout) + 7) // 8)
+        self.counts = dict.fromkeys(SEAT_CLASSES, 0)
+        self.holds: Dict[int, datetime] = {}
+        self.expires_at = expires_at
+
+    def _bit(self, pos: int) -> bool:
+        return bool(self.bits[pos >> 3] & (1 << (pos & 7)))
+
+    def set_available(self, pos: int, available: bool):
+        if self._bit(pos) == available:
+            return
+        if available:
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        else:
+            self.bits[pos >> 3] &= ~(1 << (pos & 7)) & 0xFF
+        seat_class = self.layout.positions[pos].seat_class
+        self.counts[seat_class] = self.counts.get(seat_class, 0) + (1 if available else -1)
+
+    def is_free(self, pos: int, now: datetime) -> bool:
+        if self._bit(pos):
+            return True
+        held_until = self.holds.get(pos)
+        return held_until is not None and held_until < now
+
+    def available_counts(self, now: datetime) -> dict:
+        counts = dict(self.counts)
+        for pos, held_until in self.holds.items():
+            if held_until < now:
+                counts[self.layout.positions[pos].seat_class] += 1
+        return counts
+
+
+class SeatAvailabilityCache:
+    """
+    Bitmaps are loaded outside the lock. A change reported for a flight
+    while its bitmap is loading bumps that flight's generation, and a
+    load that saw the generation move is not cached: it may predate the
+    change, which had no bitmap to apply to.
+    """
+
+    def __init__(self, maxsize: int = SEAT_MAP_CACHE_SIZE, ttl: float = SEAT_MAP_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._flights: "OrderedDict[int, FlightSeatBitmap]" = OrderedDict()
+        self._loading: Dict[int, int] = {}        # flight -> loads in progress
+        self._generations: Dict[int, int] = {}    # flight -> changes seen while loading
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_loads = 0
+
+    # -------------------------------------------------
+    # Loading
+    # -------------------------------------------------
+    def get(self, db, flight_id: int) -> Optional[FlightSeatBitmap]:
+        with self._lock:
+            bitmap = self._flights.get(flight_id)
+            if bitmap is not None and bitmap.expires_at > time.monotonic():
+                self._flights.move_to_end(flight_id)
+                self.hits += 1
+                return bitmap
+            self.misses += 1
+
+        for _ in range(2):
+            bitmap, stored = self._load_and_store(db, flight_id)
+            if bitmap is None or stored:
+                return bitmap
+        # Changed during both loads: serve this one uncached, load again next time
+        return bitmap
+
+    def _load_and_store(self, db, flight_id: int) -> Tuple[Optional[FlightSeatBitmap], bool]:
+        with self._lock:
+            self._loading[flight_id] = self._loading.get(flight_id, 0) + 1
+            generation = self._generations.get(flight_id, 0)
+        bitmap = stored = None
+        try:
+            bitmap = self._load(db, flight_id)
+        finally:
+            with self._lock:
+                stored = bitmap is not None and self._generations.get(flight_id, 0) == generation
+                if stored:
+                    self._flights[flight_id] = bitmap
+                    self._flights.move_to_end(flight_id)
+                    while len(self._flights) > self.maxsize:
+                        self._flights.popitem(last=False)
+                elif bitmap is not None:
+                    self.stale_loads += 1
+                self._loading[flight_id] -= 1
+                if not self._loading[flight_id]:
+                    del self._loading[flight_id]
+                    self._generations.pop(flight_id, None)
+        return bitmap, stored
+
+    def _load(self, db, flight_id: int) -> Optional[FlightSeatBitmap]:
+        config = db.execute(
+            select(Aircraft.first_class_seats, Aircraft.business_seats, Aircraft.economy_seats)
+            .join(Flight, Flight.aircraft_id == Aircraft.id)
+            .where(Flight.id == flight_id)
+        ).first()
+        if config is None:
+            return None
+
+        rows = db.execute(
+            select(Seat.seat_number, Seat.seat_class, Seat.is_window, Seat.is_aisle,
+                   Seat.is_available, Seat.held_until)
+            .where(Seat.flight_id == flight_id)
+            .order_by(Seat.id)
+        ).all()
+
+        layout = layout_index(*config)
+        if len(rows) != len(layout) or any(r.seat_number not in layout.index for r in rows):
+            # Seats were not generated from the aircraft layout; index this flight on its own
+            layout = LayoutIndex(tuple(
+                SeatPosition(r.seat_number, r.seat_class, bool(r.is_window), bool(r.is_aisle))
+                for r in rows
+            ))
+
+        bitmap = FlightSeatBitmap(layout, time.monotonic() + self.ttl)
+        for row in rows:
+            pos = layout.index[row.seat_number]
+            if row.is_available is not False:
+                bitmap.set_available(pos, True)
+            elif row.held_until is not None:
+                bitmap.holds[pos] = row.held_until
+        return bitmap
+
+    # -------------------------------------------------
+    # Incremental updates from the reservation engine
+    # -------------------------------------------------
+    def _update(self, flight_id: int, seat_number: str, available: bool,
+                held_until: Optional[datetime] = None):
+        with self._lock:
+            self._changed(flight_id)
+            bitmap = self._flights.get(flight_id)
+            if bitmap is None:
+                return
+            pos = bitmap.layout.index.get(seat_number)
+            if pos is None:
+                del self._flights[flight_id]  # unknown seat: reload next time
+                return
+            bitmap.set_available(pos, available)
+            if held_until is None:
+                bitmap.holds.pop(pos, None)
+            else:
+                bitmap.holds[pos] = held_until
+
+    def mark_held(self, flight_id: int, seat_number: str, held_until: datetime):
+        self._update(flight_id, seat_number, False, held_until)
+
+    def mark_booked(self, flight_id: int, seat_number: str):
+        self._update(flight_id, seat_number, False)
+
+    def mark_free(self, flight_id: int, seat_number: str):
+        self._update(flight_id, seat_number, True)
+
+    def invalidate(self, flight_id: int):
+        with self._lock:
+            self._changed(flight_id)
+            self._flights.pop(flight_id, None)
+
+    def _changed(self, flight_id: int):
+        # Caller holds the lock. Only loads in progress care about the generation.
+        if flight_id in self._loading:
+            self._generations[flight_id] = self._generations.get(flight_id, 0) + 1
+
+    # -------------------------------------------------
+    # Read API
+    # -------------------------------------------------
+    def availability(self, db, flight_id: int) -> Optional[dict]:
+        bitmap = self.get(db, flight_id)
+        if bitmap is None:
+            return None
+        return bitmap.available_counts(datetime.utcnow())
+
+    def seat_map(self, db, flight_id: int) -> Optional[dict]:
+        bitmap = self.get(db, flight_id)
+        if bitmap is None:
+            return None
+        now = datetime.utcnow()
+        return {
+            "flight_id": flight_id,
+            "availability": bitmap.available_counts(now),
+            "seats": [
+                {
+                    "seat_number": p.seat_number,
+                    "seat_class": p.seat_class,
+                    "is_window": p.is_window,
+                    "is_aisle": p.is_aisle,
+                    "is_available": bitmap.is_free(i, now),
+                }
+                for i, p in enumerate(bitmap.layout.positions)
+            ],
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "flights": len(self._flights),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_loads": self.stale_loads,
+                "layouts": layout_index.cache_info().currsize,
+            }
+
+
+seat_availability = SeatAvailabilityCache()
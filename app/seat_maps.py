@@ -0,0 +1,144 @@
+# FILE: seat_maps.py
+# Seat-map generation for new flights, written in bulk
+
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+
+from database import copy_rows
+from models import Aircraft, Flight, Route, Seat
+
+# Cabin cross-sections, front to back. "|" marks an aisle.
+CABIN_LAYOUTS = (
+    ("first", "AC|DF"),
+    ("business", "AC|DF"),
+    ("economy", "ABC|DEF"),
+)
+
+INSERT_CHUNK = 5000
+
+_SEAT_COLUMNS = (
+    "flight_id", "seat_number", "seat_class",
+    "is_available", "is_window", "is_aisle", "price",
+)
+
+
+class SeatPosition(NamedTuple):
+    seat_number: str
+    seat_class: str
+    is_window: bool
+    is_aisle: bool
+
+
+def _cabin_letters(pattern: str) -> List[Tuple[str, bool, bool]]:
+    """(letter, is_window, is_aisle) for one row of a cabin."""
+    blocks = pattern.split("|")
+    letters = []
+    for b, block in enumerate(blocks):
+        for i, letter in enumerate(block):
+            is_window = (b == 0 and i == 0) or (b == len(blocks) - 1 and i == len(block) - 1)
+            is_aisle = (i == len(block) - 1 and b < len(blocks) - 1) or (i == 0 and b > 0)
+            letters.append((letter, is_window, is_aisle))
+    return letters
+
+
+@lru_cache(maxsize=256)
+def seat_layout(first_class_seats: int, business_seats: int, economy_seats: int) -> Tuple[SeatPosition, ...]:
+    """
+    Static seat layout for an aircraft configuration, computed once per
+    distinct (first, business, economy) count. Rows are numbered from
+    the front; each cabin starts on a new row.
+    """
+    counts = {"first": first_class_seats or 0, "business": business_seats or 0,
+              "economy": economy_seats or 0}
+    layout = []
+    row = 1
+    for seat_class, pattern in CABIN_LAYOUTS:
+        letters = _cabin_letters(pattern)
+        remaining = counts[seat_class]
+        while remaining > 0:
+            for letter, is_window, is_aisle in letters[:remaining]:
+                layout.append(SeatPosition(f"{row}{letter}", seat_class, is_window, is_aisle))
+            remaining -= len(letters)
+            row += 1
+    return tuple(layout)
+
+
+def aircraft_layout(aircraft: Aircraft) -> Tuple[SeatPosition, ...]:
+    return seat_layout(aircraft.first_class_seats, aircraft.business_seats, aircraft.economy_seats)
+
+
+# -------------------------------------------------
+# Bulk generation
+# -------------------------------------------------
+def generate_seat_maps(conn, flight_ids: Iterable[int]) -> int:
+    """
+    Create every Seat row for the given flights and reset their
+    available_* counters, using one lookup query, chunked executemany
+    INSERTs (COPY on PostgreSQL) and one executemany UPDATE. Runs in the
+    caller's transaction. Returns the number of seats written.
+    """
+    flight_ids = list(flight_ids)
+    if not flight_ids:
+        return 0
+
+    rows = conn.execute(
+        select(
+            Flight.id,
+            Aircraft.first_class_seats,
+            Aircraft.business_seats,
+            Aircraft.economy_seats,
+            Route.base_price_first,
+            Route.base_price_business,
+            Route.base_price_economy,
+        )
+        .join(Aircraft, Flight.aircraft_id == Aircraft.id)
+        .join(Route, Flight.route_id == Route.id)
+        .where(Flight.id.in_(flight_ids))
+    ).all()
+
+    use_copy = conn.dialect.name == "postgresql"
+    written = 0
+    batch = []
+    counters = []
+
+    def flush():
+        nonlocal written
+        if not batch:
+            return
+        if use_copy:
+            copy_rows(conn, Seat.__table__, _SEAT_COLUMNS, batch)
+        else:
+            conn.execute(insert(Seat.__table__), [dict(zip(_SEAT_COLUMNS, r)) for r in batch])
+        written += len(batch)
+        batch.clear()
+
+    for flight_id, first, business, economy, price_first, price_business, price_economy in rows:
+        prices = {"first": price_first, "business": price_business, "economy": price_economy}
+        for seat in seat_layout(first, business, economy):
+            batch.append((
+                flight_id, seat.seat_number, seat.seat_class,
+                True, seat.is_window, seat.is_aisle, prices[seat.seat_class],
+            ))
+            if len(batch) >= INSERT_CHUNK:
+                flush()
+        counters.append({
+            "flight": flight_id,
+            "economy": economy or 0,
+            "business": business or 0,
+            "first": first or 0,
+        })
+    flush()
+
+    conn.execute(
+        update(Flight.__table__)
+        .where(Flight.__table__.c.id == bindparam("flight"))
+        .values(
+            available_economy=bindparam("economy"),
+            available_business=bindparam("business"),
+            available_first=bindparam("first"),
+        ),
+        counters,
+    )
+    return written
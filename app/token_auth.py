@@ -0,0 +1,230 @@
+# FILE: token_auth.py
+# JWT verification with a decoded-claims cache and an in-memory revocation list
+
+import calendar
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_REVOCATION_POLL = float(os.getenv("TOKEN_REVOCATION_POLL", "5"))   # seconds
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenClaims(NamedTuple):
+    sub: str
+    jti: str
+    iat: int
+    exp: int
+
+
+def _epoch(value: datetime) -> int:
+    return calendar.timegm(value.utctimetuple())
+
+
+class TokenVerifier:
+    """
+    Decoded claims are cached per token (keyed by a hash of the token, not
+    the token itself) until they expire, so repeat requests skip the HMAC
+    check and JSON parsing. Revocations are held in memory - one set of
+    jtis and one "revoked before" cutoff per subject - and written to the
+    revoked_tokens table, which is read back at startup and then polled
+    every TOKEN_REVOCATION_POLL seconds by a background thread, so a
+    logout on one worker process reaches the others within that delay.
+    Checks never touch the database.
+    """
+
+    def __init__(self, secret_key: str, algorithm: str, maxsize: int = TOKEN_CACHE_SIZE):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.maxsize = maxsize
+        self._claims: "OrderedDict[bytes, TokenClaims]" = OrderedDict()
+        self._revoked_jtis: Dict[str, int] = {}           # jti -> exp
+        self._revoked_subjects: Dict[str, tuple] = {}     # sub -> (cutoff, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.polls = 0
+        self.poll_failures = 0
+        self._purged_at = time.monotonic()
+        self._poll_thread = None
+        self._stopping = threading.Event()
+
+    # -------------------------------------------------
+    # Verification
+    # -------------------------------------------------
+    def verify(self, token: str) -> TokenClaims:
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        with self._lock:
+            claims = self._claims.get(key)
+            if claims is not None:
+                self._claims.move_to_end(key)
+                self.hits += 1
+        if claims is None:
+            claims = self._decode(token, key)
+            with self._lock:
+                self.misses += 1
+                self._claims[key] = claims
+                while len(self._claims) > self.maxsize:
+                    self._claims.popitem(last=False)
+
+        if claims.exp <= time.time():
+            with self._lock:
+                self._claims.pop(key, None)
+            raise self._reject("Token expired")
+        if claims.jti in self._revoked_jtis:
+            raise self._reject("Token revoked")
+        revoked = self._revoked_subjects.get(claims.sub)
+        if revoked is not None and claims.iat <= revoked[0]:
+            raise self._reject("Token revoked")
+        return claims
+
+    def _decode(self, token: str, key: bytes) -> TokenClaims:
+        from jose import jwt, JWTError  # deferred: pulls in the crypto backends
+
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError as e:
+            raise self._reject(str(e))
+        sub = payload.get("sub")
+        if not sub or "exp" not in payload:
+            raise self._reject("Missing claims")
+        # Tokens issued without a jti are revoked by their hash
+        return TokenClaims(sub, payload.get("jti") or key.hex(), int(payload.get("iat", 0)), int(payload["exp"]))
+
+    def _reject(self, reason: str) -> InvalidToken:
+        self.rejected += 1
+        return InvalidToken(reason)
+
+    # -------------------------------------------------
+    # Revocation
+    # -------------------------------------------------
+    def revoke(self, db, claims: TokenClaims):
+        """Log out one token. Revoking it again (e.g. concurrent logouts) is a no-op."""
+        db.add(RevokedToken(jti=claims.jti, expires_at=datetime.utcfromtimestamp(claims.exp)))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # already in the table
+        with self._lock:
+            self._revoked_jtis[claims.jti] = claims.exp
+        self._maybe_purge()
+
+    def revoke_subject(self, db, subject: str, max_token_age: timedelta):
+        """Forced sign-out: every token issued to ``subject`` until now."""
+        now = datetime.utcnow().replace(microsecond=0)
+        expires_at = now + max_token_age
+        db.add(RevokedToken(subject=subject, revoked_before=now, expires_at=expires_at))
+        db.commit()
+        with self._lock:
+            self._revoked_subjects[subject] = (_epoch(now), _epoch(expires_at))
+        self._maybe_purge()
+
+    def load(self, db) -> int:
+        """Drop expired entries and load the rest into memory. Returns the count."""
+        now = datetime.utcnow()
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+        db.commit()
+        return self.sync(db, replace=True)
+
+    def sync(self, db, replace: bool = False) -> int:
+        """
+        Read the revoked_tokens table into memory. Merged with what is
+        already there unless `replace`, so a revocation committed while
+        the rows were being read is not lost until the next poll.
+        """
+        rows = db.execute(
+            select(RevokedToken.jti, RevokedToken.subject, RevokedToken.revoked_before,
+                   RevokedToken.expires_at)
+            .where(RevokedToken.expires_at > datetime.utcnow())
+        ).all()
+        jtis, subjects = {}, {}
+        for jti, subject, revoked_before, expires_at in rows:
+            if jti:
+                jtis[jti] = _epoch(expires_at)
+            elif subject:
+                cutoff = _epoch(revoked_before)
+                if cutoff >= subjects.get(subject, (0, 0))[0]:
+                    subjects[subject] = (cutoff, _epoch(expires_at))
+        with self._lock:
+            if not replace:
+                jtis = {**self._revoked_jtis, **jtis}
+                for subject, entry in self._revoked_subjects.items():
+                    if entry[0] > subjects.get(subject, (0, 0))[0]:
+                        subjects[subject] = entry
+            self._revoked_jtis = jtis
+            self._revoked_subjects = subjects
+        return len(rows)
+
+    def start(self, session_factory, interval: float = TOKEN_REVOCATION_POLL):
+        """Poll the revoked_tokens table for revocations made by other workers."""
+        if self._poll_thread is not None or interval <= 0:
+            return
+        self._stopping.clear()
+        self._poll_thread = threading.Thread(
+            target=self._poll, args=(session_factory, interval), name="token-revocations", daemon=True
+        )
+        self._poll_thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        thread, self._poll_thread = self._poll_thread, None
+        self._stopping.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _poll(self, session_factory, interval: float):
+        while not self._stopping.wait(interval):
+            db = session_factory()
+            try:
+                self.sync(db)
+                self.polls += 1
+            except Exception:
+                logger.exception("Reading revoked tokens failed")
+                self.poll_failures += 1
+            finally:
+                db.close()
+            self._maybe_purge()
+
+    def _maybe_purge(self, interval: float = 60):
+        if time.monotonic() - self._purged_at > interval:
+            self.purge()
+
+    def purge(self):
+        """Forget revocations whose tokens have all expired."""
+        now = time.time()
+        self._purged_at = time.monotonic()
+        with self._lock:
+            self._revoked_jtis = {j: exp for j, exp in self._revoked_jtis.items() if exp > now}
+            self._revoked_subjects = {
+                s: entry for s, entry in self._revoked_subjects.items() if entry[1] > now
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached_tokens": len(self._claims),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "revoked_tokens": len(self._revoked_jtis),
+                "revoked_subjects": len(self._revoked_subjects),
+                "revocation_polls": self.polls,
+                "revocation_poll_failures": self.poll_failures,
+            }
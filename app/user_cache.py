@@ -0,0 +1,135 @@
+# FILE: user_cache.py
+# In-process TTL + LRU cache of authenticated user snapshots
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import User
+
+# -------------------------------------------------
+# Configuration
+# -------------------------------------------------
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))       # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))    # entries
+
+
+class UserSnapshot(NamedTuple):
+    """Just enough of a User to authorize a request."""
+    id: int
+    email: str
+    role: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        role = user.role.value if hasattr(user.role, "value") else user.role
+        return cls(user.id, user.email, role, bool(user.is_active))
+
+
+class UserCache:
+    def __init__(self, ttl: float = USER_CACHE_TTL, maxsize: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # subject -> (expires_at, snapshot)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[UserSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= now:
+                del self._entries[subject]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return snapshot
+
+    def put(self, subject: str, snapshot: UserSnapshot) -> UserSnapshot:
+        if self.maxsize <= 0:
+            return snapshot
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[subject] = (expires_at, snapshot)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache()
+
+# -------------------------------------------------
+# Invalidation on any ORM write to a User
+# -------------------------------------------------
+_PENDING_KEY = "user_cache_pending"
+
+
+def _subjects(user: User):
+    """Current and previous email of a user (the token subject)."""
+    history = inspect(user).attrs.email.history
+    return {value for value in history.sum() if value}
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            pending.update(_subjects(obj))
+    for subject in pending:
+        user_cache.invalidate(subject)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    # Invalidate again once committed so a concurrent request cannot keep
+    # a snapshot it read between our flush and commit.
+    for subject in session.info.pop(_PENDING_KEY, ()):
+        user_cache.invalidate(subject)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
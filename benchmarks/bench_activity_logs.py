@@ -0,0 +1,108 @@
+# FILE: benchmarks/bench_activity_logs.py
+# Activity-log page latency for a heavy user: keyset pages on
+# ix_activity_logs_user_timestamp vs OFFSET paging
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_activity_logs.py --rows 1000000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_activity_logs.py
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'activity.db')}"
+)
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from activity_logs import history_query, paginate  # noqa: E402
+from database import Base, engine  # noqa: E402
+from models import ActivityLog, User  # noqa: E402
+
+
+def seed(rows: int, users: int, heavy_share: float):
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"email": f"user{i}@bench.example", "full_name": f"User {i}",
+             "hashed_password": "x", "role": "PASSENGER"}
+            for i in range(users)
+        ])
+        user_ids = conn.execute(select(User.id)).scalars().all()
+    heavy = user_ids[0]
+    start = datetime.utcnow() - timedelta(days=365)
+    chunk = 50_000
+    for offset in range(0, rows, chunk):
+        with engine.begin() as conn:
+            conn.execute(insert(ActivityLog.__table__), [
+                {"user_id": heavy if random.random() < heavy_share else random.choice(user_ids),
+                 "action": "login", "details": "bench", "ip_address": "127.0.0.1",
+                 "timestamp": start + timedelta(seconds=(offset + i) * 30)}
+                for i in range(min(chunk, rows - offset))
+            ])
+    return heavy
+
+
+def timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.5,
+                        help="fraction of all rows belonging to one user")
+    parser.add_argument("--pages", type=int, default=200, help="pages walked with the cursor")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    t0 = time.perf_counter()
+    heavy = seed(args.rows, args.users, args.heavy_share)
+    print(f"dialect={engine.dialect.name} rows={args.rows} seeded in {time.perf_counter() - t0:.1f}s")
+
+    with engine.connect() as conn:
+        def first_page():
+            stmt, limit = history_query(heavy, None, 20)
+            return paginate(conn.execute(stmt).all(), limit)
+
+        cursors = []
+        cursor = None
+        for _ in range(args.pages):
+            stmt, limit = history_query(heavy, cursor, 20)
+            _, cursor = paginate(conn.execute(stmt).all(), limit)
+            cursors.append(cursor)
+
+        def deep_keyset():
+            stmt, limit = history_query(heavy, cursors[-2], 20)
+            return conn.execute(stmt).all()
+
+        def deep_offset():
+            return conn.execute(
+                select(ActivityLog.id, ActivityLog.action, ActivityLog.timestamp)
+                .where(ActivityLog.user_id == heavy)
+                .order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc())
+                .offset(20 * (args.pages - 1)).limit(20)
+            ).all()
+
+        for label, fn in (("first page", first_page),
+                          (f"page {args.pages} keyset", deep_keyset),
+                          (f"page {args.pages} OFFSET", deep_offset)):
+            p50, worst = timed(fn, 50)
+            print(f"{label:<18} p50 {p50:7.3f} ms   max {worst:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
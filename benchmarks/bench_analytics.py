@@ -0,0 +1,102 @@
+# FILE: benchmarks/bench_analytics.py
+# Load-factor reports: per-flight summaries vs aggregating the seats table
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_analytics.py --seats 1000000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_analytics.py
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'analytics.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import func, select, update  # noqa: E402
+
+from analytics import rebuild_summaries, refresh_summaries, report_query, report_rows, rollup_query  # noqa: E402
+from database import engine  # noqa: E402
+from migrate import migrate  # noqa: E402
+from models import Flight, Seat  # noqa: E402
+from seat_maps import generate_seat_maps  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+SEATS_PER_FLIGHT = 180  # seed_reference aircraft: 150 / 24 / 6
+
+
+def seed(seats: int, load: float, rng):
+    flights = max(1, seats // SEATS_PER_FLIGHT)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, airports=80, aircraft=60, rng=rng)
+        seed_flights(conn, route_ids, aircraft_ids, flights, days=180, rng=rng)
+        flight_ids = conn.execute(select(Flight.id)).scalars().all()
+    for i in range(0, len(flight_ids), 500):
+        with engine.begin() as conn:
+            generate_seat_maps(conn, flight_ids[i:i + 500])
+    with engine.begin() as conn:
+        max_id = conn.execute(select(func.max(Seat.id))).scalar()
+        # Book a share of the seats: every seat whose id hashes under the load factor
+        conn.execute(update(Seat).where((Seat.id * 7919) % 1000 < int(load * 1000))
+                     .values(is_available=False, held_until=None))
+    return len(flight_ids), max_id
+
+
+def timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seats", type=int, default=1_000_000)
+    parser.add_argument("--load", type=float, default=0.62, help="share of seats booked")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    migrate()
+    rng = random.Random(5)
+    t0 = time.perf_counter()
+    flights, seats = seed(args.seats, args.load, rng)
+    print(f"dialect={engine.dialect.name} flights={flights} seats={seats} (seeded in {time.perf_counter() - t0:.0f}s)")
+
+    t0 = time.perf_counter()
+    rebuild_summaries(engine)
+    print(f"full rebuild              {(time.perf_counter() - t0) * 1000:10.1f} ms")
+
+    start = date.today()
+    cases = [
+        ("by route, all dates", "route", None, None),
+        ("by aircraft, all dates", "aircraft", None, None),
+        ("daily, next 30 days", "date", start, start + timedelta(days=30)),
+        ("by flight, one week", "flight", start + timedelta(days=60), start + timedelta(days=66)),
+    ]
+    with engine.connect() as conn:
+        for label, group_by, date_from, date_to in cases:
+            summary_ms, fast = timed(lambda: report_rows(conn.execute(
+                report_query(group_by, date_from, date_to)).all()), args.runs)
+            raw = rollup_query(datetime.utcnow(), date_from=date_from, date_to=date_to).subquery()
+            raw_ms, slow = timed(lambda: report_rows(conn.execute(
+                report_query(group_by, date_from, date_to, source=raw)).all()), args.runs)
+            assert fast == slow, f"summary and raw disagree for {label}"
+            print(f"{label:<24} summary {summary_ms:8.2f} ms   raw {raw_ms:9.1f} ms   "
+                  f"({raw_ms / summary_ms:5.0f}x, {len(fast)} rows)")
+
+    flight_id = rng.randint(1, flights)
+    with engine.begin() as conn:
+        refresh_ms, _ = timed(lambda: refresh_summaries(conn, [flight_id]), args.runs)
+    print(f"incremental refresh, 1 flight {refresh_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
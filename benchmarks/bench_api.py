@@ -0,0 +1,343 @@
+# FILE: benchmarks/bench_api.py
+# Load test of the API hot paths: RPS and p50/p95/p99 per endpoint, as a JSON baseline
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_api.py --output baseline.json
+#   python benchmarks/bench_api.py --compare baseline.json          # exits 1 on a regression
+#   python benchmarks/bench_api.py --scenarios login,me --requests 5000 --concurrency 200
+#   DATABASE_URL=postgresql://... python benchmarks/bench_api.py   # an empty database
+#
+# The app runs under uvicorn in its own process against a seeded SQLite
+# file (or DATABASE_URL); the client drives it over HTTP with httpx.
+# bcrypt runs at --bcrypt-rounds (4 by default) so that login and
+# register measure the request path rather than the hash cost.
+# Client and server share the machine: compare baselines taken on the
+# same host with the same arguments.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+PASSWORD = "benchmark-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default="all", help="comma-separated names, or all")
+    parser.add_argument("--requests", type=int, default=2000, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests per scenario")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--logs-per-user", type=int, default=20)
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--seat-flights", type=int, default=200, help="flights that get seat maps")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON result here")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="percent drop in RPS / rise in p95 counted as a regression")
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+INVOKED_FROM = os.getcwd()
+WORKDIR = tempfile.mkdtemp()
+os.chdir(WORKDIR)  # uploads go under static/ in the cwd
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(WORKDIR, 'api.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ["BCRYPT_ROUNDS"] = str(ARGS.bcrypt_rounds)
+os.environ.setdefault("HASH_QUEUE_LIMIT", str(ARGS.concurrency * 2))
+# Every request comes from one client; keep the login limiter out of the way
+os.environ["LOGIN_RATE_PER_IP"] = os.environ["LOGIN_RATE_PER_EMAIL"] = "1000000000/1"
+
+from sqlalchemy import select  # noqa: E402
+
+from database import engine  # noqa: E402
+from migrate import migrate  # noqa: E402
+from models import Airport, Flight  # noqa: E402
+from password_hashing import _hash  # noqa: E402
+from seat_maps import generate_seat_maps  # noqa: E402
+from seed import seed_flights, seed_reference, seed_users  # noqa: E402
+
+# -------------------------------------------------
+# Fixture: database and server
+# -------------------------------------------------
+def seed(rng) -> dict:
+    migrate()
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, rng=rng)
+        seed_flights(conn, route_ids, aircraft_ids, ARGS.flights, days=90, rng=rng)
+        seed_users(conn, ARGS.users, _hash(PASSWORD), ARGS.logs_per_user)
+        airport_codes = conn.execute(select(Airport.code)).scalars().all()
+        seat_flights = conn.execute(
+            select(Flight.id).where(Flight.status != "cancelled").order_by(Flight.id).limit(ARGS.seat_flights)
+        ).scalars().all()
+    for i in range(0, len(seat_flights), 500):
+        with engine.begin() as conn:
+            generate_seat_maps(conn, seat_flights[i:i + 500])
+    return {"airports": airport_codes, "seat_flights": seat_flights}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", APP_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(ARGS.workers),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=WORKDIR, env=dict(os.environ),
+        stdout=subprocess.DEVNULL,  # the console email backend prints every verification mail
+    )
+
+
+async def wait_ready(client, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+# -------------------------------------------------
+# Scenarios
+# -------------------------------------------------
+# Each scenario is a factory: given the shared fixture it returns an
+# async callable that sends one request and returns the response.
+
+def scenario_register(client, fx):
+    counter = iter(range(10**9))
+    run = f"{os.getpid()}-{int(time.time())}"
+
+    async def one():
+        n = next(counter)
+        return await client.post("/api/register", json={
+            "email": f"new{n}-{run}@bench.example", "full_name": f"New User {n}", "password": PASSWORD,
+        })
+    return one
+
+
+def scenario_login(client, fx):
+    async def one():
+        return await client.post("/api/login", json={
+            "email": f"user{fx['rng'].randrange(ARGS.users)}@bench.example", "password": PASSWORD,
+        })
+    return one
+
+
+def scenario_me(client, fx):
+    # get_current_user plus one keyset page of the caller's activity log
+    async def one():
+        return await client.get("/api/activity-logs", headers=fx["rng"].choice(fx["auth"]))
+    return one
+
+
+def scenario_search(client, fx):
+    today = datetime.utcnow().date()
+
+    async def one():
+        rng = fx["rng"]
+        return await client.get("/api/flights/search", params={
+            "origin": rng.choice(fx["airports"]),
+            "departure_date": (today + timedelta(days=rng.randrange(60))).isoformat(),
+        })
+    return one
+
+
+def scenario_availability(client, fx):
+    async def one():
+        return await client.get(f"/api/flights/{fx['rng'].choice(fx['seat_flights'])}/availability")
+    return one
+
+
+def scenario_airports(client, fx):
+    async def one():
+        return await client.get("/api/airports")
+    return one
+
+
+def scenario_hold(client, fx):
+    async def one():
+        rng = fx["rng"]
+        return await client.post(f"/api/flights/{rng.choice(fx['seat_flights'])}/holds",
+                                 json={"seat_class": "economy"}, headers=rng.choice(fx["auth"]))
+    return one
+
+
+SCENARIOS = {
+    "register": scenario_register,
+    "login": scenario_login,
+    "me": scenario_me,
+    "search": scenario_search,
+    "availability": scenario_availability,
+    "airports": scenario_airports,
+    "hold": scenario_hold,
+}
+
+# -------------------------------------------------
+# Driver
+# -------------------------------------------------
+def percentile(sorted_ms, q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_ms) - 1, int(round(q / 100 * len(sorted_ms))) - 1))
+    return round(sorted_ms[index], 2)
+
+
+async def drive(one, requests: int, concurrency: int) -> dict:
+    latencies, statuses = [], {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                status = (await one()).status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "seconds": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+async def run(names, fx) -> dict:
+    import httpx
+
+    port = free_port()
+    server = start_server(port)
+    limits = httpx.Limits(max_connections=ARGS.concurrency, max_keepalive_connections=ARGS.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_ready(client, server)
+            fx["auth"] = []
+            for i in range(min(ARGS.users, 100)):
+                r = await client.post("/api/login", json={"email": f"user{i}@bench.example", "password": PASSWORD})
+                r.raise_for_status()
+                fx["auth"].append({"Authorization": f"Bearer {r.json()['access_token']}"})
+
+            results = {}
+            for name in names:
+                one = SCENARIOS[name](client, fx)
+                if ARGS.warmup:
+                    await drive(one, ARGS.warmup, ARGS.concurrency)
+                results[name] = r = await drive(one, ARGS.requests, ARGS.concurrency)
+                print(f"{name:<13} {r['rps']:8.1f} req/s   p50 {r['p50_ms']:7.2f}   p95 {r['p95_ms']:7.2f}   "
+                      f"p99 {r['p99_ms']:7.2f} ms   errors {r['errors']}", file=sys.stderr)
+            return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+# -------------------------------------------------
+# Baseline
+# -------------------------------------------------
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=APP_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Scenarios whose RPS dropped or p95 rose by more than `tolerance` percent."""
+    regressions = []
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('timestamp')}):",
+          file=sys.stderr)
+    for name, now in current["scenarios"].items():
+        then = baseline["scenarios"].get(name)
+        if then is None:
+            continue
+        rps = (now["rps"] - then["rps"]) / then["rps"] * 100
+        p95 = (now["p95_ms"] - then["p95_ms"]) / then["p95_ms"] * 100
+        regressed = rps < -tolerance or p95 > tolerance
+        print(f"{name:<13} rps {rps:+6.1f}%   p95 {p95:+6.1f}%{'   REGRESSION' if regressed else ''}",
+              file=sys.stderr)
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    names = list(SCENARIOS) if ARGS.scenarios == "all" else ARGS.scenarios.split(",")
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    rng = random.Random(11)
+    t0 = time.perf_counter()
+    fx = seed(rng)
+    fx["rng"] = rng
+    print(f"dialect={engine.dialect.name} users={ARGS.users} flights={ARGS.flights} "
+          f"seat_flights={len(fx['seat_flights'])} (seeded in {time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    engine.dispose()  # the server has its own connections
+
+    result = {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(ARGS).items() if k not in ("output", "compare")},
+        },
+        "scenarios": asyncio.run(run(names, fx)),
+    }
+
+    text = json.dumps(result, indent=2)
+    if ARGS.output:
+        with open(os.path.join(INVOKED_FROM, ARGS.output), "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if ARGS.compare:
+        with open(os.path.join(INVOKED_FROM, ARGS.compare)) as f:
+            regressions = compare(result, json.load(f), ARGS.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# FILE: benchmarks/bench_db_modes.py
+# Concurrent-request throughput of DB_MODE=sync vs DB_MODE=async
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_db_modes.py --requests 2000 --concurrency 100
+#   DATABASE_URL=postgresql://... python benchmarks/bench_db_modes.py
+#
+# Each mode runs in its own interpreter because DB_MODE is read at import.
+# bcrypt is turned down to the minimum cost so the database path dominates.
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+PASSWORD = "benchmark-password"
+
+
+async def drive(requests: int, concurrency: int, users: int) -> dict:
+    import httpx
+    import main
+    from migrate import migrate
+
+    migrate()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(users):
+            await client.post("/api/register", json={
+                "email": f"user{i}@bench.example",
+                "full_name": f"Bench User {i}",
+                "password": PASSWORD,
+            })
+
+        sem = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(i):
+            async with sem:
+                start = time.perf_counter()
+                r = await client.post("/api/login", json={
+                    "email": f"user{i % users}@bench.example",
+                    "password": PASSWORD,
+                })
+                latencies.append(time.perf_counter() - start)
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "mode": os.environ["DB_MODE"],
+        "requests": requests,
+        "concurrency": concurrency,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def child(args):
+    sys.path.insert(0, APP_DIR)
+    os.chdir(tempfile.mkdtemp())  # uploads go under static/ in the cwd
+    print(json.dumps(asyncio.run(drive(args.requests, args.concurrency, args.users))))
+
+
+def parent(args):
+    results = []
+    for mode in ("sync", "async"):
+        workdir = tempfile.mkdtemp()
+        env = dict(os.environ)
+        env.setdefault("SECRET_KEY", "benchmark-secret")
+        env["BCRYPT_ROUNDS"] = "4"
+        env["HASH_QUEUE_LIMIT"] = str(args.concurrency)
+        env["DB_MODE"] = mode
+        # Every login comes from one client; keep the login limiter out of the way
+        env["LOGIN_RATE_PER_IP"] = env["LOGIN_RATE_PER_EMAIL"] = f"{10 * args.requests}/1"
+        if "DATABASE_URL" not in os.environ:
+            env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        out = subprocess.run(
+            [sys.executable, __file__, "--child",
+             "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency),
+             "--users", str(args.users)],
+            env=env, check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    for r in results:
+        print(f"{r['mode']:<6} {r['rps']:8.1f} req/s   p50 {r['p50_ms']:7.2f} ms   p99 {r['p99_ms']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+    child(args) if args.child else parent(args)
@@ -0,0 +1,114 @@
+# FILE: benchmarks/bench_email_delivery.py
+# Messages/sec: one SMTP connection per email vs the outbox worker
+# reusing a single connection, against a local aiosmtpd server
+#
+# Usage (from the repository root):
+#   pip install aiosmtpd   # benchmark-only dependency
+#   python benchmarks/bench_email_delivery.py --messages 2000
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'email.db')}"
+)
+
+import aiosmtplib  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from email_service import (  # noqa: E402
+    EmailDeliveryWorker, SMTPTransport, build_message, queue_email, verification_email,
+)
+from models import EmailOutbox  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def fill_outbox(messages: int):
+    subject, html_content = verification_email("token", "Bench User")
+    db = SessionLocal()
+    for i in range(messages):
+        queue_email(db, f"user{i}@bench.example", subject, html_content)
+    db.commit()
+    db.close()
+
+
+async def connection_per_message(port: int, messages: int) -> float:
+    """The previous production path: aiosmtplib.send() per email."""
+    subject, html_content = verification_email("token", "Bench User")
+    t0 = time.perf_counter()
+    for i in range(messages):
+        await aiosmtplib.send(
+            build_message(f"user{i}@bench.example", subject, html_content),
+            hostname="127.0.0.1", port=port, start_tls=False,
+        )
+    return time.perf_counter() - t0
+
+
+async def outbox_worker(port: int, batch: int) -> tuple:
+    transport = SMTPTransport(hostname="127.0.0.1", port=port, username=None,
+                              password=None, start_tls=False)
+    worker = EmailDeliveryWorker(transport=transport, batch_size=batch)
+    t0 = time.perf_counter()
+    while await worker.run_once():
+        pass
+    elapsed = time.perf_counter() - t0
+    await transport.close()
+    return elapsed, worker.sent, transport.connects
+
+
+async def run(args):
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        naive = await connection_per_message(args.port, args.naive_sample)
+        naive_received = handler.received
+
+        Base.metadata.create_all(bind=engine)
+        t0 = time.perf_counter()
+        fill_outbox(args.messages)
+        enqueue = time.perf_counter() - t0
+        elapsed, sent, connects = await outbox_worker(args.port, args.batch)
+    finally:
+        controller.stop()
+
+    with engine.connect() as conn:
+        pending = conn.execute(
+            select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status != "sent")
+        ).scalar()
+
+    print(f"dialect={engine.dialect.name}")
+    print(f"connection/message {naive_received:>6} sent {naive:7.2f}s "
+          f"{naive_received / naive:9.0f} msg/s")
+    print(f"outbox worker      {sent:>6} sent {elapsed:7.2f}s "
+          f"{sent / elapsed:9.0f} msg/s  connections={connects} batch={args.batch}")
+    print(f"enqueue            {args.messages:>6} rows {enqueue:7.2f}s "
+          f"{args.messages / enqueue:9.0f} rows/s  left unsent={pending}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--naive-sample", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8025)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
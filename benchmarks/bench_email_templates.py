@@ -0,0 +1,109 @@
+# FILE: benchmarks/bench_email_templates.py
+# Renders/sec: per-call f-string HTML vs compiled Jinja2 templates
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_email_templates.py --renders 20000
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from jinja2 import Environment, select_autoescape  # noqa: E402
+
+from email_templates import (  # noqa: E402
+    TEMPLATE_DIR, InliningLoader, load_templates, render_batch, render_email,
+)
+
+_STYLE = """
+            body { font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px; }
+            .container { background: white; padding: 30px; border-radius: 10px; max-width: 600px; margin: 0 auto; }
+            .header { background: linear-gradient(135deg, #667eea, #764ba2); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }
+            .content { padding: 20px; }
+            .button { background: #667eea; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; margin: 20px 0; }
+            .footer { text-align: center; color: #666; margin-top: 30px; font-size: 12px; }
+"""
+
+
+def fstring_verification(token: str, user_name: str) -> str:
+    """The previous implementation: the whole document rebuilt per call."""
+    verification_link = f"http://127.0.0.1:8000/verify-email?token={token}"
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <style>{_STYLE}</style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>✈️ Welcome to SkyLink Airlines!</h1>
+            </div>
+            <div class="content">
+                <h2>Hello {user_name},</h2>
+                <p>Thank you for registering with SkyLink Airlines!</p>
+                <p>Please verify your email address by clicking the button below:</p>
+                <a href="{verification_link}" class="button">Verify Email Address</a>
+                <p>Or copy this link: <br><code>{verification_link}</code></p>
+                <p>This link will expire in 24 hours.</p>
+            </div>
+            <div class="footer">
+                <p>© 2024 SkyLink Airlines. All rights reserved.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+
+def compile_per_call(n: int):
+    """Jinja2 without the shared compiled environment: parse + inline each send."""
+    for i in range(n):
+        env = Environment(loader=InliningLoader(str(TEMPLATE_DIR)),
+                          autoescape=select_autoescape(["html"]))
+        env.get_template("verification.html").render(
+            user_name=f"User {i}", verification_link=f"http://x/verify?token=tok{i}")
+
+
+def rate(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    fn(n)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=20_000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    load_templates()
+    print(f"compile + inline CSS once: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    flight = {
+        "flight_number": "SK1234", "origin": "JFK", "destination": "LHR",
+        "departure_datetime": datetime(2026, 5, 1, 18, 45), "gate": "B22",
+    }
+    passengers = [{"user_name": f"Passenger {i}", "seat_number": f"{i % 40 + 1}C"}
+                  for i in range(args.renders)]
+
+    results = {
+        "f-string (old)": rate(
+            lambda n: [fstring_verification(f"tok{i}", f"User {i}") for i in range(n)], args.renders),
+        "compile per call": rate(compile_per_call, max(args.renders // 100, 10)),
+        "render_email": rate(
+            lambda n: [render_email("verification", user_name=f"User {i}",
+                                    verification_link=f"http://x/verify?token=tok{i}")
+                       for i in range(n)], args.renders),
+        "render_batch (delay)": rate(
+            lambda n: list(render_batch("flight_delay", passengers[:n], **flight)), args.renders),
+    }
+    for label, per_sec in results.items():
+        print(f"{label:<22} {per_sec:10.0f} renders/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# FILE: benchmarks/bench_fare_engine.py
+# Pricing a search page: NumPy batch vs one Python loop per (flight, class)
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_fare_engine.py --flights 10000
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'fares.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import fare_engine as fe  # noqa: E402
+
+
+def make_rows(n: int, now: datetime):
+    rows = []
+    for i in range(n):
+        seats = (random.randint(100, 250), random.randint(8, 40), random.randint(0, 12))
+        rows.append((
+            i, now + timedelta(hours=random.randint(1, 24 * 120)),
+            *(random.randint(0, s) for s in seats),
+            *(Decimal(random.randint(60, 400)) * m for m in (1, 3, 8)),
+            *seats,
+        ))
+    return rows
+
+
+def loop_price(rows, now):
+    """Reference implementation: the same formula, one cell at a time."""
+    out = {}
+    load_mult = fe.LOAD_MULTIPLIERS.tolist()
+    advance_days = fe.ADVANCE_DAYS.tolist()
+    advance_mult = fe.ADVANCE_MULTIPLIERS.tolist()
+    for row in rows:
+        days = (row[1] - now).total_seconds() / 86400
+        tier = sum(1 for d in advance_days if days >= d)
+        fares = {}
+        for i, cls in enumerate(fe.SEAT_CLASSES):
+            available, base, capacity = row[2 + i], row[5 + i], row[8 + i]
+            if not available or not capacity:
+                fares[cls] = None
+                continue
+            bucket = min(int((1 - available / capacity) * fe.FARE_LOAD_BUCKETS), fe.FARE_LOAD_BUCKETS - 1)
+            price = float(base) * load_mult[bucket] * advance_mult[tier]
+            fares[cls] = Decimal(price).quantize(Decimal("0.01"), ROUND_HALF_EVEN)
+        out[row[0]] = fares
+    return out
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--page", type=int, default=50, help="rows returned after sorting by fare")
+    args = parser.parse_args()
+
+    random.seed(7)
+    now = datetime.utcnow()
+    rows = make_rows(args.flights, now)
+    engine = fe.FareEngine()
+
+    loop_ms, expected = timed(lambda: loop_price(rows, now), args.runs)
+    batch_ms, got = timed(lambda: engine.price_rows(rows, now), args.runs)
+    arrays = fe.FareBatch(rows)
+    arrays_ms, _ = timed(lambda: engine.price_batch(arrays, now), args.runs)
+
+    def cheapest_page():
+        # Sort the whole result set on the raw array, convert only the page returned
+        prices = engine.price_batch(arrays, now)
+        order = np.argsort(np.nan_to_num(prices[:, 0], nan=np.inf), kind="stable")[:args.page]
+        return fe.fare_dicts(arrays.flight_ids, prices, arrays.flight_ids[order].tolist())
+
+    page_ms, page = timed(cheapest_page, args.runs)
+
+    mismatches = sum(
+        1 for fid, fares in expected.items()
+        for cls, fare in fares.items()
+        if fare is not None and abs(fare - got[fid][cls]) > Decimal("0.01")
+    )
+    cells = args.flights * len(fe.SEAT_CLASSES)
+    print(f"flights={args.flights} cells={cells} mismatches={mismatches}")
+    print(f"python loop        {loop_ms:8.2f} ms")
+    print(f"price_rows         {batch_ms:8.2f} ms   ({loop_ms / batch_ms:.1f}x, incl. array build + Decimal)")
+    print(f"  price_batch      {arrays_ms:8.2f} ms   ({cells / arrays_ms / 1000:.1f}M cells/s, no Decimal)")
+    print(f"cheapest {len(page):<4}      {page_ms:8.2f} ms   (price_batch + argsort + Decimal for the page only)")
+
+
+if __name__ == "__main__":
+    main()
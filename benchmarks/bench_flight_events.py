@@ -0,0 +1,118 @@
+# FILE: benchmarks/bench_flight_events.py
+# Flight event fan-out: queries and latency for N subscribers, one or two workers
+#
+# Two brokers share an in-memory bus standing in for the Redis backend,
+# the way two uvicorn workers would share a Redis channel.
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_flight_events.py --subscribers 5000 --flights 50 --changes 200
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'events.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import select, update  # noqa: E402
+
+from database import engine  # noqa: E402
+from flight_events import FlightEventBroker  # noqa: E402
+from migrate import migrate  # noqa: E402
+from models import Flight  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+
+class SharedBus:
+    """Local stand-in for Redis pub/sub: every publish reaches every attached broker."""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def backend(self):
+        bus = self
+
+        class BusBackend:
+            async def start(self, deliver, resync=None):
+                bus._subscribers.append(deliver)
+
+            async def publish(self, flight_ids):
+                for deliver in bus._subscribers:
+                    deliver(flight_ids)
+
+            async def stop(self):
+                pass
+
+        return BusBackend()
+
+
+async def run(brokers, flight_ids, subscribers: int, changes: int, rng):
+    for broker in brokers:
+        await broker.start()
+    subscriptions = []
+    t0 = time.perf_counter()
+    for i in range(subscribers):
+        broker = brokers[i % len(brokers)]
+        subscriptions.append(await broker.subscribe(flight_ids[i % len(flight_ids)]))
+    subscribe_ms = (time.perf_counter() - t0) * 1000
+    for s in subscriptions:
+        await s.next(0)  # drain the initial snapshot
+
+    latencies = []
+    before = sum(b.snapshot_queries for b in brokers)
+    for n in range(changes):
+        flight_id = rng.choice(flight_ids)
+        with engine.begin() as conn:
+            conn.execute(update(Flight).where(Flight.id == flight_id).values(available_economy=n))
+        watchers = [s for s in subscriptions if s.flight_id == flight_id]
+        t0 = time.perf_counter()
+        brokers[n % len(brokers)].publish([flight_id])   # any worker may see the change first
+        await asyncio.gather(*(s.next(5) for s in watchers))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    queries = sum(b.snapshot_queries for b in brokers) - before
+
+    for broker in brokers:
+        await broker.stop()
+    return subscribe_ms, latencies, queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--flights", type=int, default=50, help="flights being watched")
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--coalesce-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    migrate()
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, rng=rng)
+        seed_flights(conn, route_ids, aircraft_ids, args.flights, rng=rng)
+        flight_ids = conn.execute(select(Flight.id)).scalars().all()
+
+    per_flight = args.subscribers / len(flight_ids)
+    print(f"dialect={engine.dialect.name} subscribers={args.subscribers} flights={len(flight_ids)} "
+          f"(~{per_flight:.0f} per flight) changes={args.changes}")
+    for label, workers in (("1 worker, local backend", 1), ("2 workers, shared bus", 2)):
+        bus = SharedBus()
+        brokers = [FlightEventBroker(backend=bus.backend(), coalesce_ms=args.coalesce_ms,
+                                     max_subscribers=args.subscribers) for _ in range(workers)]
+        subscribe_ms, latencies, queries = asyncio.run(
+            run(brokers, flight_ids, args.subscribers, args.changes, rng))
+        latencies.sort()
+        print(f"{label:<24} subscribe {subscribe_ms:7.0f} ms total   "
+              f"fan-out p50 {statistics.median(latencies):6.2f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1]:6.2f} ms   "
+              f"{queries / args.changes:.1f} snapshot queries per change "
+              f"(vs {per_flight:.0f} if each client polled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# FILE: benchmarks/bench_flight_search.py
+# p50/p99 latency of /api/flights/search queries on a synthetic schedule
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_flight_search.py --flights 1000000 --queries 2000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_flight_search.py
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+)
+
+from sqlalchemy import select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from flight_search import build_search_query, paginate  # noqa: E402
+from models import Airport, Route  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=3, help="cursor pages followed per query")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn)
+        seed_flights(conn, route_ids, aircraft_ids, args.flights)
+    print(f"seeded {args.flights} flights in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    db = SessionLocal()
+    pairs = db.execute(
+        select(Route.origin_airport_id, Route.destination_airport_id)
+    ).all()
+    codes = dict(db.execute(select(Airport.id, Airport.code)).all())
+    today = datetime.utcnow().date()
+
+    first_page, next_pages = [], []
+    for _ in range(args.queries):
+        origin_id, destination_id = rng.choice(pairs)
+        day = (today + timedelta(days=rng.randrange(365))).isoformat()
+        cursor = None
+        for page in range(args.pages):
+            t0 = time.perf_counter()
+            stmt, limit = build_search_query(
+                origin=codes[origin_id], destination=codes[destination_id],
+                departure_date=day, cursor=cursor, limit=args.limit,
+            )
+            _, cursor = paginate(db.execute(stmt).scalars().all(), limit)
+            (first_page if page == 0 else next_pages).append(time.perf_counter() - t0)
+            if cursor is None:
+                break
+    db.close()
+
+    for label, samples in (("first page", first_page), ("cursor pages", next_pages)):
+        if samples:
+            print(f"{label:<13} n={len(samples):<6} "
+                  f"p50 {percentile(samples, 50) * 1000:7.3f} ms   "
+                  f"p99 {percentile(samples, 99) * 1000:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
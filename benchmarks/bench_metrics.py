@@ -0,0 +1,74 @@
+# FILE: benchmarks/bench_metrics.py
+# Per-request cost of MetricsMiddleware, and /metrics render time
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_metrics.py --requests 20000 --routes 50
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from metrics import MetricsMiddleware, http_latency, registry  # noqa: E402
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def per_request_us(app, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):
+            await client.get(f"/api/items/{i}")
+        samples = []
+        for i in range(requests):
+            t0 = time.perf_counter()
+            await client.get(f"/api/items/{i}")
+            samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--routes", type=int, default=50, help="route/method series for the render test")
+    args = parser.parse_args()
+
+    plain = asyncio.run(per_request_us(build_app(False), args.requests))
+    instrumented = asyncio.run(per_request_us(build_app(True), args.requests))
+    print(f"requests={args.requests}")
+    print(f"without middleware  p50 {plain:8.1f} us")
+    print(f"with middleware     p50 {instrumented:8.1f} us   (+{instrumented - plain:.1f} us)")
+
+    t0 = time.perf_counter()
+    for _ in range(100_000):
+        http_latency.observe(0.012, "GET", "/bench")
+    print(f"Histogram.observe   {(time.perf_counter() - t0) * 10:8.2f} us")
+
+    for r in range(args.routes):
+        for method in ("GET", "POST"):
+            http_latency.observe(0.01, method, f"/api/route/{r}")
+    t0 = time.perf_counter()
+    body = registry.render()
+    print(f"/metrics render     {(time.perf_counter() - t0) * 1000:8.2f} ms   "
+          f"({len(body.splitlines())} lines, {len(body) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# FILE: benchmarks/bench_password_hashing.py
+# Logins/sec: inline bcrypt on the request threadpool vs the bounded hash pool
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_password_hashing.py --logins 200 --concurrency 64
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from password_hashing import PasswordHasher, get_pwd_context  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+async def run_before(stored_hash: str, logins: int, concurrency: int) -> float:
+    """Old behaviour: CryptContext.verify inline on Starlette's threadpool."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await run_in_threadpool(get_pwd_context().verify, PASSWORD, stored_hash)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return time.perf_counter() - start
+
+
+async def run_after(stored_hash: str, logins: int, concurrency: int, kind: str) -> float:
+    hasher = PasswordHasher(queue_limit=logins, kind=kind)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            await hasher.verify(PASSWORD, stored_hash)
+
+    await hasher.verify(PASSWORD, stored_hash)  # warm up the pool
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return elapsed
+
+
+def report(label: str, logins: int, elapsed: float, cores: int):
+    rate = logins / elapsed
+    print(f"{label:<22} {rate:8.1f} logins/s   {rate / cores:7.1f} logins/s/core")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    stored_hash = get_pwd_context().hash(PASSWORD)
+    print(f"bcrypt rounds={stored_hash.split('$')[2]}  cores={cores}")
+
+    report("before (threadpool)", args.logins,
+           asyncio.run(run_before(stored_hash, args.logins, args.concurrency)), cores)
+    for kind in ("thread", "process"):
+        elapsed = asyncio.run(run_after(stored_hash, args.logins, args.concurrency, kind))
+        report(f"after ({kind} pool)", args.logins, elapsed, cores)
+
+
+if __name__ == "__main__":
+    main()
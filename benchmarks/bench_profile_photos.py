@@ -0,0 +1,104 @@
+# FILE: benchmarks/bench_profile_photos.py
+# Concurrent photo uploads: read-whole-body + inline Pillow vs the streaming PhotoStore
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_profile_photos.py --uploads 32 --size 3000
+#
+# Reports wall time, the worst event-loop stall seen by a 5 ms ticker and
+# the Python heap peak while the uploads are in flight.
+
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())  # photos are written under ./static
+
+from PIL import Image  # noqa: E402
+
+from profile_photos import PhotoStore, photo_path  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def make_jpegs(count: int, size: int):
+    images = []
+    for i in range(count):
+        image = Image.effect_noise((size, size * 3 // 4), 40 + i).convert("RGB")
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", quality=90)
+        images.append(buf.getvalue())
+    return images
+
+
+async def body(data: bytes):
+    for i in range(0, len(data), CHUNK):
+        await asyncio.sleep(0)  # the ASGI server hands over one chunk at a time
+        yield data[i:i + CHUNK]
+
+
+async def naive_upload(data: bytes, sizes):
+    # What a straightforward UploadFile handler does: whole file in memory, resize on the loop
+    content = b"".join([chunk async for chunk in body(data)])
+    digest = hashlib.sha256(content).hexdigest()
+    target = photo_path(digest, "jpg")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+    with Image.open(io.BytesIO(content)) as image:
+        for size in sorted(sizes, reverse=True):
+            image.thumbnail((size, size))
+            image.save(photo_path(digest, "", size), "JPEG", quality=85)
+
+
+async def run(label: str, upload, images):
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - t0 - 0.005)
+
+    tracemalloc.start()
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(upload(data) for data in images))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await tick
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed * 1000:8.0f} ms   worst loop stall {max(stalls) * 1000:7.1f} ms   "
+          f"heap peak {peak / 1e6:6.1f} MB")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--size", type=int, default=3000, help="image width in pixels")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    images = make_jpegs(args.uploads, args.size)
+    print(f"uploads={args.uploads} avg size={sum(map(len, images)) / len(images) / 1e6:.1f} MB "
+          f"workers={args.workers}")
+
+    store = PhotoStore(max_bytes=64 * 1024 * 1024, workers=args.workers)
+    await run("read-all + inline", lambda data: naive_upload(data, store.sizes), images)
+    # Fresh content so neither run benefits from the other's files
+    images = [data + b"\0" for data in images]
+    await run("PhotoStore (streamed)", lambda data: store.save(body(data)), images)
+    await run("PhotoStore (dedup)", lambda data: store.save(body(data)), images)
+    store.shutdown()
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
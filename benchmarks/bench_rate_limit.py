@@ -0,0 +1,59 @@
+# FILE: benchmarks/bench_rate_limit.py
+# Login rate-limit decision cost and memory with many distinct clients
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_rate_limit.py --clients 100000 --decisions 500000
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from rate_limit import LocalBucketStore, LoginRateLimiter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--decisions", type=int, default=500_000)
+    args = parser.parse_args()
+
+    store = LocalBucketStore()
+    limiter = LoginRateLimiter(store)
+    ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(args.clients)]
+    emails = [f"user{i}@bench.example" for i in range(args.clients)]
+    picks = [random.randrange(args.clients) for _ in range(args.decisions)]
+
+    samples = []
+    t0 = time.perf_counter()
+    for i in picks:
+        s = time.perf_counter()
+        limiter.check(ips[i], emails[i])
+        samples.append((time.perf_counter() - s) * 1e6)
+    elapsed = time.perf_counter() - t0
+
+    # Memory: a fresh store holding one IP and one email bucket per client
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fresh = LocalBucketStore()
+    for ip, email in zip(ips, emails):
+        fresh.take("ip:" + ip, 20, 1 / 3)
+        fresh.take("email:" + email, 5, 1 / 12)
+    grown = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, "filename"))
+    tracemalloc.stop()
+
+    samples.sort()
+    print(f"clients={args.clients} decisions={args.decisions} keys={len(store)}")
+    print(f"{args.decisions / elapsed:,.0f} decisions/s  "
+          f"p50 {statistics.median(samples):.2f} us  p99 {samples[int(len(samples) * 0.99)]:.2f} us")
+    print(f"memory {grown / 1e6:.1f} MB for {len(fresh)} keys (~{grown / len(fresh):.0f} bytes/key)")
+    print(limiter.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# FILE: benchmarks/bench_reference_cache.py
+# GET /api/routes, /api/airports: cold (ORM + serialization) vs cached bytes vs 304
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_reference_cache.py --airports 500 --routes 5000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_reference_cache.py
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'reference.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from main import app  # noqa: E402
+from database import engine  # noqa: E402
+from migrate import migrate  # noqa: E402
+from models import Airport, Route  # noqa: E402
+from reference_cache import reference_cache  # noqa: E402
+
+
+def seed(airports: int, routes: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Airport.__table__), [
+            {"code": f"A{i:04d}", "name": f"Airport {i}", "city": f"City {i}",
+             "country": "BD", "timezone": "Asia/Dhaka"}
+            for i in range(1, airports + 1)
+        ])
+        conn.execute(insert(Route.__table__), [
+            {"origin_airport_id": random.randint(1, airports),
+             "destination_airport_id": random.randint(1, airports),
+             "distance_km": random.randint(200, 9000), "estimated_duration": random.randint(40, 800),
+             "base_price_economy": 120, "base_price_business": 400, "base_price_first": 1100,
+             "is_active": True}
+            for _ in range(routes)
+        ])
+
+
+async def timed(client, path: str, runs: int, headers=None, before=None):
+    samples = []
+    for _ in range(runs):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        r = await client.get(path, headers=headers)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), r
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/api/airports", "/api/routes"):
+            name = path.rsplit("/", 1)[1]
+            cold, r = await timed(client, path, args.runs, before=lambda: reference_cache.bump(name))
+            warm, r = await timed(client, path, args.runs)
+            not_modified, r304 = await timed(client, path, args.runs, headers={"If-None-Match": r.headers["etag"]})
+            assert r304.status_code == 304
+            print(f"{path:<14} {len(r.content) / 1024:7.0f} KiB   cold {cold:8.2f} ms   "
+                  f"cached {warm:7.3f} ms   304 {not_modified:7.3f} ms   ({cold / warm:.0f}x)")
+    print(reference_cache.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--airports", type=int, default=500)
+    parser.add_argument("--routes", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    migrate()
+    seed(args.airports, args.routes)
+    print(f"dialect={engine.dialect.name} airports={args.airports} routes={args.routes}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# FILE: benchmarks/bench_schedules.py
+# Schedule import (row-by-row ORM vs batched upsert) and streaming export memory
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_schedules.py --flights 5000 --export 200000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_schedules.py
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.chdir(tempfile.mkdtemp())
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(os.getcwd(), 'schedules.db')}")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from migrate import migrate  # noqa: E402
+from models import Aircraft, Airport, Flight, Route  # noqa: E402
+from schedules import export_chunks, import_file  # noqa: E402
+from seat_maps import generate_seat_maps  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+HEADER = "flight_number,origin,destination,aircraft_number,departure_datetime,arrival_datetime,gate\n"
+
+
+def schedule_rows(conn, prefix: str, count: int, rng):
+    codes = dict(conn.execute(select(Airport.id, Airport.code)).all())
+    routes = [(codes[o], codes[d]) for o, d in conn.execute(
+        select(Route.origin_airport_id, Route.destination_airport_id))]
+    aircraft = conn.execute(select(Aircraft.aircraft_number)).scalars().all()
+    start = datetime(2031, 1, 1)
+    for i in range(count):
+        origin, destination = rng.choice(routes)
+        departure = start + timedelta(minutes=rng.randrange(180 * 24 * 60))
+        yield (f"{prefix}{i:06d}", origin, destination, rng.choice(aircraft),
+               departure, departure + timedelta(minutes=rng.randint(45, 600)))
+
+
+def orm_one_by_one(rows) -> float:
+    """What POST /api/flights does, once per row."""
+    with engine.connect() as conn:
+        route_ids = {(o, d): r for r, o, d in conn.execute(select(
+            Route.id, Route.origin_airport_id, Route.destination_airport_id))}
+        airport_ids = dict(conn.execute(select(Airport.code, Airport.id)).all())
+        aircraft_ids = dict(conn.execute(select(Aircraft.aircraft_number, Aircraft.id)).all())
+    t0 = time.perf_counter()
+    for number, origin, destination, aircraft, departure, arrival in rows:
+        with SessionLocal() as db:
+            flight = Flight(
+                flight_number=number, status="scheduled",
+                route_id=route_ids[(airport_ids[origin], airport_ids[destination])],
+                aircraft_id=aircraft_ids[aircraft],
+                departure_datetime=departure, arrival_datetime=arrival,
+            )
+            db.add(flight)
+            db.flush()
+            generate_seat_maps(db.connection(), [flight.id])
+            db.commit()
+    return time.perf_counter() - t0
+
+
+def bulk_import(rows) -> tuple:
+    body = io.BytesIO((HEADER + "".join(
+        f"{n},{o},{d},{a},{dep.isoformat()},{arr.isoformat()},\n" for n, o, d, a, dep, arr in rows
+    )).encode())
+    t0 = time.perf_counter()
+    report = import_file(engine, "flights", body, "csv")
+    return time.perf_counter() - t0, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=5000, help="rows in the imported file")
+    parser.add_argument("--baseline", type=int, default=500, help="rows inserted one by one")
+    parser.add_argument("--export", type=int, default=200_000, help="flights in the table for the export run")
+    args = parser.parse_args()
+
+    migrate()
+    rng = random.Random(11)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, airports=60, aircraft=40, rng=rng)
+        baseline_rows = list(schedule_rows(conn, "OR", args.baseline, rng))
+        import_rows = list(schedule_rows(conn, "IM", args.flights, rng))
+    print(f"dialect={engine.dialect.name} seats/flight=180")
+
+    orm = orm_one_by_one(baseline_rows)
+    print(f"one by one (ORM)     {args.baseline / orm:9.0f} flights/s   ({orm:.2f} s for {args.baseline})")
+    elapsed, report = bulk_import(import_rows)
+    assert report.rejected == 0, report.errors[:3]
+    print(f"bulk import          {args.flights / elapsed:9.0f} flights/s   ({elapsed:.2f} s for {args.flights}, "
+          f"seat maps included)")
+    elapsed, report = bulk_import(import_rows)
+    print(f"re-import (updates)  {args.flights / elapsed:9.0f} flights/s   ({report.updated} updated)")
+
+    with engine.begin() as conn:
+        seed_flights(conn, route_ids, aircraft_ids, args.export, rng=rng)
+        total = conn.execute(select(func.count()).select_from(Flight)).scalar()
+    for fmt in ("csv", "ndjson"):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        size = sum(len(chunk) for chunk in export_chunks(engine, "flights", fmt))
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"export {fmt:<7}       {total / elapsed:9.0f} rows/s      ({total} rows, {size / 2**20:.1f} MiB out, "
+              f"peak {peak / 2**20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# FILE: benchmarks/bench_seat_availability.py
+# Seat-map latency and memory: ORM Flight.seats vs cached bitmaps
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_seat_availability.py --flights 1000
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'availability.db')}"
+)
+
+from sqlalchemy import select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Flight  # noqa: E402
+from seat_availability import SeatAvailabilityCache  # noqa: E402
+from seat_maps import generate_seat_maps  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+
+def orm_seat_map(db, flight_id):
+    flight = db.get(Flight, flight_id)
+    seats = [
+        {"seat_number": s.seat_number, "seat_class": s.seat_class, "is_window": s.is_window,
+         "is_aisle": s.is_aisle, "is_available": s.is_available}
+        for s in flight.seats
+    ]
+    db.expunge_all()  # no identity-map reuse between requests
+    return seats
+
+
+def timed(fn, flight_ids):
+    samples = []
+    for flight_id in flight_ids:
+        t0 = time.perf_counter()
+        fn(flight_id)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=1000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn)
+        seed_flights(conn, route_ids, aircraft_ids, args.flights)
+        flight_ids = conn.execute(select(Flight.id)).scalars().all()
+        generate_seat_maps(conn, flight_ids)
+
+    db = SessionLocal()
+    cache = SeatAvailabilityCache(maxsize=args.flights)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for flight_id in flight_ids:
+        cache.get(db, flight_id)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    orm = timed(lambda f: orm_seat_map(db, f), flight_ids)
+    seat_map = timed(lambda f: cache.seat_map(db, f), flight_ids)
+    counts = timed(lambda f: cache.availability(db, f), flight_ids)
+
+    print(f"flights={len(flight_ids)}  memory/flight={grown / len(flight_ids):.0f} bytes "
+          f"(layouts shared: {cache.stats()['layouts']})")
+    for label, (p50, p99) in (
+        ("ORM Flight.seats", orm),
+        ("cached seat map", seat_map),
+        ("cached counts", counts),
+    ):
+        print(f"{label:<18} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# FILE: benchmarks/bench_seat_maps.py
+# Seat rows/sec: ORM Flight.seats cascade vs bulk generate_seat_maps
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_seat_maps.py --flights 10000
+#   DATABASE_URL=postgresql://... python benchmarks/bench_seat_maps.py
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'seatmaps.db')}"
+)
+
+from sqlalchemy import delete, func, select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Flight, Seat  # noqa: E402
+from seat_maps import aircraft_layout, generate_seat_maps  # noqa: E402
+from seed import seed_flights, seed_reference  # noqa: E402
+
+
+def orm_cascade(flight_ids) -> int:
+    """The naive path: one Seat object per seat through Flight.seats."""
+    db = SessionLocal()
+    written = 0
+    for flight in db.execute(select(Flight).where(Flight.id.in_(flight_ids))).scalars():
+        prices = {
+            "first": flight.route.base_price_first,
+            "business": flight.route.base_price_business,
+            "economy": flight.route.base_price_economy,
+        }
+        for seat in aircraft_layout(flight.aircraft):
+            flight.seats.append(Seat(
+                seat_number=seat.seat_number, seat_class=seat.seat_class,
+                is_available=True, is_window=seat.is_window, is_aisle=seat.is_aisle,
+                price=prices[seat.seat_class],
+            ))
+            written += 1
+    db.commit()
+    db.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500, help="flights per generate_seat_maps call")
+    parser.add_argument("--orm-sample", type=int, default=200, help="flights for the ORM baseline")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn)
+        seed_flights(conn, route_ids, aircraft_ids, args.flights)
+        flight_ids = conn.execute(select(Flight.id).order_by(Flight.id)).scalars().all()
+
+    sample = flight_ids[:args.orm_sample]
+    t0 = time.perf_counter()
+    orm_rows = orm_cascade(sample)
+    orm_elapsed = time.perf_counter() - t0
+    with engine.begin() as conn:
+        conn.execute(delete(Seat))
+
+    t0 = time.perf_counter()
+    bulk_rows = 0
+    for i in range(0, len(flight_ids), args.batch):
+        with engine.begin() as conn:
+            bulk_rows += generate_seat_maps(conn, flight_ids[i:i + args.batch])
+    bulk_elapsed = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Seat)).scalar() == bulk_rows
+
+    print(f"dialect={engine.dialect.name}")
+    print(f"ORM cascade  {len(sample):>6} flights {orm_rows:>9} seats "
+          f"{orm_elapsed:7.2f}s  {orm_rows / orm_elapsed:10.0f} rows/s")
+    print(f"bulk         {len(flight_ids):>6} flights {bulk_rows:>9} seats "
+          f"{bulk_elapsed:7.2f}s  {bulk_rows / bulk_elapsed:10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
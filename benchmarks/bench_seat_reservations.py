@@ -0,0 +1,124 @@
+# FILE: benchmarks/bench_seat_reservations.py
+# Stress test: hundreds of concurrent bookers racing for one flight
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_seat_reservations.py --bookers 200 --seats 300
+#   DATABASE_URL=postgresql://... python benchmarks/bench_seat_reservations.py
+#
+# Exits non-zero if any seat was handed out twice or the counters drift.
+# SQLite serializes all writers, so with many bookers some give up with
+# "database is locked"; use PostgreSQL for meaningful throughput numbers.
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bookers", type=int, default=200)
+parser.add_argument("--seats", type=int, default=300)
+args = parser.parse_args()
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'seats.db')}"
+)
+os.environ.setdefault("DB_POOL_SIZE", str(args.bookers))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models import Flight, Seat, User  # noqa: E402
+from reservations import (  # noqa: E402
+    SeatUnavailable, availability_refresher, hold_seat, refresh_availability,
+)
+from seed import seed_reference  # noqa: E402
+
+
+def setup() -> int:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, airports=2, aircraft=1, routes_per_airport=1)
+        departure = datetime.utcnow() + timedelta(days=7)
+        flight_id = conn.execute(insert(Flight.__table__).values(
+            flight_number="SK0001", route_id=route_ids[0], aircraft_id=aircraft_ids[0],
+            departure_datetime=departure, arrival_datetime=departure + timedelta(hours=2),
+            status="scheduled", available_economy=args.seats, available_business=0,
+            available_first=0,
+        )).inserted_primary_key[0]
+        conn.execute(insert(Seat.__table__), [
+            {"flight_id": flight_id, "seat_number": f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+             "seat_class": "economy", "is_available": True, "price": 120}
+            for i in range(args.seats)
+        ])
+        conn.execute(insert(User.__table__), [
+            {"email": f"booker{i}@bench.example", "full_name": f"Booker {i}",
+             "hashed_password": "x", "role": "PASSENGER"}
+            for i in range(args.bookers)
+        ])
+    return flight_id
+
+
+def main():
+    flight_id = setup()
+    user_ids = SessionLocal().execute(select(User.id)).scalars().all()
+
+    won = []
+    errors = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.bookers)
+
+    def booker(user_id):
+        db = SessionLocal()
+        start_gate.wait()
+        try:
+            while True:
+                try:
+                    seat = hold_seat(db, flight_id, user_id, seat_class="economy")
+                except SeatUnavailable as e:
+                    if "left" in str(e):
+                        return
+                    continue
+                with lock:
+                    won.append(seat["seat_id"])
+        except Exception as e:  # report, don't hang the run
+            with lock:
+                errors.append(repr(e))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=booker, args=(uid,)) for uid in user_ids]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    db = SessionLocal()
+    held = db.execute(
+        select(func.count()).select_from(Seat).where(Seat.flight_id == flight_id, Seat.is_available.is_(False))
+    ).scalar()
+    refresh_availability(db, [flight_id])
+    counter = db.execute(select(Flight.available_economy).where(Flight.id == flight_id)).scalar()
+    availability_refresher.stop()
+
+    duplicates = [seat for seat, n in Counter(won).items() if n > 1]
+    print(f"bookers={args.bookers} seats={args.seats} dialect={engine.dialect.name}")
+    print(f"holds={len(won)}  {len(won) / elapsed:.1f} holds/s  errors={len(errors)}")
+    print(f"seats held in db={held}  duplicate grants={len(duplicates)}  available_economy={counter}")
+    for e in errors[:5]:
+        print("  error:", e)
+
+    ok = not duplicates and len(won) == held == args.seats and counter == 0
+    print("zero oversell: OK" if ok else "zero oversell: FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# FILE: benchmarks/bench_startup.py
+# Cold-start time: `import main`, create_app() and the lifespan startup
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_startup.py --runs 5
+#
+# Every sample is a fresh interpreter. The "floor" row imports only
+# FastAPI, SQLAlchemy and Pydantic, which the app cannot start without.
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+FLOOR = """
+import time; t0 = time.perf_counter()
+import fastapi, fastapi.security, sqlalchemy.orm, pydantic, email_validator
+print(time.perf_counter() - t0)
+"""
+
+STARTUP = """
+import time; t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+app = main.create_app()
+t2 = time.perf_counter()
+from fastapi.testclient import TestClient
+t3 = time.perf_counter()
+with TestClient(app):
+    t4 = time.perf_counter()
+print(t1 - t0, t2 - t1, t4 - t3)
+"""
+
+
+def run(code: str, env: dict, workdir: str, *flags: str):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        env=env, cwd=workdir, check=True, capture_output=True, text=True,
+    )
+
+
+def slowest_imports(env: dict, workdir: str, top: int):
+    """Top-level packages by cumulative import time, from -X importtime."""
+    err = run("import main", env, workdir, "-X", "importtime").stderr
+    totals = {}
+    for line in err.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match and len(match.group(2)) == 3:  # modules imported directly by main
+            totals[match.group(3)] = int(match.group(1)) / 1000
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of a table")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = APP_DIR
+    env.setdefault("SECRET_KEY", "benchmark-secret")
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+    run("import migrate; migrate.migrate()", env, workdir)  # also warms the bytecode cache
+
+    floor, imports, factory, lifespan = [], [], [], []
+    for _ in range(args.runs):
+        floor.append(float(run(FLOOR, env, workdir).stdout) * 1000)
+        a, b, c = map(float, run(STARTUP, env, workdir).stdout.split())
+        imports.append(a * 1000)
+        factory.append(b * 1000)
+        lifespan.append(c * 1000)
+
+    result = {
+        "runs": args.runs,
+        "floor_ms": round(statistics.median(floor), 1),
+        "import_main_ms": round(statistics.median(imports), 1),
+        "create_app_ms": round(statistics.median(factory), 1),
+        "lifespan_startup_ms": round(statistics.median(lifespan), 1),
+        "slowest_imports_ms": dict(slowest_imports(env, workdir, args.top)),
+    }
+    if args.json:
+        print(json.dumps(result))
+        return
+
+    print(f"framework floor      {result['floor_ms']:8.1f} ms  (fastapi + sqlalchemy + pydantic)")
+    print(f"import main          {result['import_main_ms']:8.1f} ms")
+    print(f"create_app()         {result['create_app_ms']:8.1f} ms")
+    print(f"lifespan startup     {result['lifespan_startup_ms']:8.1f} ms")
+    print(f"app's own import cost {result['import_main_ms'] - result['floor_ms']:7.1f} ms above the floor")
+    print("slowest direct imports of main (cumulative):")
+    for name, ms in result["slowest_imports_ms"].items():
+        print(f"  {name:<28} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
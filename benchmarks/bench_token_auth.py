@@ -0,0 +1,72 @@
+# FILE: benchmarks/bench_token_auth.py
+# Auth overhead per request: python-jose decode vs cached TokenVerifier
+#
+# Usage (from the repository root):
+#   python benchmarks/bench_token_auth.py --requests 50000 --tokens 1000
+
+import argparse
+import os
+import secrets
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from jose import jwt  # noqa: E402
+
+from token_auth import TokenVerifier  # noqa: E402
+
+SECRET = "bench-secret"
+ALGORITHM = "HS256"
+
+
+def make_tokens(n: int):
+    now = datetime.utcnow()
+    return [
+        jwt.encode({"sub": f"user{i}@bench.example", "iat": now, "exp": now + timedelta(minutes=30),
+                    "jti": secrets.token_hex(16)}, SECRET, algorithm=ALGORITHM)
+        for i in range(n)
+    ]
+
+
+def per_call_us(fn, tokens, requests: int):
+    samples = []
+    for i in range(requests):
+        token = tokens[i % len(tokens)]
+        t0 = time.perf_counter()
+        fn(token)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct active tokens")
+    parser.add_argument("--revoked", type=int, default=100_000, help="entries in the revocation set")
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.tokens)
+    verifier = TokenVerifier(SECRET, ALGORITHM)
+    # A large revocation list should not change the per-request cost
+    verifier._revoked_jtis.update({secrets.token_hex(16): 2**31 for _ in range(args.revoked)})
+    for token in tokens:
+        verifier.verify(token)  # warm the claims cache
+
+    results = {
+        "jose jwt.decode": per_call_us(
+            lambda t: jwt.decode(t, SECRET, algorithms=[ALGORITHM]), tokens, args.requests),
+        "TokenVerifier (hit)": per_call_us(verifier.verify, tokens, args.requests),
+    }
+    print(f"tokens={args.tokens} revoked entries={args.revoked} requests={args.requests}")
+    for label, (mean, p50, p99) in results.items():
+        print(f"{label:<20} mean {mean:7.2f} us   p50 {p50:7.2f} us   p99 {p99:7.2f} us")
+    print(verifier.stats())
+
+
+if __name__ == "__main__":
+    main()
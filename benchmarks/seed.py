@@ -0,0 +1,100 @@
+# FILE: benchmarks/seed.py
+# Synthetic reference data and flight schedules for the benchmarks
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from models import ActivityLog, Aircraft, Airport, Flight, Route, User  # noqa: E402
+
+CHUNK = 10_000
+STATUSES = ("scheduled",) * 8 + ("delayed", "cancelled")
+
+
+def airport_code(i: int) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+
+def seed_reference(conn, airports: int = 50, aircraft: int = 40, routes_per_airport: int = 8, rng=None):
+    """Airports, aircraft and routes. Returns (route_ids, aircraft_ids)."""
+    rng = rng or random.Random(42)
+    conn.execute(insert(Airport.__table__), [
+        {"code": airport_code(i), "name": f"Airport {i}", "city": f"City {i}",
+         "country": "Testland", "timezone": "UTC", "created_at": datetime.utcnow()}
+        for i in range(airports)
+    ])
+    conn.execute(insert(Aircraft.__table__), [
+        {"aircraft_number": f"S2-{i:04d}", "model": "A320", "manufacturer": "Airbus",
+         "total_seats": 180, "economy_seats": 150, "business_seats": 24, "first_class_seats": 6,
+         "status": "active", "created_at": datetime.utcnow()}
+        for i in range(aircraft)
+    ])
+    airport_ids = conn.execute(select(Airport.id)).scalars().all()
+
+    pairs = set()
+    for origin in airport_ids:
+        for destination in rng.sample(airport_ids, min(routes_per_airport + 1, len(airport_ids))):
+            if destination != origin:
+                pairs.add((origin, destination))
+    conn.execute(insert(Route.__table__), [
+        {"origin_airport_id": o, "destination_airport_id": d,
+         "distance_km": rng.randint(200, 9000), "estimated_duration": rng.randint(45, 720),
+         "base_price_economy": 120, "base_price_business": 480, "base_price_first": 1200,
+         "is_active": True, "created_at": datetime.utcnow()}
+        for o, d in sorted(pairs)
+    ])
+    return (
+        conn.execute(select(Route.id)).scalars().all(),
+        conn.execute(select(Aircraft.id)).scalars().all(),
+    )
+
+
+def seed_flights(conn, route_ids, aircraft_ids, flights: int, days: int = 365, rng=None):
+    """`flights` departures spread evenly over `days` starting today."""
+    rng = rng or random.Random(7)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    now = datetime.utcnow()
+    for offset in range(0, flights, CHUNK):
+        rows = []
+        for i in range(offset, min(offset + CHUNK, flights)):
+            departure = start + timedelta(minutes=rng.randrange(days * 24 * 60))
+            rows.append({
+                "flight_number": f"SK{i:07d}",
+                "route_id": rng.choice(route_ids),
+                "aircraft_id": rng.choice(aircraft_ids),
+                "departure_datetime": departure,
+                "arrival_datetime": departure + timedelta(minutes=rng.randint(45, 720)),
+                "status": rng.choice(STATUSES),
+                "available_economy": rng.randint(0, 150),
+                "available_business": rng.randint(0, 24),
+                "available_first": rng.randint(0, 6),
+                "created_at": now,
+            })
+        conn.execute(insert(Flight.__table__), rows)
+
+
+def seed_users(conn, users: int, hashed_password: str, logs_per_user: int = 0):
+    """`users` passengers user{i}@bench.example sharing one password hash. Returns their ids."""
+    now = datetime.utcnow()
+    for offset in range(0, users, CHUNK):
+        conn.execute(insert(User.__table__), [
+            {"email": f"user{i}@bench.example", "full_name": f"Bench User {i}",
+             "hashed_password": hashed_password, "role": "PASSENGER",
+             "is_active": True, "is_verified": True, "created_at": now}
+            for i in range(offset, min(offset + CHUNK, users))
+        ])
+    user_ids = conn.execute(select(User.id).order_by(User.id)).scalars().all()
+    rows = [
+        {"user_id": user_id, "action": "login", "details": "bench", "ip_address": "127.0.0.1",
+         "timestamp": now - timedelta(minutes=n)}
+        for user_id in user_ids for n in range(logs_per_user)
+    ]
+    for offset in range(0, len(rows), CHUNK):
+        conn.execute(insert(ActivityLog.__table__), rows[offset:offset + CHUNK])
+    return user_ids
@@ -0,0 +1,45 @@
+# FILE: tests/conftest.py
+# Tests run against a throwaway SQLite database, with app/ on sys.path like the benchmarks
+#
+# Usage (from the repository root):
+#   pip install pytest && python -m pytest tests
+
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+os.environ["DB_MODE"] = "sync"
+os.environ["EMAIL_BACKEND"] = "console"
+os.environ["FLIGHT_EVENTS_BACKEND"] = "local"
+os.environ["RATE_LIMIT_BACKEND"] = "local"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from database import engine
+    from migrate import migrate
+
+    migrate()
+    return engine
+
+
+@pytest.fixture(scope="session")
+def flight_ids(engine):
+    from sqlalchemy import select
+
+    from models import Flight
+    from seed import seed_flights, seed_reference
+
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        route_ids, aircraft_ids = seed_reference(conn, airports=10, aircraft=5, routes_per_airport=2, rng=rng)
+        seed_flights(conn, route_ids, aircraft_ids, 20, rng=rng)
+        return conn.execute(select(Flight.id).order_by(Flight.id)).scalars().all()
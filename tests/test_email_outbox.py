@@ -0,0 +1,143 @@
+# FILE: tests/test_email_outbox.py
+# Outbox delivery: backoff between attempts, exactly one send, dead-lettering
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import email_service
+from database import SessionLocal
+from email_service import EmailDeliveryWorker, queue_email
+from models import EmailOutbox
+
+
+class FlakyTransport:
+    """Fails the first `failures` sends to each address, then delivers."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.attempts = {}
+        self.delivered = []
+
+    async def send(self, to_email: str, subject: str, html_content: str):
+        self.attempts[to_email] = self.attempts.get(to_email, 0) + 1
+        if self.attempts[to_email] <= self.failures:
+            raise ConnectionError(f"refused (attempt {self.attempts[to_email]})")
+        self.delivered.append((to_email, subject))
+
+    async def close(self):
+        pass
+
+
+def queue(to_email: str) -> int:
+    db = SessionLocal()
+    try:
+        message = queue_email(db, to_email, f"Hello {to_email}", "<p>hi</p>")
+        db.commit()
+        return message.id
+    finally:
+        db.close()
+
+
+def outbox_row(message_id: int):
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(EmailOutbox.status, EmailOutbox.attempts, EmailOutbox.next_attempt_at,
+                   EmailOutbox.last_error, EmailOutbox.sent_at)
+            .where(EmailOutbox.id == message_id)
+        ).one()
+    finally:
+        db.close()
+
+
+def make_due(message_id: int):
+    """Skip the backoff wait instead of sleeping through it."""
+    db = SessionLocal()
+    try:
+        db.execute(update(EmailOutbox).where(EmailOutbox.id == message_id)
+                   .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_once(worker) -> int:
+    return asyncio.run(worker.run_once())
+
+
+def test_failed_sends_back_off_then_deliver_exactly_once(engine):
+    transport = FlakyTransport(failures=3)
+    worker = EmailDeliveryWorker(transport=transport)
+    message_id = queue("retry@test.example")
+
+    delays = []
+    for attempt in range(1, 4):
+        before = datetime.utcnow()
+        assert run_once(worker) == 1
+        row = outbox_row(message_id)
+        assert row.status == "pending"
+        assert row.attempts == attempt
+        assert row.last_error == f"refused (attempt {attempt})"
+        assert row.next_attempt_at > before
+        delays.append((row.next_attempt_at - before).total_seconds())
+        assert run_once(worker) == 0   # not due again until the backoff has passed
+        make_due(message_id)
+
+    base = email_service.EMAIL_RETRY_BASE_SECONDS
+    assert [round(d / base) for d in delays] == [1, 2, 4]
+
+    assert run_once(worker) == 1
+    row = outbox_row(message_id)
+    assert row.status == "sent"
+    assert row.attempts == 4
+    assert row.sent_at is not None and row.last_error is None
+
+    make_due(message_id)
+    assert run_once(worker) == 0
+    assert transport.delivered == [("retry@test.example", "Hello retry@test.example")]
+    assert transport.attempts["retry@test.example"] == 4
+    assert (worker.sent, worker.retried, worker.failed) == (1, 3, 0)
+
+
+def test_message_is_dead_after_the_last_attempt(engine, monkeypatch):
+    monkeypatch.setattr(email_service, "EMAIL_MAX_ATTEMPTS", 3)
+    transport = FlakyTransport(failures=10)
+    worker = EmailDeliveryWorker(transport=transport)
+    message_id = queue("dead@test.example")
+
+    for attempt in range(1, 4):
+        assert run_once(worker) == 1
+        row = outbox_row(message_id)
+        assert row.attempts == attempt
+        assert row.status == ("failed" if attempt == 3 else "pending")
+        make_due(message_id)
+
+    assert run_once(worker) == 0   # failed messages are never claimed again
+    row = outbox_row(message_id)
+    assert row.status == "failed"
+    assert row.last_error == "refused (attempt 3)"
+    assert row.sent_at is None
+    assert transport.delivered == []
+    assert transport.attempts["dead@test.example"] == 3
+    assert (worker.sent, worker.retried, worker.failed) == (0, 2, 1)
+
+
+def test_expired_lease_is_claimed_again(engine):
+    crashed = EmailDeliveryWorker(transport=FlakyTransport(failures=0))
+    message_id = queue("lease@test.example")
+
+    assert [row.id for row in crashed._claim()] == [message_id]   # claimed, never recorded
+    row = outbox_row(message_id)
+    assert row.status == "sending"
+    assert row.next_attempt_at > datetime.utcnow()
+
+    transport = FlakyTransport(failures=0)
+    worker = EmailDeliveryWorker(transport=transport)
+    assert run_once(worker) == 0   # still leased to the crashed worker
+    make_due(message_id)
+    assert run_once(worker) == 1
+    row = outbox_row(message_id)
+    assert (row.status, row.attempts) == ("sent", 2)
+    assert transport.delivered == [("lease@test.example", "Hello lease@test.example")]
@@ -0,0 +1,136 @@
+# FILE: tests/test_flight_events.py
+# FlightEventBroker on the local backend: coalescing, shared reads, shutdown
+
+import asyncio
+
+from sqlalchemy import update
+
+from flight_events import CLOSED, EventStreamResponse, FlightEventBroker, LocalBackend
+from models import Flight
+
+
+def set_available(engine, flight_id: int, economy: int):
+    with engine.begin() as conn:
+        conn.execute(update(Flight).where(Flight.id == flight_id).values(available_economy=economy))
+
+
+def test_subscribers_to_a_flight_share_one_read(engine, flight_ids):
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=20)
+        await broker.start()
+        try:
+            subscriptions = await asyncio.gather(*(broker.subscribe(flight_ids[0]) for _ in range(25)))
+            assert broker.snapshot_queries == 1
+            assert broker.subscriber_count == 25
+            first = [await s.next(1) for s in subscriptions]
+            assert all(snapshot["flight_id"] == flight_ids[0] for snapshot in first)
+
+            await broker.subscribe(flight_ids[0])   # served from the cached snapshot
+            assert broker.snapshot_queries == 1
+        finally:
+            await broker.stop()
+
+    asyncio.run(run())
+
+
+def test_changes_within_one_window_cost_one_query(engine, flight_ids):
+    flight_id = flight_ids[1]
+
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=100)
+        await broker.start()
+        try:
+            subscriptions = [await broker.subscribe(flight_id) for _ in range(10)]
+            for s in subscriptions:
+                await s.next(1)   # initial snapshot
+            before = broker.snapshot_queries
+
+            for economy in range(1, 6):
+                set_available(engine, flight_id, economy)
+                broker.publish([flight_id])
+            snapshots = await asyncio.gather(*(s.next(2) for s in subscriptions))
+
+            assert broker.snapshot_queries - before == 1
+            assert all(snapshot["available"]["economy"] == 5 for snapshot in snapshots)
+            assert all(s.sent == 2 for s in subscriptions)
+        finally:
+            await broker.stop()
+
+    asyncio.run(run())
+
+
+def test_unwatched_flights_are_not_loaded(engine, flight_ids):
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=10)
+        await broker.start()
+        try:
+            await broker.subscribe(flight_ids[2])
+            before = broker.snapshot_queries
+            broker.publish([flight_ids[3], flight_ids[4]])
+            await asyncio.sleep(0.1)
+            assert broker.snapshot_queries == before
+        finally:
+            await broker.stop()
+
+    asyncio.run(run())
+
+
+def test_stop_closes_open_streams(engine, flight_ids):
+    async def consume(broker, subscription, received):
+        async for chunk in broker.stream(subscription, heartbeat=30, max_age=60):
+            received.append(chunk)
+
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=10)
+        await broker.start()
+        received = [[] for _ in range(3)]
+        tasks = [
+            asyncio.create_task(consume(broker, await broker.subscribe(flight_ids[5]), r))
+            for r in received
+        ]
+        await asyncio.sleep(0.05)
+        assert all(any(chunk.startswith("event: flight") for chunk in r) for r in received)
+
+        await broker.stop()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+        assert broker.subscriber_count == 0
+
+    asyncio.run(run())
+
+
+def test_next_reports_closed_after_stop(engine, flight_ids):
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=10)
+        await broker.start()
+        subscription = await broker.subscribe(flight_ids[6])
+        await subscription.next(1)
+        await broker.stop()
+        assert await subscription.next(1) is CLOSED
+
+    asyncio.run(run())
+
+
+def test_response_unsubscribes_when_client_leaves_before_the_stream_starts(engine, flight_ids):
+    async def run():
+        broker = FlightEventBroker(backend=LocalBackend(), coalesce_ms=10)
+        await broker.start()
+        try:
+            subscription = await broker.subscribe(flight_ids[7])
+            assert broker.subscriber_count == 1
+
+            async def receive():
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                raise OSError("connection reset")
+
+            response = EventStreamResponse(broker, subscription)
+            try:
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+            except Exception:
+                pass
+            assert broker.subscriber_count == 0
+        finally:
+            await broker.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,187 @@
+# FILE: tests/test_reservations.py
+# Concurrent seat holds: no seat is handed out twice and the counters match the seats rows
+
+import itertools
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+
+from database import SessionLocal
+from models import Flight, Seat, User
+from reservations import SeatUnavailable, count_available, hold_seat, refresh_availability
+from seat_availability import seat_availability
+
+_names = itertools.count()
+
+
+def make_flight(engine, flight_ids, economy: int, business: int) -> int:
+    """A flight with `economy` + `business` free seats on an existing route and aircraft."""
+    n = next(_names)
+    with engine.begin() as conn:
+        route_id, aircraft_id = conn.execute(
+            select(Flight.route_id, Flight.aircraft_id).where(Flight.id == flight_ids[0])
+        ).one()
+        departure = datetime.utcnow() + timedelta(days=7)
+        flight_id = conn.execute(insert(Flight.__table__).values(
+            flight_number=f"TS{n:04d}", route_id=route_id, aircraft_id=aircraft_id,
+            departure_datetime=departure, arrival_datetime=departure + timedelta(hours=2),
+            status="scheduled", available_economy=economy, available_business=business,
+            available_first=0,
+        )).inserted_primary_key[0]
+        classes = ["business"] * business + ["economy"] * economy
+        conn.execute(insert(Seat.__table__), [
+            {"flight_id": flight_id, "seat_number": f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+             "seat_class": seat_class, "is_available": True, "price": 100}
+            for i, seat_class in enumerate(classes)
+        ])
+    return flight_id
+
+
+def make_users(engine, count: int) -> list:
+    n = next(_names)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"email": f"booker{n}-{i}@test.example", "full_name": f"Booker {i}",
+             "hashed_password": "x", "role": "PASSENGER"}
+            for i in range(count)
+        ])
+        return conn.execute(
+            select(User.id).where(User.email.like(f"booker{n}-%"))
+        ).scalars().all()
+
+
+def race(user_ids, attempt):
+    """
+    Run attempt(db, user_id) in one thread per user, all released at
+    once. Returns the seats won and any unexpected errors.
+    """
+    won, errors = [], []
+    lock = threading.Lock()
+    gate = threading.Barrier(len(user_ids))
+
+    def booker(user_id):
+        db = SessionLocal()
+        gate.wait()
+        try:
+            for seat in attempt(db, user_id):
+                with lock:
+                    won.append((user_id, seat))
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=booker, args=(uid,)) for uid in user_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    return won, errors
+
+
+def retrying(db, call):
+    """SQLite lets one writer in at a time; a locked database is a retry, not a loss."""
+    while True:
+        try:
+            return call()
+        except OperationalError:
+            db.rollback()
+
+
+def assert_counters_match_seats(flight_id: int):
+    db = SessionLocal()
+    try:
+        refresh_availability(db, [flight_id])
+        exact = count_available(db, flight_id)
+        counters = db.execute(
+            select(Flight.available_economy, Flight.available_business, Flight.available_first)
+            .where(Flight.id == flight_id)
+        ).one()
+        assert {"economy": counters[0], "business": counters[1], "first": counters[2]} == exact
+        assert seat_availability.availability(db, flight_id) == exact
+        return exact
+    finally:
+        db.close()
+
+
+def held_seats(flight_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        return dict(db.execute(
+            select(Seat.id, Seat.held_by).where(Seat.flight_id == flight_id, Seat.is_available.is_(False))
+        ).all())
+    finally:
+        db.close()
+
+
+def test_bookers_racing_to_sell_out_never_oversell(engine, flight_ids):
+    flight_id = make_flight(engine, flight_ids, economy=18, business=6)
+    user_ids = make_users(engine, 12)
+
+    def until_sold_out(db, user_id):
+        seat_class = "business" if user_id % 3 == 0 else "economy"
+        while True:
+            try:
+                seat = retrying(db, lambda: hold_seat(db, flight_id, user_id, seat_class=seat_class))
+            except SeatUnavailable as e:
+                if "left" in str(e):
+                    return
+                continue
+            yield seat["seat_id"]
+
+    won, errors = race(user_ids, until_sold_out)
+
+    assert errors == []
+    assert [seat for seat, n in Counter(s for _, s in won).items() if n > 1] == []
+    held = held_seats(flight_id)
+    assert held == {seat: user_id for user_id, seat in won}
+    assert len(held) == 24
+    assert assert_counters_match_seats(flight_id) == {"economy": 0, "business": 0, "first": 0}
+
+
+def test_one_hold_each_leaves_the_rest_available(engine, flight_ids):
+    flight_id = make_flight(engine, flight_ids, economy=30, business=0)
+    user_ids = make_users(engine, 10)
+
+    def one_seat(db, user_id):
+        while True:
+            try:
+                seat = retrying(db, lambda: hold_seat(db, flight_id, user_id, seat_class="economy"))
+            except SeatUnavailable as e:
+                if "retry" in str(e):   # lost every attempt to other bookers, as a client would see
+                    continue
+                raise
+            yield seat["seat_id"]
+            return
+
+    won, errors = race(user_ids, one_seat)
+
+    assert errors == []
+    assert len({seat for _, seat in won}) == 10
+    assert held_seats(flight_id) == {seat: user_id for user_id, seat in won}
+    assert assert_counters_match_seats(flight_id) == {"economy": 20, "business": 0, "first": 0}
+
+
+def test_same_seat_goes_to_exactly_one_booker(engine, flight_ids):
+    flight_id = make_flight(engine, flight_ids, economy=6, business=0)
+    user_ids = make_users(engine, 10)
+    db = SessionLocal()
+    seat_availability.availability(db, flight_id)   # cached bitmap must follow the winner
+    db.close()
+
+    def seat_1a(db, user_id):
+        try:
+            yield retrying(db, lambda: hold_seat(db, flight_id, user_id, seat_number="1A"))["seat_id"]
+        except SeatUnavailable:
+            return
+
+    won, errors = race(user_ids, seat_1a)
+
+    assert errors == []
+    assert len(won) == 1
+    assert held_seats(flight_id) == {won[0][1]: won[0][0]}
+    assert assert_counters_match_seats(flight_id)["economy"] == 5